@@ -0,0 +1,82 @@
+"""Multi-account benchmark: memory and latency of one process serving many accounts.
+
+Usage: python -m benchmarks.bench_accounts [--accounts 300] [--events 200] [--max-open 32] [--queries 200]
+
+Every account is a separate calendar home on the CalDAV stand-in (stored as
+its discovery result, so no principal lookup) with its own synthetic corpus
+(benchmarks/corpus.py), synced into its own shard through an
+AccountRegistry limited to --max-open open accounts. Reports the anonymous
+memory (Linux only) after syncing every account, which should level off once
+--max-open accounts are open, and list_events p50/p99 for random accounts, most
+of which have to be reopened from their shard first.
+"""
+import argparse
+import asyncio
+import datetime
+import random
+import tempfile
+import time
+
+from benchmarks.bench_list_events import percentiles
+from benchmarks.bench_sync_memory import anon_mb
+from benchmarks.corpus import EPOCH, CorpusSpec, event_ics
+from src.accounts import Account, AccountRegistry
+from src.db import Discovery
+from tests.caldav_stub import CalDAVStub
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=300)
+    parser.add_argument("--events", type=int, default=200, help="events per account")
+    parser.add_argument("--max-open", type=int, default=32)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    spec = CorpusSpec(events=args.events)
+    rng = random.Random(spec.seed)
+    with CalDAVStub() as stub:
+        accounts = {}
+        for i in range(args.accounts):
+            cal = stub.add_calendar("Work", f"account{i}/work")
+            for j in range(args.events):
+                stub.put_object(cal, f"e{j}.ics", event_ics(f"a{i}-e{j}", rng, spec))
+            accounts[f"a{i}"] = Account(f"a{i}", stub.url, f"user{i}", "bench")
+        registry = AccountRegistry(accounts, db_dir=tempfile.mkdtemp(), max_open=args.max_open)
+        loop = asyncio.new_event_loop()
+        registry.loop = loop
+        for i, account_id in enumerate(accounts):
+            session = registry.wrapper(account_id).db.SessionLocal()
+            session.add(Discovery(base_url=stub.url, username=f"user{i}", principal_url=stub.url,
+                                  calendar_home_url=f"{stub.url}calendars/user/account{i}/"))
+            session.commit()
+            session.close()
+
+        memory = {}
+        t0 = time.perf_counter()
+        for n, account_id in enumerate(accounts, 1):
+            registry.wrapper(account_id).sync()
+            if n in (args.max_open, args.accounts // 2, args.accounts):
+                memory[f"anon_mb_after_{n}"] = anon_mb()
+        sync_s = time.perf_counter() - t0
+
+        samples = []
+        for _ in range(args.queries):
+            account_id = rng.choice(list(accounts))
+            start = EPOCH + datetime.timedelta(weeks=rng.randrange(spec.weeks))
+            t0 = time.perf_counter()
+            registry.wrapper(account_id).list_events(start, start + datetime.timedelta(weeks=1))
+            samples.append(time.perf_counter() - t0)
+        open_accounts = registry.open_count()
+        registry.close_all()
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()
+
+    p50, p99 = percentiles(samples)
+    print(dict({"accounts": args.accounts, "events_per_account": args.events, "max_open": args.max_open,
+                "sync_all_s": round(sync_s, 2), "open_accounts": open_accounts}, **memory,
+               list_events_p50_ms=p50, list_events_p99_ms=p99))
+
+
+if __name__ == "__main__":
+    main()
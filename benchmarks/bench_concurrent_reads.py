@@ -0,0 +1,81 @@
+"""Latency of concurrent async list_events calls while a sync is writing.
+
+Usage: python -m benchmarks.bench_concurrent_reads [--events 20000] [--readers 200]
+
+Loads --events into the stand-in, syncs them once, changes them all and
+starts a full resync on a background thread. While it writes, --readers
+list_events calls for one-week windows run concurrently on the event loop.
+The same batch is then repeated with the database idle for comparison.
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from benchmarks.bench_list_events import percentiles  # noqa: E402
+from benchmarks.bench_sync import populate  # noqa: E402
+from src.db import Base, async_read_engine, engine, init_db  # noqa: E402
+from tests.caldav_stub import CalDAVStub  # noqa: E402
+
+
+async def read_batch(wrapper, readers: int):
+    async def one(i):
+        start = datetime.datetime(2024, 3, 1) + datetime.timedelta(hours=i % 500)
+        t0 = time.perf_counter()
+        await wrapper.list_events_page_async(start, start + datetime.timedelta(weeks=1), limit=100)
+        return time.perf_counter() - t0
+    try:
+        return await asyncio.gather(*(one(i) for i in range(readers)))
+    finally:
+        await async_read_engine.dispose()
+
+
+def summarize(samples) -> dict:
+    p50, p99 = percentiles(samples)
+    return {"p50_ms": p50, "p99_ms": p99, "max_ms": round(max(samples) * 1000, 3)}
+
+
+def run(events: int, readers: int) -> dict:
+    from src.cache import QueryCache
+    from src.caldav_wrapper import CalDAVWrapper
+
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    with CalDAVStub() as stub:
+        populate(stub, 1, events)
+        os.environ.update(CALDAV_BASE_URL=stub.url, CALDAV_USERNAME="bench", CALDAV_PASSWORD="bench")
+        wrapper = CalDAVWrapper()
+        wrapper.sync()
+        wrapper.cache = QueryCache(max_entries=0)
+
+        populate(stub, 1, events, revision=1)
+        for cal in stub.calendars.values():
+            stub.forget_history(cal)
+        syncing = threading.Thread(target=wrapper.sync)
+        syncing.start()
+        # Let the sync reach its write phase
+        while not wrapper._sync_lock.locked():
+            time.sleep(0.001)
+        during = asyncio.run(read_batch(wrapper, readers))
+        sync_running = syncing.is_alive()
+        syncing.join()
+        idle = asyncio.run(read_batch(wrapper, readers))
+    return {"events": events, "readers": readers, "sync_still_running": sync_running,
+            "during_sync": summarize(during), "idle": summarize(idle)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--readers", type=int, default=200)
+    args = parser.parse_args()
+    print(run(args.events, args.readers))
+
+
+if __name__ == "__main__":
+    main()
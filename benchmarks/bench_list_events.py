@@ -0,0 +1,107 @@
+"""list_events latency benchmark for one-week windows as the events table grows.
+
+Usage: python -m benchmarks.bench_list_events [--sizes 10000 100000 1000000] [--queries 200]
+
+Events are inserted at a constant density (about 100 per week), so a one-week
+window always returns a similar number of rows and any growth in latency comes
+from the query having to look at more of the table. The "scan" columns run the
+same overlap predicate without the interval index for comparison, and
+"cached_p50_ms" repeats one query with the query cache enabled.
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy import insert  # noqa: E402
+
+from src.db import Base, Calendar, Event, SessionLocal, engine, init_db  # noqa: E402
+
+EPOCH = datetime.datetime(2000, 1, 3)
+EVENTS_PER_WEEK = 100
+CHUNK = 20000
+
+
+def populate(size: int):
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    weeks = max(1, size // EVENTS_PER_WEEK)
+    rng = random.Random(size)
+    with engine.begin() as conn:
+        conn.execute(insert(Calendar), [{"id": 1, "name": "Bench", "url": "http://bench/cal/"}])
+        for offset in range(0, size, CHUNK):
+            rows = []
+            for i in range(offset, min(size, offset + CHUNK)):
+                start = EPOCH + datetime.timedelta(minutes=rng.randrange(weeks * 7 * 24 * 60))
+                rows.append({
+                    "calendar_id": 1, "uid": f"ev-{i}", "summary": f"Event {i}", "description": "",
+                    "location": "", "start": start, "end": start + datetime.timedelta(minutes=rng.choice((30, 60, 90))),
+                })
+            conn.execute(insert(Event), rows)
+    return weeks
+
+
+def scan_query(start, end):
+    session = SessionLocal()
+    try:
+        return session.query(Event).filter(Event.start < end, Event.end > start).all()
+    finally:
+        session.close()
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return round(statistics.median(samples) * 1000, 3), round(samples[int(len(samples) * 0.99) - 1] * 1000, 3)
+
+
+def run(size: int, queries: int) -> dict:
+    from src.cache import QueryCache
+    from src.caldav_wrapper import CalDAVWrapper
+
+    weeks = populate(size)
+    # list_events only reads the local DB, and the constructor does not contact the
+    # server; the query cache stays off so every call reaches the database
+    wrapper = CalDAVWrapper("http://unused/", "bench", "bench", cache=QueryCache(max_entries=0))
+    rng = random.Random(0)
+    indexed, scan, rows = [], [], 0
+    for _ in range(queries):
+        start = EPOCH + datetime.timedelta(weeks=rng.randrange(weeks))
+        end = start + datetime.timedelta(weeks=1)
+        t0 = time.perf_counter()
+        rows += len(wrapper.list_events(start, end))
+        indexed.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        scan_query(start, end)
+        scan.append(time.perf_counter() - t0)
+    # Repeats of one query with the cache on: every call after the first is a hit
+    wrapper.cache = QueryCache()
+    cached = []
+    for _ in range(queries):
+        t0 = time.perf_counter()
+        wrapper.list_events(start, end)
+        cached.append(time.perf_counter() - t0)
+    p50, p99 = percentiles(indexed)
+    scan_p50, scan_p99 = percentiles(scan)
+    return {
+        "events": size, "rows_per_query": round(rows / queries),
+        "p50_ms": p50, "p99_ms": p99, "scan_p50_ms": scan_p50, "scan_p99_ms": scan_p99,
+        "cached_p50_ms": percentiles(cached[1:])[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    for size in args.sizes:
+        print(run(size, args.queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""VEVENT extraction benchmark: objects/second of the full icalendar parser and the fast path.
+
+Usage: python -m benchmarks.bench_parse [--objects 5000] [--description-bytes 200] [--processes 0 2 4]
+
+Parses a synthetic corpus (benchmarks/corpus.py) with vevent.parse_with_icalendar,
+vevent.parse, and vevent.parse_many on process pools of each --processes size
+(0 parses on the calling thread). The first pooled batch, which starts the
+worker processes, is not timed.
+"""
+import argparse
+import random
+import time
+
+from benchmarks.corpus import CorpusSpec, event_ics
+from src import vevent
+
+
+def rate(fn, objects) -> int:
+    t0 = time.perf_counter()
+    fn(objects)
+    return round(len(objects) / (time.perf_counter() - t0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--objects", type=int, default=5000)
+    parser.add_argument("--description-bytes", type=int, default=200)
+    parser.add_argument("--processes", type=int, nargs="+", default=[0, 2, 4])
+    args = parser.parse_args()
+
+    spec = CorpusSpec(events=args.objects, description_bytes=args.description_bytes)
+    rng = random.Random(spec.seed)
+    objects = [event_ics(f"bench-{i}", rng, spec) for i in range(args.objects)]
+    print({"parser": "icalendar", "objects_per_s": rate(lambda batch: [vevent.parse_with_icalendar(o) for o in batch],
+                                                          objects)})
+    print({"parser": "fast", "objects_per_s": rate(lambda batch: [vevent.parse(o) for o in batch], objects)})
+    for processes in args.processes:
+        vevent.PARSE_PROCESSES = processes
+        vevent._executor = None
+        vevent.parse_many(objects[:vevent.PARSE_PROCESS_MIN_BATCH])
+        print({"parser": "parse_many", "processes": processes, "objects_per_s": rate(vevent.parse_many, objects)})
+        if vevent._executor is not None:
+            vevent._executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""search_events latency benchmark over a synthetic corpus.
+
+Usage: python -m benchmarks.bench_search [--sizes 50000 500000] [--queries 200]
+
+Summaries and descriptions are drawn from a fixed vocabulary, so a one-word
+query matches a similar share of the table at every size. The "scan" columns
+run a LIKE filter over the same fields for comparison.
+"""
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy import insert, or_  # noqa: E402
+
+from benchmarks.bench_list_events import percentiles  # noqa: E402
+from src.db import Base, Calendar, Event, SessionLocal, engine, init_db  # noqa: E402
+
+EPOCH = datetime.datetime(2000, 1, 3)
+CHUNK = 20000
+WORDS = [f"word{i}" for i in range(5000)]
+TOPICS = ["budget", "review", "planning", "standup", "dentist", "retro", "offsite", "interview", "demo", "lunch"]
+
+
+def populate(size: int):
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    rng = random.Random(size)
+    with engine.begin() as conn:
+        conn.execute(insert(Calendar), [{"id": 1, "name": "Bench", "url": "http://bench/cal/"}])
+        for offset in range(0, size, CHUNK):
+            rows = []
+            for i in range(offset, min(size, offset + CHUNK)):
+                start = EPOCH + datetime.timedelta(minutes=rng.randrange(10 * 365 * 24 * 60))
+                rows.append({
+                    "calendar_id": 1, "uid": f"ev-{i}",
+                    "summary": f"{rng.choice(TOPICS)} {' '.join(rng.sample(WORDS, 2))}",
+                    "description": " ".join(rng.sample(WORDS, 12)),
+                    "location": f"Room {rng.randrange(100)}",
+                    "start": start, "end": start + datetime.timedelta(hours=1),
+                })
+            conn.execute(insert(Event), rows)
+
+
+def scan_query(term: str):
+    session = SessionLocal()
+    try:
+        pattern = f"%{term}%"
+        return session.query(Event).filter(or_(
+            Event.summary.like(pattern), Event.description.like(pattern), Event.location.like(pattern)
+        )).all()
+    finally:
+        session.close()
+
+
+def run(size: int, queries: int) -> dict:
+    from src.cache import QueryCache
+    from src.caldav_wrapper import CalDAVWrapper
+
+    populate(size)
+    # search_events only reads the local DB, and the constructor does not contact the
+    # server; the query cache stays off so every call reaches the database
+    wrapper = CalDAVWrapper("http://unused/", "bench", "bench", cache=QueryCache(max_entries=0))
+    rng = random.Random(0)
+    indexed, scan, rows = [], [], 0
+    for _ in range(queries):
+        term = rng.choice(WORDS)
+        t0 = time.perf_counter()
+        rows += len(wrapper.search_events(f"{rng.choice(TOPICS)} {term}"))
+        indexed.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        scan_query(term)
+        scan.append(time.perf_counter() - t0)
+    p50, p99 = percentiles(indexed)
+    scan_p50, scan_p99 = percentiles(scan)
+    return {
+        "events": size, "rows_per_query": round(rows / queries),
+        "p50_ms": p50, "p99_ms": p99, "scan_p50_ms": scan_p50, "scan_p99_ms": scan_p99,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50000, 500000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    for size in args.sizes:
+        print(run(size, args.queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Startup benchmark: time from importing the server to its first tool response.
+
+Usage: python -m benchmarks.bench_startup [--events 5000] [--latency 0.2] [--runs 3]
+
+A first process syncs --events from the in-process CalDAV stand-in into a
+fresh database, like an earlier run of the container. Each measured run then
+starts a new process that imports src.main, starts the startup task the way
+the ASGI app does, and calls list_events. The stand-in answers every request
+after --latency seconds, so anything on the startup path that waits for the
+server shows up in the numbers.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.bench_sync import populate
+from tests.caldav_stub import CalDAVStub
+
+CHILD = r"""
+import time
+t0 = time.perf_counter()
+import asyncio, json
+from src import mcp_server
+import src.main  # noqa: F401
+imported = time.perf_counter() - t0
+
+async def main():
+    startup = asyncio.create_task(mcp_server.run())
+    result = await mcp_server.handle_call_tool("list_events", {
+        "start_date": "2024-03-01T00:00:00", "end_date": "2024-03-08T00:00:00", "limit": 10,
+    })
+    first = time.perf_counter() - t0
+    events = len(json.loads(result[0].text)["events"])
+    await startup
+    return first, events, time.perf_counter() - t0
+
+first, events, synced = asyncio.run(main())
+print(json.dumps({"import_s": imported, "first_response_s": first, "events": events, "sync_done_s": synced}))
+"""
+
+
+def child(env: dict) -> dict:
+    out = subprocess.run([sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run(events: int, latency: float, runs: int) -> dict:
+    with CalDAVStub() as stub:
+        populate(stub, 1, events)
+        env = dict(os.environ, CALDAV_BASE_URL=stub.url, CALDAV_USERNAME="bench", CALDAV_PASSWORD="bench",
+                   DATABASE_URL=f"sqlite:///{tempfile.mkdtemp()}/bench.db", PYTHONPATH=os.getcwd())
+        # Earlier run of the container: fills the database and discovery URLs
+        child(env)
+        stub.latency = latency
+        samples = [child(env) for _ in range(runs)]
+    return {
+        "events": events, "server_latency_s": latency,
+        "import_s": round(statistics.median(s["import_s"] for s in samples), 3),
+        "first_response_s": round(statistics.median(s["first_response_s"] for s in samples), 3),
+        "sync_done_s": round(statistics.median(s["sync_done_s"] for s in samples), 3),
+        "events_in_first_response": samples[0]["events"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    print(run(args.events, args.latency, args.runs))
+
+
+if __name__ == "__main__":
+    main()
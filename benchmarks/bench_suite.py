@@ -0,0 +1,143 @@
+"""Benchmark suite: sync throughput, peak RSS and list_events latency per corpus size.
+
+Usage: python -m benchmarks.bench_suite [--sizes 1000 10000 100000 1000000] [--latency 0]
+           [--recurring 0.05] [--description-bytes 200] [--calendars 1] [--queries 200]
+           [--output results.json]
+
+Every size runs in a fresh process so its peak RSS is not inflated by the
+previous one. The process generates a synthetic corpus (benchmarks/corpus.py),
+serves it from the in-process CalDAV stand-in with --latency seconds added to
+every request, and measures:
+
+- an initial sync into an empty database and a full resync after every
+  object changed (events/second),
+- peak RSS of the process before and after syncing (the stand-in's copy of the
+  corpus is in the first number),
+- list_events p50/p99 for random one-week windows with the query cache off.
+
+The result is a single JSON document with the run parameters and environment,
+so runs of different releases can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_list_events import percentiles
+from benchmarks.corpus import EPOCH, CorpusSpec, populate
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def measure(spec: CorpusSpec, latency: float, queries: int) -> dict:
+    """Runs one size in this process; the database must be fresh."""
+    import datetime
+
+    from src.cache import QueryCache
+    from src.caldav_wrapper import CalDAVWrapper
+    from src.db import init_db
+    from tests.caldav_stub import CalDAVStub
+
+    init_db()
+    results = {"events": spec.events}
+    with CalDAVStub() as stub:
+        results["corpus_mb"] = round(populate(stub, spec) / (1024 * 1024), 1)
+        results["rss_before_sync_mb"] = peak_rss_mb()
+        stub.latency = latency
+        os.environ.update(CALDAV_BASE_URL=stub.url, CALDAV_USERNAME="bench", CALDAV_PASSWORD="bench")
+        wrapper = CalDAVWrapper()
+
+        t0 = time.perf_counter()
+        wrapper.sync()
+        elapsed = time.perf_counter() - t0
+        results["initial_sync_s"] = round(elapsed, 3)
+        results["initial_events_per_s"] = round(spec.events / elapsed)
+        results["requests"] = len(stub.requests)
+
+        populate(stub, spec, revision=1)
+        for cal in stub.calendars.values():
+            stub.forget_history(cal)
+        t0 = time.perf_counter()
+        wrapper.sync()
+        elapsed = time.perf_counter() - t0
+        results["changed_resync_s"] = round(elapsed, 3)
+        results["changed_events_per_s"] = round(spec.events / elapsed)
+        results["peak_rss_mb"] = peak_rss_mb()
+
+    wrapper.cache = QueryCache(max_entries=0)
+    rng = random.Random(spec.seed)
+    samples, rows = [], 0
+    for _ in range(queries):
+        start = EPOCH + datetime.timedelta(weeks=rng.randrange(spec.weeks))
+        t0 = time.perf_counter()
+        rows += len(wrapper.list_events(start, start + datetime.timedelta(weeks=1)))
+        samples.append(time.perf_counter() - t0)
+    results["rows_per_query"] = round(rows / queries)
+    results["list_events_p50_ms"], results["list_events_p99_ms"] = percentiles(samples)
+    return results
+
+
+def run_size(spec: CorpusSpec, latency: float, queries: int) -> dict:
+    args = [sys.executable, "-m", "benchmarks.bench_suite", "--child", "--sizes", str(spec.events),
+            "--calendars", str(spec.calendars), "--recurring", str(spec.recurring),
+            "--description-bytes", str(spec.description_bytes), "--seed", str(spec.seed),
+            "--latency", str(latency), "--queries", str(queries)]
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    out = subprocess.run(args, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"commit": commit or None, "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(), "cpus": os.cpu_count()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--calendars", type=int, default=1)
+    parser.add_argument("--recurring", type=float, default=0.05, help="share of recurring series")
+    parser.add_argument("--description-bytes", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every stub request")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--output", help="also write the JSON document to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    specs = [CorpusSpec(events=size, calendars=args.calendars, recurring=args.recurring,
+                        description_bytes=args.description_bytes, seed=args.seed) for size in args.sizes]
+    if args.child:
+        print(json.dumps(measure(specs[0], args.latency, args.queries)))
+        return
+
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "child")}
+    report = {"benchmark": "suite", "started": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+              "params": params, "environment": environment(), "results": []}
+    for spec in specs:
+        report["results"].append(run_size(spec, args.latency, args.queries))
+        print(json.dumps(report["results"][-1]), file=sys.stderr)
+    document = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document + "\n")
+    print(document)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Sync throughput benchmark against the in-process CalDAV stand-in.
+
+Usage: python -m benchmarks.bench_sync [--events 10000] [--calendars 1]
+
+Reports events/second for an initial sync into an empty database and for a
+full resync (sync-token discarded) where every object changed.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from src.db import Base, engine, init_db  # noqa: E402
+from tests.caldav_stub import CalDAVStub  # noqa: E402
+
+
+def populate(stub: CalDAVStub, calendars: int, events: int, revision: int = 0):
+    per_calendar = events // calendars
+    for c in range(calendars):
+        cal = stub.calendars.get(f"/dav/calendars/user/cal{c}/") or stub.add_calendar(f"Calendar {c}", f"cal{c}")
+        for i in range(per_calendar):
+            day = 1 + i % 28
+            stub.add_event(
+                cal, f"bench-{c}-{i}", f"Event {i} rev {revision}",
+                start=f"202403{day:02d}T{9 + i % 8:02d}0000Z",
+                end=f"202403{day:02d}T{10 + i % 8:02d}0000Z",
+                extra=f"DESCRIPTION:Synthetic event number {i}\r\nLOCATION:Room {i % 50}\r\n",
+            )
+
+
+def run(events: int, calendars: int) -> dict:
+    from src.caldav_wrapper import CalDAVWrapper
+
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    results = {"events": events, "calendars": calendars}
+    with CalDAVStub() as stub:
+        populate(stub, calendars, events)
+        os.environ.update(CALDAV_BASE_URL=stub.url, CALDAV_USERNAME="bench", CALDAV_PASSWORD="bench")
+        wrapper = CalDAVWrapper()
+
+        t0 = time.perf_counter()
+        wrapper.sync()
+        elapsed = time.perf_counter() - t0
+        results["initial_sync_s"] = round(elapsed, 3)
+        results["initial_events_per_s"] = round(events / elapsed)
+
+        populate(stub, calendars, events, revision=1)
+        for cal in stub.calendars.values():
+            stub.forget_history(cal)
+        t0 = time.perf_counter()
+        wrapper.sync()
+        elapsed = time.perf_counter() - t0
+        results["changed_resync_s"] = round(elapsed, 3)
+        results["changed_events_per_s"] = round(events / elapsed)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--calendars", type=int, default=1)
+    args = parser.parse_args()
+    print(run(args.events, args.calendars))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Sync memory benchmark: peak RSS of an initial sync as the calendar grows.
+
+Usage: python -m benchmarks.bench_sync_memory [--sizes 5000 20000 80000] [--description-bytes 2000]
+
+The CalDAV stand-in runs in its own process with a synthetic corpus
+(benchmarks/corpus.py), so the measured process only holds what the sync
+itself needs. Each size is synced into a fresh database by a fresh process
+that reports its peak RSS before and after the sync, and peak_anon_mb samples
+its anonymous memory (Linux only), which is what sync itself allocates. The
+member listing and the objects are both streamed and written in chunks, so
+sync_anon_growth_mb and peak RSS stay flat as the calendar grows.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.bench_suite import peak_rss_mb
+
+SERVER = r"""
+import sys
+from benchmarks.corpus import CorpusSpec, populate
+from tests.caldav_stub import CalDAVStub
+
+stub = CalDAVStub().start()
+populate(stub, CorpusSpec(events=int(sys.argv[1]), description_bytes=int(sys.argv[2])))
+print(stub.url, flush=True)
+sys.stdin.read()
+"""
+
+
+def anon_mb() -> float:
+    """Current anonymous RSS in MB, or 0 where /proc is not available."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return 0.0
+
+
+def measure() -> dict:
+    """Runs in the measuring process: one initial sync against CALDAV_BASE_URL."""
+    from src.caldav_wrapper import CalDAVWrapper
+    from src.db import init_db
+
+    init_db()
+    wrapper = CalDAVWrapper()
+    before, anon_before = peak_rss_mb(), anon_mb()
+    peak_anon = [anon_before]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.01):
+            peak_anon[0] = max(peak_anon[0], anon_mb())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    t0 = time.perf_counter()
+    stats = wrapper.sync()
+    elapsed = time.perf_counter() - t0
+    done.set()
+    sampler.join()
+    return {"sync_s": round(elapsed, 3), "parsed": stats["parsed"],
+            "rss_before_mb": before, "peak_rss_mb": peak_rss_mb(),
+            "anon_before_mb": anon_before, "peak_anon_mb": peak_anon[0],
+            "sync_anon_growth_mb": round(peak_anon[0] - anon_before, 1)}
+
+
+def run(events: int, description_bytes: int) -> dict:
+    server = subprocess.Popen([sys.executable, "-c", SERVER, str(events), str(description_bytes)],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    try:
+        url = server.stdout.readline().strip()
+        env = dict(os.environ, CALDAV_BASE_URL=url, CALDAV_USERNAME="bench", CALDAV_PASSWORD="bench",
+                   DATABASE_URL=f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+        out = subprocess.run([sys.executable, "-m", "benchmarks.bench_sync_memory", "--child"],
+                             env=env, capture_output=True, text=True, check=True)
+    finally:
+        server.stdin.close()
+        server.wait()
+    return dict({"events": events, "description_bytes": description_bytes},
+                **json.loads(out.stdout.strip().splitlines()[-1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 20000, 80000])
+    parser.add_argument("--description-bytes", type=int, default=2000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(measure()))
+        return
+    for size in args.sizes:
+        print(run(size, args.description_bytes))
+
+
+if __name__ == "__main__":
+    main()
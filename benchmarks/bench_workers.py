@@ -0,0 +1,90 @@
+"""Read throughput of follower worker processes over one shared database while the leader syncs.
+
+Usage: python -m benchmarks.bench_workers [--events 10000] [--workers 1 2 4] [--seconds 5]
+
+Syncs --events into a database file, then for every worker count starts that
+many processes, each reading it through its own CalDAVWrapper in follower
+mode (catching up with the leader's commits before every read), and has them
+run list_events for random one-week windows for --seconds. Meanwhile this
+process plays the leader, re-generating the corpus and resyncing it in a loop,
+so followers keep seeing new commits. Reports total reads per second and
+p50/p99 latency per worker count; throughput scales with the CPUs available.
+"""
+import argparse
+import datetime
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+# The corpus starts in 2020: expand its series at sync time, so reads measure queries rather than expansion
+os.environ.setdefault("OCCURRENCE_LOOKBACK_DAYS", "3650")
+
+from benchmarks.bench_list_events import percentiles  # noqa: E402
+from benchmarks.corpus import EPOCH, CorpusSpec, populate  # noqa: E402
+from src.caldav_wrapper import CalDAVWrapper  # noqa: E402
+from src.db import DATABASE_URL, Database, init_db  # noqa: E402
+from tests.caldav_stub import CalDAVStub  # noqa: E402
+
+
+def read_for(base_url: str, weeks: int, seconds: float, seed: int) -> list:
+    """One follower worker: list_events latencies of reads run for the given time."""
+    wrapper = CalDAVWrapper(base_url, "user", "secret", db=Database(DATABASE_URL))
+    wrapper.shared = True
+    rng = random.Random(seed)
+    samples = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = EPOCH + datetime.timedelta(hours=rng.randrange(weeks * 7 * 24))
+        t0 = time.perf_counter()
+        wrapper.list_events(start, start + datetime.timedelta(weeks=1))
+        samples.append(time.perf_counter() - t0)
+    wrapper.close()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    spec = CorpusSpec(events=args.events)
+    init_db()
+    results = []
+    with CalDAVStub() as stub:
+        populate(stub, spec)
+        leader = CalDAVWrapper(stub.url, "user", "secret")
+        leader.sync()
+        context = multiprocessing.get_context("spawn")
+        for workers in args.workers:
+            stop = threading.Event()
+            syncs = [0]
+
+            def lead():
+                while not stop.is_set():
+                    populate(stub, spec, revision=syncs[0] + 1)
+                    leader.sync()
+                    syncs[0] += 1
+
+            thread = threading.Thread(target=lead)
+            with context.Pool(workers) as pool:
+                thread.start()
+                per_worker = pool.starmap(read_for, [(stub.url, spec.weeks, args.seconds, seed)
+                                                     for seed in range(workers)])
+                stop.set()
+                thread.join()
+            samples = [sample for worker in per_worker for sample in worker]
+            p50, p99 = percentiles(samples)
+            results.append({"workers": workers, "reads_per_s": round(len(samples) / args.seconds),
+                            "p50_ms": p50, "p99_ms": p99, "leader_syncs": syncs[0]})
+
+    print({"events": args.events, "cpus": os.cpu_count(), "results": results})
+
+
+if __name__ == "__main__":
+    main()
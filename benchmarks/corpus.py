@@ -0,0 +1,93 @@
+"""Synthetic iCalendar corpora for the benchmarks.
+
+Events are spread at a constant density (--per-week, about 100 by default)
+from EPOCH onwards, so a one-week window returns a similar number of rows at
+every corpus size. A seeded RNG makes every corpus reproducible: the same
+parameters always produce the same objects.
+"""
+import datetime
+import random
+from dataclasses import dataclass
+from typing import Sequence
+
+from tests.caldav_stub import CalDAVStub
+
+EPOCH = datetime.datetime(2020, 1, 6)
+TIMEZONES = ("UTC", "Europe/Berlin", "America/New_York", "Asia/Tokyo", "Australia/Sydney")
+RRULES = ("FREQ=WEEKLY;COUNT=12", "FREQ=DAILY;COUNT=10", "FREQ=WEEKLY;BYDAY=MO,WE,FR;COUNT=24",
+          "FREQ=MONTHLY;COUNT=6")
+WORDS = ("budget", "review", "planning", "sync", "customer", "roadmap", "design", "retro", "hiring",
+         "launch", "migration", "incident", "offsite", "training", "quarterly", "kickoff")
+
+
+@dataclass
+class CorpusSpec:
+    events: int
+    calendars: int = 1
+    # Share of events that are recurring series (RRULE, sometimes with an EXDATE)
+    recurring: float = 0.05
+    timezones: Sequence[str] = TIMEZONES
+    # Approximate DESCRIPTION length in bytes
+    description_bytes: int = 200
+    per_week: int = 100
+    seed: int = 0
+
+    @property
+    def weeks(self) -> int:
+        return max(1, self.events // self.per_week)
+
+
+def _fold(line: str) -> str:
+    """Folds a content line at 75 octets (RFC 5545 3.1); the text is ASCII."""
+    parts = [line[:75]] + [line[i:i + 74] for i in range(75, len(line), 74)]
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _stamp(value: datetime.datetime, tz: str) -> str:
+    if tz == "UTC":
+        return f":{value:%Y%m%dT%H%M%S}Z"
+    return f";TZID={tz}:{value:%Y%m%dT%H%M%S}"
+
+
+def event_ics(uid: str, rng: random.Random, spec: CorpusSpec) -> str:
+    start = EPOCH + datetime.timedelta(minutes=15 * rng.randrange(spec.weeks * 7 * 24 * 4))
+    end = start + datetime.timedelta(minutes=rng.choice((15, 30, 60, 90)))
+    tz = rng.choice(spec.timezones)
+    summary = " ".join(rng.choice(WORDS) for _ in range(3)).capitalize()
+    words = []
+    length = 0
+    while length < spec.description_bytes:
+        words.append(rng.choice(WORDS))
+        length += len(words[-1]) + 1
+    lines = [
+        "BEGIN:VCALENDAR\r\n", "VERSION:2.0\r\n", "PRODID:-//fast-calendar-mcp//bench//EN\r\n",
+        "BEGIN:VEVENT\r\n", f"UID:{uid}\r\n", "DTSTAMP:20240101T000000Z\r\n",
+        f"DTSTART{_stamp(start, tz)}\r\n", f"DTEND{_stamp(end, tz)}\r\n", f"SUMMARY:{summary}\r\n",
+        f"LOCATION:Room {rng.randrange(50)}\r\n",
+    ]
+    if words:
+        lines.append(_fold("DESCRIPTION:" + " ".join(words)[:spec.description_bytes]))
+    if rng.random() < spec.recurring:
+        lines.append(f"RRULE:{rng.choice(RRULES)}\r\n")
+        if rng.random() < 0.3:
+            lines.append(f"EXDATE{_stamp(start + datetime.timedelta(weeks=1), tz)}\r\n")
+    lines += ["END:VEVENT\r\n", "END:VCALENDAR\r\n"]
+    return "".join(lines)
+
+
+def populate(stub: CalDAVStub, spec: CorpusSpec, revision: int = 0) -> int:
+    """Puts the corpus on the stand-in; returns the total ICS size in bytes.
+
+    A different revision re-generates every object with new summaries, so a
+    resync has to download and re-parse all of them.
+    """
+    rng = random.Random(f"{spec.seed}-{revision}")
+    size = 0
+    per_calendar = spec.events // spec.calendars
+    for c in range(spec.calendars):
+        cal = stub.calendars.get(f"/dav/calendars/user/cal{c}/") or stub.add_calendar(f"Calendar {c}", f"cal{c}")
+        for i in range(per_calendar):
+            ics = event_ics(f"bench-{c}-{i}", rng, spec)
+            size += len(ics)
+            stub.put_object(cal, f"bench-{c}-{i}.ics", ics)
+    return size
@@ -0,0 +1,148 @@
+"""Multi-account mode: one process serving many CalDAV accounts.
+
+CALDAV_ACCOUNTS_FILE names a JSON list of accounts:
+
+    [{"id": "alice", "base_url": "https://dav.example.com/", "username": "alice", "password_env": "ALICE_PASSWORD"}]
+
+("password" may be given inline instead of "password_env"). Every account
+gets its own SQLite shard (ACCOUNTS_DB_DIR/<id>.db) and its own CalDAVWrapper,
+so DAV connections, credentials and cached reads are never shared. At most
+MAX_OPEN_ACCOUNTS shards are open at a time: opening another closes the least
+recently used one's connection pools and drops its cached reads, so memory
+stays bounded however many accounts are configured. A closed account is
+reopened from its shard on its next use.
+"""
+import asyncio
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from src.cache import QueryCache
+from src.caldav_wrapper import QUERY_CACHE_ENTRIES, QUERY_CACHE_MAX_BYTES, QUERY_CACHE_TTL, CalDAVWrapper
+from src.db import Database
+
+ACCOUNTS_FILE = os.getenv("CALDAV_ACCOUNTS_FILE")
+ACCOUNTS_DB_DIR = os.getenv("ACCOUNTS_DB_DIR", "./data/accounts")
+MAX_OPEN_ACCOUNTS = int(os.getenv("MAX_OPEN_ACCOUNTS", "32"))
+# Read connections per pool of an open shard; the single-account default is DATABASE_READ_POOL_SIZE
+ACCOUNT_READ_POOL_SIZE = int(os.getenv("ACCOUNT_READ_POOL_SIZE", "2"))
+
+# Account ids name their shard file
+ACCOUNT_ID = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+@dataclass
+class Account:
+    id: str
+    base_url: str
+    username: str
+    password: str
+
+
+def load_accounts(path: str) -> Dict[str, Account]:
+    with open(path) as f:
+        entries = json.load(f)
+    accounts = {}
+    for entry in entries:
+        account_id = str(entry.get("id", ""))
+        if not ACCOUNT_ID.match(account_id) or account_id.startswith("."):
+            raise ValueError(f"Invalid account id {account_id!r}: use letters, digits, '.', '_' and '-'")
+        if account_id in accounts:
+            raise ValueError(f"Duplicate account id {account_id!r}")
+        password = entry["password"] if "password" in entry else os.getenv(entry.get("password_env", ""))
+        if not all([entry.get("base_url"), entry.get("username"), password]):
+            raise ValueError(f"Account {account_id!r} needs base_url, username and password (or password_env)")
+        accounts[account_id] = Account(account_id, entry["base_url"], entry["username"], password)
+    return accounts
+
+
+class AccountRegistry:
+    def __init__(self, accounts: Dict[str, Account], db_dir: str = ACCOUNTS_DB_DIR,
+                 max_open: int = MAX_OPEN_ACCOUNTS):
+        self.accounts = accounts
+        self.db_dir = db_dir
+        self.max_open = max(1, max_open)
+        # Called as listener(account_id, wrapper) whenever an account is opened
+        self.open_listeners: List[Callable[[str, CalDAVWrapper], None]] = []
+        # Loop the async read pools of closed shards are disposed on
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._open: "OrderedDict[str, CalDAVWrapper]" = OrderedDict()
+        # Shards whose schema was checked by this process; reopening one skips the check
+        self._initialized = set()
+        # Guards _open only; a shard is opened under its account's own lock,
+        # so reads of open accounts never wait for another account to open
+        self._lock = threading.Lock()
+        self._opening = {account_id: threading.Lock() for account_id in accounts}
+        os.makedirs(db_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional["AccountRegistry"]:
+        """The registry for CALDAV_ACCOUNTS_FILE, or None in single-account mode."""
+        return cls(load_accounts(ACCOUNTS_FILE)) if ACCOUNTS_FILE else None
+
+    def get_open(self, account_id: str) -> Optional[CalDAVWrapper]:
+        """The account's wrapper if its shard is open; never blocks on opening one."""
+        with self._lock:
+            wrapper = self._open.get(account_id)
+            if wrapper is not None:
+                self._open.move_to_end(account_id)
+            return wrapper
+
+    def wrapper(self, account_id: str) -> CalDAVWrapper:
+        """The account's wrapper, opening its shard (and closing the least recently used one) if needed."""
+        if account_id not in self.accounts:
+            raise ValueError(f"Unknown account: {account_id}")
+        wrapper = self.get_open(account_id)
+        if wrapper is not None:
+            return wrapper
+        with self._opening[account_id]:
+            # Opened by another thread while this one waited
+            wrapper = self.get_open(account_id)
+            if wrapper is not None:
+                return wrapper
+            account = self.accounts[account_id]
+            db = Database(f"sqlite:///{os.path.join(self.db_dir, account_id)}.db", read_pool_size=ACCOUNT_READ_POOL_SIZE)
+            if account_id not in self._initialized:
+                db.init()
+                self._initialized.add(account_id)
+            # The cache budget is shared by the open accounts
+            cache = QueryCache(QUERY_CACHE_ENTRIES, QUERY_CACHE_MAX_BYTES // self.max_open, QUERY_CACHE_TTL)
+            wrapper = CalDAVWrapper(account.base_url, account.username, account.password, db=db, cache=cache)
+            for listener in self.open_listeners:
+                listener(account_id, wrapper)
+            with self._lock:
+                self._open[account_id] = wrapper
+                closing = self._over_limit()
+        for victim in closing:
+            victim.close(self.loop)
+        return wrapper
+
+    def _over_limit(self) -> List[CalDAVWrapper]:
+        """Removes least recently used wrappers beyond max_open and returns them to close; caller holds _lock."""
+        closing = []
+        # Accounts that are syncing stay open; the limit is enforced again on the next open
+        for account_id in list(self._open)[:-1]:
+            if len(self._open) <= self.max_open:
+                break
+            if not self._open[account_id].syncing:
+                closing.append(self._open.pop(account_id))
+        return closing
+
+    def open_wrappers(self) -> List[CalDAVWrapper]:
+        with self._lock:
+            return list(self._open.values())
+
+    def open_count(self) -> int:
+        with self._lock:
+            return len(self._open)
+
+    def close_all(self):
+        with self._lock:
+            closing = list(self._open.values())
+            self._open.clear()
+        for wrapper in closing:
+            wrapper.close(self.loop)
@@ -0,0 +1,120 @@
+"""In-process LRU/TTL cache for read results, invalidated by data generations.
+
+Every calendar has a generation counter that writers bump after committing a
+change to it, plus a global generation bumped on every change and an epoch
+bumped when the set of calendars itself changes. A cached result is stamped
+with the generations it was computed under (read before the query runs) and
+is only served while they are unchanged, so a result can never outlive the
+data it was built from, whatever the TTL.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, Optional
+
+
+def estimate_size(value) -> int:
+    """Rough deep size in bytes of a result made of dicts, lists, tuples and scalars."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += estimate_size(k) + estimate_size(v)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += estimate_size(item)
+    return size
+
+
+class QueryCache:
+    """Thread-safe LRU bounded by entry count and estimated bytes, with a TTL.
+
+    Cached values are shared between callers and must be treated as read-only.
+    max_entries=0 disables caching.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (stamp, expires, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._epoch = 0
+        self._generation = 0
+        self._calendar_generations: dict = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stamp(self, calendar_ids: Optional[Iterable[int]] = None) -> tuple:
+        """Generations a result over calendar_ids (all calendars if None) depends on."""
+        with self._lock:
+            if calendar_ids is None:
+                return (self._epoch, self._generation)
+            return (self._epoch,) + tuple(self._calendar_generations.get(i, 0) for i in sorted(calendar_ids))
+
+    def bump(self, calendar_ids: Optional[Iterable[int]] = None):
+        """Invalidates results over the given calendars, and every result over all
+        calendars; without calendar_ids everything is invalidated.
+
+        Call after the change is committed.
+        """
+        with self._lock:
+            self._generation += 1
+            if calendar_ids is None:
+                self._epoch += 1
+            for i in calendar_ids or ():
+                self._calendar_generations[i] = self._calendar_generations.get(i, 0) + 1
+
+    def get_or_compute(self, key: Hashable, calendar_ids: Optional[Iterable[int]], compute: Callable):
+        hit, value, stamp = self.lookup(key, calendar_ids)
+        if hit:
+            return value
+        value = compute()
+        self.store(key, stamp, value)
+        return value
+
+    def lookup(self, key: Hashable, calendar_ids: Optional[Iterable[int]]) -> tuple:
+        """Returns (hit, value, stamp); on a miss, compute the value and pass the stamp to store()."""
+        if self.max_entries <= 0:
+            return False, None, None
+        stamp = self.stamp(None if calendar_ids is None else tuple(calendar_ids))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[3], stamp
+            self.misses += 1
+        return False, None, stamp
+
+    def store(self, key: Hashable, stamp: Optional[tuple], value):
+        if stamp is not None:
+            self._put(key, stamp, value)
+
+    def _put(self, key: Hashable, stamp: tuple, value):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (stamp, time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
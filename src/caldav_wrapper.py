@@ -1,31 +1,224 @@
 import os
+import asyncio
+import base64
 import datetime
-from typing import List, Optional
+import hashlib
+import itertools
+import json
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
 import caldav
+from caldav.collection import CalendarSet
 from caldav.elements import dav, cdav
+from caldav.lib import error as caldav_error
+from sqlalchemy import and_, exists, func, insert, or_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-from src.db import Calendar, Event, SessionLocal, init_db
+from src import freebusy, metrics, recurrence, vevent, webdav
+from src.cache import QueryCache
+from src.db import (Calendar, Database, Discovery, Event, Occurrence, default_db, fts_query, init_db,
+                    matching_events, overlapping_event_ids, overlapping_occurrence_ids)
 import icalendar
 from dateutil import parser
 import pytz
 
+# Number of calendars fetched in parallel during sync
+SYNC_CONCURRENCY = int(os.getenv("CALDAV_SYNC_CONCURRENCY", "4"))
+# Rolling window recurring series are expanded over at sync time; queries
+# outside it extend a series' occurrences lazily
+OCCURRENCE_LOOKBACK = datetime.timedelta(days=int(os.getenv("OCCURRENCE_LOOKBACK_DAYS", "30")))
+OCCURRENCE_HORIZON = datetime.timedelta(days=int(os.getenv("OCCURRENCE_HORIZON_DAYS", "365")))
+# Longest span of occurrences kept per series when a query extends it
+OCCURRENCE_MAX_SPAN = datetime.timedelta(days=3 * 365)
+# Fields list_events can project onto; recurrence_id is only set for
+# occurrences of recurring series
+EVENT_FIELDS = ("uid", "summary", "description", "start", "end", "location", "calendar", "recurrence_id")
+# Default and maximum number of search_events results
+SEARCH_LIMIT = 20
+SEARCH_MAX_LIMIT = 200
+# Parallel PUT/DELETE requests of the batch write tools, and their size limit
+WRITE_CONCURRENCY = int(os.getenv("CALDAV_WRITE_CONCURRENCY", "8"))
+BATCH_MAX_ITEMS = 1000
+# Read-result cache (see src/cache.py); QUERY_CACHE_ENTRIES=0 disables it
+QUERY_CACHE_ENTRIES = int(os.getenv("QUERY_CACHE_ENTRIES", "1024"))
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_MB", "32")) * 1024 * 1024
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "300"))
+# Default number of slots find_free_slots returns
+FREE_SLOT_LIMIT = 10
+# Optional sync window in days around now; only events overlapping it are
+# kept locally (unset: the whole calendar)
+SYNC_PAST_DAYS = os.getenv("CALDAV_SYNC_PAST_DAYS")
+SYNC_FUTURE_DAYS = os.getenv("CALDAV_SYNC_FUTURE_DAYS")
+# Objects fetched, parsed and committed together during sync; with the queue
+# of chunks waiting for the writer this bounds sync memory
+SYNC_CHUNK_SIZE = 500
+SYNC_QUEUE_CHUNKS = 2
+# Number of hrefs requested per calendar-multiget REPORT
+MULTIGET_CHUNK_SIZE = 100
+# Bound on bound parameters per DELETE ... WHERE id IN (...)
+DELETE_CHUNK_SIZE = 500
+# Rows per INSERT ... ON CONFLICT DO UPDATE batch
+UPSERT_CHUNK_SIZE = 500
+
+_upsert = sqlite_insert(Event)
+UPSERT_EVENT = _upsert.on_conflict_do_update(
+    index_elements=[Event.calendar_id, Event.uid],
+    set_={
+        column: _upsert.excluded[column]
+        for column in ("href", "etag", "content_hash", "summary", "description", "start", "end", "location",
+                       "all_day", "transparent", "recurring", "ics", "expanded_from", "expanded_until")
+    },
+)
+
+@dataclass
+class CalendarChanges:
+    """One chunk of what a sync worker fetched for a calendar, ready for the single DB writer.
+
+    Deletions come with the chunk that lists them: deleted_hrefs, or for a full
+    listing each chunk's listed hrefs, which are marked with the listing's
+    mark so the final chunk can drop every stored event left unmarked. The
+    final chunk also carries the calendar's new sync-token ("" clears it).
+    """
+    calendar_id: int
+    sync_token: Optional[str] = None
+    final: bool = False
+    listing: Optional[int] = None
+    listed: List[str] = field(default_factory=list)
+    rows: List[dict] = field(default_factory=list)
+    etag_only: List[dict] = field(default_factory=list)
+    stale_ids: List[int] = field(default_factory=list)
+    deleted_hrefs: List[str] = field(default_factory=list)
+    occurrences: Dict[str, List[dict]] = field(default_factory=dict)  # series uid -> expanded rows
+    stats: dict = field(default_factory=lambda: {"fetched": 0, "parsed": 0, "skipped": 0})
+    # Unparsable objects and seconds per sync phase, for src/metrics.py
+    failed: int = 0
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def changes_events(self) -> bool:
+        """Whether applying this changes anything a read can see (ETag-only updates do not)."""
+        return bool(self.rows or self.stale_ids or self.deleted_hrefs)
+
+    def add_totals(self, other: "CalendarChanges"):
+        """Adds another chunk's counters and timings to this one's."""
+        for key, value in other.stats.items():
+            self.stats[key] = self.stats.get(key, 0) + value
+        self.failed += other.failed
+        for key, value in other.timings.items():
+            self.timings[key] = self.timings.get(key, 0.0) + value
+
+def _names_key(names: Optional[List[str]]) -> Optional[tuple]:
+    return None if names is None else tuple(sorted(set(names)))
+
+def _as_datetime(value) -> datetime.datetime:
+    return value if isinstance(value, datetime.datetime) else datetime.datetime.fromisoformat(value)
+
+def _describe(error: Exception) -> str:
+    if isinstance(error, KeyError):
+        return f"Missing field {error}"
+    return str(error) or type(error).__name__
+
+def content_hash(ical_data: str) -> str:
+    """Fingerprint of a raw iCalendar object, used to skip re-parsing unchanged data."""
+    return hashlib.sha1(ical_data.encode("utf-8")).hexdigest()
+
 class CalDAVWrapper:
-    def __init__(self):
-        self.base_url = os.getenv("CALDAV_BASE_URL")
-        self.username = os.getenv("CALDAV_USERNAME")
-        self.password = os.getenv("CALDAV_PASSWORD")
+    # Calendar name -> ids, built on demand for cache stamps and reset when calendars change
+    _calendar_index: Optional[Dict[str, List[int]]] = None
+
+    def __init__(self, base_url: Optional[str] = None, username: Optional[str] = None,
+                 password: Optional[str] = None, db: Database = default_db, cache: Optional[QueryCache] = None):
+        """Credentials default to the CALDAV_* environment variables, db to DATABASE_URL
+        and cache to one sized by the QUERY_CACHE_* settings."""
+        self.base_url = base_url or os.getenv("CALDAV_BASE_URL")
+        self.username = username or os.getenv("CALDAV_USERNAME")
+        self.password = password or os.getenv("CALDAV_PASSWORD")
+        self.db = db
         
         if not all([self.base_url, self.username, self.password]):
             raise ValueError("CALDAV credentials not set in environment variables")
 
+        self.sync_concurrency = max(1, SYNC_CONCURRENCY)
+        self.write_concurrency = max(1, WRITE_CONCURRENCY)
+        self._sync_lock = threading.Lock()
+        self._local = threading.local()
+        # Kept across syncs so the workers' DAV clients keep their keep-alive connections
+        self._sync_pool: Optional[ThreadPoolExecutor] = None
+        self._sync_pool_size = 0
+        self._clients: List[caldav.DAVClient] = []
+        # Background reconciles after writes: one runs at a time, and the
+        # calendars written meanwhile wait in _reconcile_pending (None: a full sync)
+        self._reconcile_lock = threading.Lock()
+        self._reconcile_pending: Optional[Set[int]] = set()
+        self._reconciling = False
+        self._reconcile_thread: Optional[threading.Thread] = None
+        self.cache = cache if cache is not None else QueryCache(QUERY_CACHE_ENTRIES, QUERY_CACHE_MAX_BYTES,
+                                                                QUERY_CACHE_TTL)
+        # Called as listener(calendar_ids, calendars_changed) after every committed change, from the writing thread
+        self.change_listeners: List[Callable[[Optional[List[int]], bool], None]] = []
+        # Set while another process writes the database (a follower worker, see src/leader.py):
+        # reads first catch up with its commits through the calendar generations
+        self.shared = False
+        self._data_version: Optional[int] = None
+        self._generations: Dict[int, Tuple[str, int]] = {}
+        self._catch_up_lock = threading.Lock()
+
+        # No network access here: the principal is discovered on first use
         self.client = caldav.DAVClient(
             url=self.base_url,
             username=self.username,
             password=self.password
         )
+        self._calendar_home = None
+        self._home_from_db = False
+        self._discovery_lock = threading.Lock()
+
+    @property
+    def calendar_home(self) -> CalendarSet:
+        """The collection holding the account's calendars, discovered on first use.
+
+        Principal and calendar-home URLs found once are stored in the DB, so
+        later starts skip the discovery PROPFINDs and list calendars directly.
+        """
+        if self._calendar_home is None:
+            with self._discovery_lock:
+                if self._calendar_home is None:
+                    self._calendar_home = self._discover()
+        return self._calendar_home
+
+    def _discover(self) -> CalendarSet:
+        session = self.db.SessionLocal()
+        try:
+            known = session.query(Discovery).filter(
+                Discovery.base_url == self.base_url, Discovery.username == self.username
+            ).first()
+            if known is not None:
+                self._home_from_db = True
+                home_url = caldav.lib.url.URL.objectify(known.calendar_home_url)
+                if home_url.hostname != self.client.url.hostname:
+                    # Load-balanced servers (e.g. iCloud) keep each account on its own host
+                    self.client.url = home_url
+                return CalendarSet(self.client, url=home_url)
+
+            principal = self._discover_principal()
+            home = principal.calendar_home_set
+            session.add(Discovery(base_url=self.base_url, username=self.username,
+                                  principal_url=str(principal.url), calendar_home_url=str(home.url)))
+            session.commit()
+            self._home_from_db = False
+            return home
+        finally:
+            session.close()
+
+    def _discover_principal(self):
         # Attempt to find principal, handling both root URL and direct principal URL
         try:
-            self.principal = self.client.principal()
+            return self.client.principal()
         except:
             # If auto-discovery fails, assume base_url might be direct calendar home or needs specific handling
             # Some servers like Nextcloud/iCloud might need specific URL structures if auto-discovery fails
@@ -39,165 +232,1229 @@ class CalDAVWrapper:
                     username=self.username,
                     password=self.password
                 )
-                 self.principal = self.client.principal()
+                 return self.client.principal()
             else:
                 raise
 
-    def sync(self):
-        """Syncs remote calendars and events to local database"""
-        session = SessionLocal()
+    def _forget_discovery(self):
+        """Drops stored discovery URLs, e.g. after the server moved the calendar home."""
+        session = self.db.SessionLocal()
         try:
-            calendars = self.principal.calendars()
-            for cal in calendars:
-                # Update or create calendar in DB
-                db_cal = session.query(Calendar).filter(Calendar.url == str(cal.url)).first()
-                if not db_cal:
-                    db_cal = Calendar(name=cal.name or "Unknown", url=str(cal.url))
-                    session.add(db_cal)
-                    session.commit()
-                    session.refresh(db_cal)
-                else:
-                    if cal.name and db_cal.name != cal.name:
+            session.query(Discovery).filter(
+                Discovery.base_url == self.base_url, Discovery.username == self.username
+            ).delete()
+            session.commit()
+        finally:
+            session.close()
+        with self._discovery_lock:
+            self._calendar_home = None
+            self.client = caldav.DAVClient(url=self.base_url, username=self.username, password=self.password)
+
+    def _server_calendars(self) -> list:
+        """Calendars in the account's calendar home.
+
+        If stored discovery URLs fail, or list nothing (caldav reports a
+        missing collection as empty), discovery is redone once.
+        """
+        try:
+            calendars = self.calendar_home.calendars()
+        except caldav_error.DAVError:
+            if not self._home_from_db:
+                raise
+            calendars = []
+        if calendars or not self._home_from_db:
+            return calendars
+        print("Stored CalDAV discovery URLs returned no calendars, rediscovering")
+        self._forget_discovery()
+        return self.calendar_home.calendars()
+
+    def sync(self) -> dict:
+        """Syncs remote calendars and events to local database.
+
+        Calendars are fetched and parsed concurrently by a bounded pool of
+        workers (CALDAV_SYNC_CONCURRENCY); this thread is the only one writing
+        to the database and commits every chunk of SYNC_CHUNK_SIZE objects as
+        it arrives. A calendar that fails is reported in "failed" and does not
+        abort the others.
+
+        Returns counters for the run: objects fetched from the server, parsed,
+        skipped because their ETag or content hash was unchanged, and deleted.
+        """
+        with self._sync_lock:
+            stats = {"calendars": 0, "fetched": 0, "parsed": 0, "skipped": 0, "deleted": 0, "failed": []}
+            session = self.db.SessionLocal()
+            try:
+                jobs = []
+                calendars_changed = False
+                for cal in self._server_calendars():
+                    # Update or create calendar in DB
+                    db_cal = session.query(Calendar).filter(Calendar.url == str(cal.url)).first()
+                    if not db_cal:
+                        db_cal = Calendar(name=cal.name or "Unknown", url=str(cal.url))
+                        session.add(db_cal)
+                        calendars_changed = True
+                    elif cal.name and db_cal.name != cal.name:
                         db_cal.name = cal.name
+                        calendars_changed = True
+                    session.commit()
+                    jobs.append((db_cal.id, db_cal.name, db_cal.url, db_cal.sync_token))
+                if calendars_changed:
+                    self._invalidate(calendars_changed=True)
+                self._sync_calendars(session, jobs, stats)
+
+            except Exception as e:
+                session.rollback()
+                raise e
+            finally:
+                session.close()
+            return stats
+
+    @property
+    def syncing(self) -> bool:
+        """Whether a sync or background reconcile is writing right now."""
+        return self._sync_lock.locked() or self._reconciling
+
+    def close(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Releases the sync workers, DAV connections and database pools (see Database.dispose); all reopen if used again."""
+        if self._sync_pool is not None:
+            self._sync_pool.shutdown()
+            self._sync_pool = None
+        clients, self._clients, self._local = self._clients, [], threading.local()
+        for client in clients:
+            client.close()
+        self.client.close()
+        self.db.dispose(loop)
+
+    def _dav_client(self) -> caldav.DAVClient:
+        """Per-thread DAV client, so each sync worker keeps its own keep-alive connections."""
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = caldav.DAVClient(url=str(self.client.url), username=self.username, password=self.password)
+            self._local.client = client
+            self._clients.append(client)
+        return client
+
+    def _sync_executor(self) -> ThreadPoolExecutor:
+        """The sync worker pool, sized to sync_concurrency and reused by every sync (caller holds _sync_lock)."""
+        if self._sync_pool is None or self._sync_pool_size != self.sync_concurrency:
+            if self._sync_pool is not None:
+                self._sync_pool.shutdown()
+            self._sync_pool = ThreadPoolExecutor(max_workers=self.sync_concurrency, thread_name_prefix="caldav-sync")
+            self._sync_pool_size = self.sync_concurrency
+        return self._sync_pool
+
+    def _sync_calendars(self, session: Session, jobs: List[tuple], stats: dict):
+        """Runs _fetch_calendar for each (calendar_id, name, url, sync_token) job
+        on the worker pool and writes the chunks they stream, committing each.
+
+        At most SYNC_QUEUE_CHUNKS chunks per worker wait for the writer, so
+        workers block instead of piling up parsed events in memory. Chunks a
+        failed calendar committed before the failure stay; its sync-token is
+        only stored with the final chunk, so the next sync picks up the rest.
+        """
+        chunks: queue.Queue = queue.Queue(maxsize=SYNC_QUEUE_CHUNKS * self.sync_concurrency)
+        names = {job[0]: job[1] for job in jobs}
+        totals = {calendar_id: CalendarChanges(calendar_id=calendar_id) for calendar_id in names}
+        failed = set()
+        stop = threading.Event()
+
+        def fetch(job):
+            # Every worker ends with exactly one (calendar_id, error or None) marker
+            try:
+                self._fetch_calendar(*job, chunks.put, lambda: stop.is_set() or job[0] in failed)
+                chunks.put((job[0], None))
+            except Exception as e:
+                chunks.put((job[0], e))
+
+        def fail(calendar_id: int, error: Exception):
+            if calendar_id not in failed:
+                failed.add(calendar_id)
+                print(f"Error syncing calendar {names[calendar_id]}: {error}")
+                metrics.SYNC_FAILURES.inc(calendar=names[calendar_id])
+                stats["failed"].append(names[calendar_id])
+
+        pool = self._sync_executor()
+        futures = [pool.submit(fetch, job) for job in jobs]
+        try:
+            remaining = len(jobs)
+            while remaining:
+                item = chunks.get()
+                if isinstance(item, tuple):
+                    calendar_id, error = item
+                    if error is not None:
+                        fail(calendar_id, error)
+                    remaining -= 1
+                    continue
+                if item.calendar_id in failed:
+                    continue
+                try:
+                    self._write_changes(session, item, stats)
+                    with metrics.phase(item.timings, "commit"):
                         session.commit()
+                except Exception as e:
+                    session.rollback()
+                    fail(item.calendar_id, e)
+                    continue
+                if item.changes_events:
+                    self._invalidate([item.calendar_id])
+                totals[item.calendar_id].add_totals(item)
+                if item.final:
+                    stats["calendars"] += 1
+                    self._record_sync(names[item.calendar_id], totals.pop(item.calendar_id))
+        finally:
+            # On an unexpected error, stop the workers and unblock those waiting on a full queue
+            stop.set()
+            while not all(future.done() for future in futures):
+                try:
+                    chunks.get(timeout=0.05)
+                except queue.Empty:
+                    pass
 
-                # Sync events
-                # For simplicity in this MCP, we fetch all events. 
-                # In production, use sync-token or time-range.
-                events = cal.events()
-                existing_uids = {e.uid for e in db_cal.events}
-                fetched_uids = set()
-
-                for event in events:
-                    try:
-                        ical_data = event.data
-                        cal_obj = icalendar.Calendar.from_ical(ical_data)
-                        
-                        for component in cal_obj.walk():
-                            if component.name == "VEVENT":
-                                uid = str(component.get('uid'))
-                                fetched_uids.add(uid)
-                                
-                                summary = str(component.get('summary', ''))
-                                description = str(component.get('description', ''))
-                                location = str(component.get('location', ''))
-                                
-                                dtstart = component.get('dtstart').dt
-                                dtend = component.get('dtend').dt if component.get('dtend') else dtstart
-
-                                # Normalize to UTC naive for DB
-                                if isinstance(dtstart, datetime.datetime):
-                                    if dtstart.tzinfo:
-                                        dtstart = dtstart.astimezone(pytz.UTC).replace(tzinfo=None)
-                                elif isinstance(dtstart, datetime.date):
-                                    dtstart = datetime.datetime.combine(dtstart, datetime.time.min)
-
-                                if isinstance(dtend, datetime.datetime):
-                                    if dtend.tzinfo:
-                                        dtend = dtend.astimezone(pytz.UTC).replace(tzinfo=None)
-                                elif isinstance(dtend, datetime.date):
-                                    dtend = datetime.datetime.combine(dtend, datetime.time.min)
-
-                                db_event = session.query(Event).filter(Event.uid == uid, Event.calendar_id == db_cal.id).first()
-                                if db_event:
-                                    # Update
-                                    db_event.summary = summary
-                                    db_event.description = description
-                                    db_event.start = dtstart
-                                    db_event.end = dtend
-                                    db_event.location = location
-                                else:
-                                    # Create
-                                    db_event = Event(
-                                        calendar_id=db_cal.id,
-                                        uid=uid,
-                                        summary=summary,
-                                        description=description,
-                                        start=dtstart,
-                                        end=dtend,
-                                        location=location
-                                    )
-                                    session.add(db_event)
-                    except Exception as e:
-                        print(f"Error syncing event {event}: {e}")
-                        continue
-                
-                # Remove events that no longer exist on server
-                to_delete = existing_uids - fetched_uids
-                if to_delete:
-                    session.query(Event).filter(Event.uid.in_(to_delete), Event.calendar_id == db_cal.id).delete(synchronize_session=False)
-                
-                session.commit()
+    def _fetch_calendar(self, calendar_id: int, name: str, url: str, sync_token: Optional[str],
+                        emit: Callable[[CalendarChanges], None], stopped: Callable[[], bool] = lambda: False):
+        """Network and parse half of a calendar sync; runs on a worker thread.
 
-        except Exception as e:
-            session.rollback()
-            raise e
+        Lists members and ETags first: with the stored sync-token (RFC 6578)
+        only those added/changed since, otherwise the whole collection, or with
+        a sync window the events overlapping it. Members whose ETag differs from
+        the stored one are then downloaded via calendar-multiget and parsed in
+        chunks of SYNC_CHUNK_SIZE, each handed to emit as it is ready, so memory
+        does not grow with the calendar. The final chunk carries the new token
+        and the deletions. Nothing is written here; see _write_changes.
+        """
+        client = self._dav_client()
+        final = CalendarChanges(calendar_id=calendar_id, final=True)
+        window = self._sync_window()
+        with metrics.phase(final.timings, "fetch"):
+            delta, full = self._list_calendar(client, name, url, sync_token, window)
+        # Stored events this listing does not mark are gone from the server (or left the window)
+        listing = time.time_ns() if full else None
+
+        members = iter(delta)
+        while True:
+            with metrics.phase(final.timings, "fetch"):
+                batch = list(itertools.islice(members, SYNC_CHUNK_SIZE))
+            if not batch:
+                break
+            if stopped():
+                return
+            changes = CalendarChanges(calendar_id=calendar_id, listing=listing)
+            changes.deleted_hrefs = [href for href, _, deleted in batch if deleted]
+            batch = [(href, etag) for href, etag, deleted in batch if not deleted]
+            if full:
+                changes.listed = [href for href, _ in batch]
+            known = self._known_objects(calendar_id, [href for href, _ in batch])
+            # Objects whose listed ETag matches the stored one are not even downloaded
+            to_fetch = [href for href, etag in batch if not etag or known.get(href, (None, None, ()))[0] != etag]
+            changes.stats["skipped"] += len(batch) - len(to_fetch)
+            objects = []
+            with metrics.phase(changes.timings, "fetch"):
+                for i in range(0, len(to_fetch), MULTIGET_CHUNK_SIZE):
+                    objects += webdav.multiget(client, url, to_fetch[i:i + MULTIGET_CHUNK_SIZE])
+            # Parsed as one batch, which goes to the parse pool when it is large enough
+            self._collect_objects(changes, objects, known)
+            emit(changes)
+
+        final.listing = listing
+        # A token only describes the whole collection; the windowed and legacy listings clear it
+        final.sync_token = delta.sync_token or ""
+        emit(final)
+
+    def _list_calendar(self, client: caldav.DAVClient, name: str, url: str, sync_token: Optional[str],
+                       window: Optional[tuple]) -> Tuple[webdav.CollectionDelta, bool]:
+        """Returns the members to consider and whether the listing is complete."""
+        if window is None:
+            try:
+                try:
+                    return webdav.sync_collection(client, url, sync_token), not sync_token
+                except webdav.SyncTokenInvalid as e:
+                    print(f"Sync-token for {name} rejected ({e}), doing full resync")
+                    return webdav.sync_collection(client, url, None), True
+            except caldav_error.DAVError as e:
+                print(f"sync-collection not supported for {name} ({e}), listing all events")
+        return webdav.calendar_query(client, url, *(window or (None, None))), True
+
+    @staticmethod
+    def _sync_window() -> Optional[tuple]:
+        """(start, end) of the configured sync window as UTC-naive datetimes; either may be None."""
+        if SYNC_PAST_DAYS is None and SYNC_FUTURE_DAYS is None:
+            return None
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return (now - datetime.timedelta(days=int(SYNC_PAST_DAYS)) if SYNC_PAST_DAYS is not None else None,
+                now + datetime.timedelta(days=int(SYNC_FUTURE_DAYS)) if SYNC_FUTURE_DAYS is not None else None)
+
+    def _known_objects(self, calendar_id: int, hrefs: Optional[List[str]] = None) -> dict:
+        """Maps href -> (etag, content_hash, ((uid, id), ...)) for stored events.
+
+        A single column query over the calendar (or over the given hrefs only),
+        so no ORM objects are loaded.
+        """
+        session = self.db.SessionLocal()
+        try:
+            query = session.query(Event.href, Event.etag, Event.content_hash, Event.uid, Event.id).filter(Event.calendar_id == calendar_id)
+            if hrefs is None:
+                chunks = [query]
+            else:
+                chunks = [query.filter(Event.href.in_(hrefs[i:i + DELETE_CHUNK_SIZE])) for i in range(0, len(hrefs), DELETE_CHUNK_SIZE)]
+            known = {}
+            for chunk in chunks:
+                for href, etag, digest, uid, event_id in chunk:
+                    rows = known[href][2] if href in known else ()
+                    known[href] = (etag, digest, rows + ((uid, event_id),))
+            return known
         finally:
             session.close()
 
+    def _collect_objects(self, changes: CalendarChanges, objects, known: dict):
+        """Parses downloaded (href, etag, ics) objects into rows for the writer.
+
+        Unchanged content is skipped. Rows that an object no longer contains
+        (e.g. its UID changed) are marked stale.
+        """
+        stats = changes.stats
+        pending = []
+        with metrics.phase(changes.timings, "parse"):
+            for href, etag, ical_data in objects:
+                stats["fetched"] += 1
+                digest = content_hash(ical_data)
+                stored_etag, stored_digest, stored_rows = known.get(href, (None, None, ()))
+                if stored_digest == digest:
+                    stats["skipped"] += 1
+                    if etag and etag != stored_etag:
+                        changes.etag_only += [{"id": event_id, "etag": etag} for _, event_id in stored_rows]
+                    continue
+                pending.append((href, etag, ical_data, digest, stored_rows))
+            results = vevent.parse_many([ical_data for _, _, ical_data, _, _ in pending], parse=self._parse_ics)
+        for (href, etag, ical_data, digest, stored_rows), parsed in zip(pending, results):
+            if isinstance(parsed, Exception):
+                print(f"Error syncing event {href}: {parsed}")
+                changes.failed += 1
+                continue
+            stats["parsed"] += 1
+            for fields in parsed:
+                row = dict(fields, calendar_id=changes.calendar_id, href=href, etag=etag, content_hash=digest,
+                           expanded_from=None, expanded_until=None)
+                if row["recurring"]:
+                    window_from, window_until = self._default_horizon()
+                    with metrics.phase(changes.timings, "expand"):
+                        occurrences, row["expanded_from"], row["expanded_until"] = recurrence.expand(
+                            ical_data, row["uid"], window_from, window_until
+                        )
+                    changes.occurrences[row["uid"]] = occurrences
+                changes.rows.append(row)
+            uids = {fields["uid"] for fields in parsed}
+            changes.stale_ids += [event_id for uid, event_id in stored_rows if uid not in uids]
+
+    @staticmethod
+    def _unlisted_ids(session: Session, calendar_id: int, listing: int) -> List[int]:
+        """Ids of stored events that a full server listing did not mark."""
+        return [event_id for event_id, in session.query(Event.id).filter(
+            Event.calendar_id == calendar_id, or_(Event.listing.is_(None), Event.listing != listing))]
+
+    def _write_changes(self, session: Session, changes: CalendarChanges, stats: dict):
+        """Applies one calendar's fetched changes with bulk statements (caller commits)."""
+        with metrics.phase(changes.timings, "upsert"):
+            for i in range(0, len(changes.rows), UPSERT_CHUNK_SIZE):
+                session.execute(UPSERT_EVENT, changes.rows[i:i + UPSERT_CHUNK_SIZE])
+            if changes.etag_only:
+                session.execute(update(Event), changes.etag_only)
+            if changes.occurrences:
+                uids = list(changes.occurrences)
+                ids = {}
+                for i in range(0, len(uids), DELETE_CHUNK_SIZE):
+                    ids.update(session.query(Event.uid, Event.id).filter(
+                        Event.calendar_id == changes.calendar_id, Event.uid.in_(uids[i:i + DELETE_CHUNK_SIZE])
+                    ))
+                # The content_hash trigger misses a series upserted with an unchanged
+                # hash (e.g. moved to a new href), so drop its old occurrences here
+                event_ids = list(ids.values())
+                for i in range(0, len(event_ids), DELETE_CHUNK_SIZE):
+                    session.query(Occurrence).filter(
+                        Occurrence.event_id.in_(event_ids[i:i + DELETE_CHUNK_SIZE])
+                    ).delete(synchronize_session=False)
+                rows = [dict(row, event_id=ids[uid]) for uid, occurrences in changes.occurrences.items() for row in occurrences]
+                for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+                    session.execute(insert(Occurrence), rows[i:i + UPSERT_CHUNK_SIZE])
+
+        events = session.query(Event).filter(Event.calendar_id == changes.calendar_id)
+        deleted = 0
+        with metrics.phase(changes.timings, "delete"):
+            for i in range(0, len(changes.listed), DELETE_CHUNK_SIZE):
+                events.filter(Event.href.in_(changes.listed[i:i + DELETE_CHUNK_SIZE])).update(
+                    {"listing": changes.listing}, synchronize_session=False)
+            if changes.final and changes.listing is not None:
+                changes.stale_ids += self._unlisted_ids(session, changes.calendar_id, changes.listing)
+            for i in range(0, len(changes.stale_ids), DELETE_CHUNK_SIZE):
+                deleted += events.filter(Event.id.in_(changes.stale_ids[i:i + DELETE_CHUNK_SIZE])).delete(synchronize_session=False)
+            for i in range(0, len(changes.deleted_hrefs), DELETE_CHUNK_SIZE):
+                deleted += events.filter(Event.href.in_(changes.deleted_hrefs[i:i + DELETE_CHUNK_SIZE])).delete(synchronize_session=False)
+        changes.stats["deleted"] = deleted
+
+        if changes.sync_token is not None:
+            session.query(Calendar).filter(Calendar.id == changes.calendar_id).update({"sync_token": changes.sync_token or None})
+        if changes.changes_events:
+            session.query(Calendar).filter(Calendar.id == changes.calendar_id).update(
+                {"generation": Calendar.generation + 1})
+        stats["deleted"] += deleted
+        for key in ("fetched", "parsed", "skipped"):
+            stats[key] += changes.stats[key]
+
+    @staticmethod
+    def _record_sync(name: str, changes: CalendarChanges):
+        metrics.record_sync(name, changes.timings, dict(changes.stats, failed=changes.failed))
+
+    def _parse_ics(self, ical_data: str) -> List[dict]:
+        """Extracts the stored fields of every VEVENT in an iCalendar object (see vevent.parse)."""
+        return vevent.parse(ical_data)
+
+    # Reads: each read tool describes its query as (cache key, names of the
+    # calendars the result depends on (None: all), window whose recurring
+    # series must be expanded, compute(session)) and runs it through _read, or
+    # _read_async on the MCP server's event loop. Both use the query-only read pool.
+
     def list_calendars(self) -> List[dict]:
-        session = SessionLocal()
+        return self._read(*self._list_calendars_query())
+
+    async def list_calendars_async(self) -> List[dict]:
+        return await self._read_async(*self._list_calendars_query())
+
+    def _list_calendars_query(self):
+        def compute(session: Session) -> List[dict]:
+            return [{"id": id_, "name": name, "url": url}
+                    for id_, name, url in session.query(Calendar.id, Calendar.name, Calendar.url)]
+        return ("list_calendars",), None, None, compute
+
+    def list_events(self, start_date: datetime.datetime, end_date: datetime.datetime, calendar_name: Optional[str] = None,
+                    fields: Optional[List[str]] = None) -> List[dict]:
+        """Events overlapping the window ordered by start, one entry per occurrence of recurring series."""
+        page = self.list_events_page(start_date, end_date, calendar_name, fields=fields)
+        events = page["events"]
+        # Unlimited pages still stop where a series hit MAX_OCCURRENCES
+        while page["next_cursor"]:
+            page = self.list_events_page(start_date, end_date, calendar_name, fields=fields, cursor=page["next_cursor"])
+            events += page["events"]
+        return events
+
+    def list_events_page(self, start_date: datetime.datetime, end_date: datetime.datetime,
+                         calendar_name: Optional[str] = None, fields: Optional[List[str]] = None,
+                         limit: Optional[int] = None, cursor: Optional[str] = None) -> dict:
+        """One page of list_events: {"events": [...], "next_cursor": str or None}.
+
+        Pages are keyset-paginated on (start, kind, id), so following
+        next_cursor is stable under concurrent inserts and never re-reads
+        earlier rows. fields projects each event onto a subset of EVENT_FIELDS
+        and only those columns are selected. A page also ends early, with a
+        next_cursor, where a recurring series ran into MAX_OCCURRENCES; the
+        following page expands the series from there.
+        """
+        return self._read(*self._list_events_query(start_date, end_date, calendar_name, fields, limit, cursor))
+
+    async def list_events_page_async(self, start_date: datetime.datetime, end_date: datetime.datetime,
+                                     calendar_name: Optional[str] = None, fields: Optional[List[str]] = None,
+                                     limit: Optional[int] = None, cursor: Optional[str] = None) -> dict:
+        return await self._read_async(*self._list_events_query(start_date, end_date, calendar_name, fields, limit, cursor))
+
+    def _list_events_query(self, start_date: datetime.datetime, end_date: datetime.datetime,
+                           calendar_name: Optional[str], fields: Optional[List[str]],
+                           limit: Optional[int], cursor: Optional[str]):
+        fields = list(EVENT_FIELDS) if fields is None else list(fields)
+        unknown = set(fields) - set(EVENT_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        after = self._decode_cursor(cursor) if cursor else None
+
+        # Earlier pages already expanded the series up to the cursor
+        expand_from = max(start_date, after[0]) if after else start_date
+
+        def compute(session: Session) -> dict:
+            until = min(end_date, self._expanded_until(session, expand_from, end_date, calendar_name))
+            fetch = None if limit is None else limit + 1
+            rows = self._event_rows(session, start_date, until, calendar_name, fields, after, fetch, occurrences=False)
+            rows += self._event_rows(session, start_date, until, calendar_name, fields, after, fetch, occurrences=True)
+            rows.sort(key=lambda row: row[0])
+            next_cursor = None
+            if limit is not None and len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = self._encode_cursor(rows[-1][0])
+            elif until < end_date:
+                # Kind -1 sorts before both kinds, so the next page starts at until
+                next_cursor = self._encode_cursor(rows[-1][0] if rows else (until, -1, 0))
+            return {"events": [event for _, event in rows], "next_cursor": next_cursor}
+
+        key = ("list_events", start_date, end_date, calendar_name, tuple(fields), limit, cursor)
+        return key, [calendar_name] if calendar_name else None, (expand_from, end_date), compute
+
+    @staticmethod
+    def _expanded_until(session: Session, start_date: datetime.datetime, end_date: datetime.datetime,
+                        calendar_name: Optional[str]) -> datetime.datetime:
+        """Where the occurrences materialized for the window stop: end_date unless a series hit MAX_OCCURRENCES."""
+        query = session.query(func.min(Event.expanded_until)).filter(
+            Event.recurring.is_(True),
+            Event.start < end_date,
+            Event.expanded_until < end_date,
+        )
+        if calendar_name:
+            query = query.join(Calendar, Event.calendar_id == Calendar.id).filter(Calendar.name == calendar_name)
+        return query.scalar() or end_date
+
+    @staticmethod
+    def _event_rows(session: Session, start_date: datetime.datetime, end_date: datetime.datetime,
+                    calendar_name: Optional[str], fields: List[str], after: Optional[tuple],
+                    limit: Optional[int], occurrences: bool) -> List[tuple]:
+        """(sort key, event dict) rows from either single events or occurrences of series."""
+        if occurrences:
+            # Recurring series are served from their materialized occurrences,
+            # override values winning over the master's
+            source, kind = Occurrence, 1
+            columns = {
+                "uid": Event.uid,
+                "summary": func.coalesce(Occurrence.summary, Event.summary),
+                "description": func.coalesce(Occurrence.description, Event.description),
+                "end": Occurrence.end,
+                "location": func.coalesce(Occurrence.location, Event.location),
+                "calendar": Calendar.name,
+                "recurrence_id": Occurrence.recurrence_id,
+            }
+            ids = overlapping_occurrence_ids(start_date, end_date)
+        else:
+            source, kind = Event, 0
+            columns = {
+                "uid": Event.uid,
+                "summary": Event.summary,
+                "description": Event.description,
+                "end": Event.end,
+                "location": Event.location,
+                "calendar": Calendar.name,
+            }
+            ids = overlapping_event_ids(start_date, end_date)
+        selected = [f for f in fields if f in columns]
+        query = session.query(source.id, source.start, *(columns[f] for f in selected))
+        if occurrences:
+            query = query.join(Event, Occurrence.event_id == Event.id)
+        if calendar_name or "calendar" in selected:
+            query = query.join(Calendar, Event.calendar_id == Calendar.id)
+        # Overlap semantics: anything still running inside the window counts,
+        # zero-length events only when they start inside it
+        query = query.filter(
+            source.id.in_(ids),
+            source.start < end_date,
+            or_(source.end > start_date, source.start >= start_date),
+        )
+        if not occurrences:
+            query = query.filter(Event.recurring.is_(False))
+        if calendar_name:
+            query = query.filter(Calendar.name == calendar_name)
+        if after is not None:
+            after_start, after_kind, after_id = after
+            if kind > after_kind:
+                query = query.filter(source.start >= after_start)
+            elif kind < after_kind:
+                query = query.filter(source.start > after_start)
+            else:
+                query = query.filter(or_(source.start > after_start,
+                                         and_(source.start == after_start, source.id > after_id)))
+        query = query.order_by(source.start, source.id)
+        if limit is not None:
+            query = query.limit(limit)
+
+        rows = []
+        for row in query:
+            values = dict(zip(selected, row[2:]))
+            values["start"] = row.start
+            event = {}
+            for f in fields:
+                if f in values:
+                    value = values[f]
+                    event[f] = value.isoformat() if isinstance(value, datetime.datetime) else value
+            rows.append(((row.start, kind, row.id), event))
+        return rows
+
+    @staticmethod
+    def _encode_cursor(key: tuple) -> str:
+        start, kind, id_ = key
+        raw = json.dumps([start.isoformat(), kind, id_], separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> tuple:
         try:
-            calendars = session.query(Calendar).all()
-            return [{"id": c.id, "name": c.name, "url": c.url} for c in calendars]
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            start, kind, id_ = json.loads(raw)
+            return datetime.datetime.fromisoformat(start), int(kind), int(id_)
+        except (ValueError, TypeError) as e:
+            raise ValueError("Invalid cursor") from e
+
+    def search_events(self, query: str, start_date: Optional[datetime.datetime] = None,
+                      end_date: Optional[datetime.datetime] = None, calendar_name: Optional[str] = None,
+                      limit: int = SEARCH_LIMIT) -> List[dict]:
+        """Full-text search over summary, description and location, best BM25 match first.
+
+        With a date range only events overlapping it are returned; a recurring
+        series matches when one of its occurrences does.
+        """
+        return self._read(*self._search_events_query(query, start_date, end_date, calendar_name, limit))
+
+    async def search_events_async(self, query: str, start_date: Optional[datetime.datetime] = None,
+                                  end_date: Optional[datetime.datetime] = None, calendar_name: Optional[str] = None,
+                                  limit: int = SEARCH_LIMIT) -> List[dict]:
+        return await self._read_async(*self._search_events_query(query, start_date, end_date, calendar_name, limit))
+
+    def _search_events_query(self, query: str, start_date: Optional[datetime.datetime],
+                             end_date: Optional[datetime.datetime], calendar_name: Optional[str], limit: int):
+        if (start_date is None) != (end_date is None):
+            raise ValueError("start_date and end_date must be given together")
+        query = query.strip()
+        limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+
+        def compute(session: Session) -> List[dict]:
+            # Nothing left to match, e.g. only "*": an empty MATCH is an FTS5 syntax error
+            if not fts_query(query):
+                return []
+            matches = matching_events(query)
+            rows = session.query(
+                Event.uid, Event.summary, Event.description, Event.start, Event.end, Event.location,
+                Calendar.name, Event.recurring,
+            ).join(matches, Event.id == matches.c.id).join(Calendar)
+            if calendar_name:
+                rows = rows.filter(Calendar.name == calendar_name)
+            if start_date is not None:
+                single = and_(
+                    Event.recurring.is_(False),
+                    Event.id.in_(overlapping_event_ids(start_date, end_date)),
+                    Event.start < end_date,
+                    or_(Event.end > start_date, Event.start >= start_date),
+                )
+                series = and_(Event.recurring.is_(True), exists().where(
+                    Occurrence.event_id == Event.id,
+                    Occurrence.id.in_(overlapping_occurrence_ids(start_date, end_date)),
+                    Occurrence.start < end_date,
+                    or_(Occurrence.end > start_date, Occurrence.start >= start_date),
+                ))
+                rows = rows.filter(or_(single, series))
+            rows = rows.order_by(matches.c.rank, Event.start).limit(limit)
+            return [{
+                "uid": uid,
+                "summary": summary,
+                "description": description,
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "location": location,
+                "calendar": calendar,
+                "recurring": recurring,
+            } for uid, summary, description, start, end, location, calendar, recurring in rows]
+
+        key = ("search_events", query, start_date, end_date, calendar_name, limit)
+        window = None if start_date is None else (start_date, end_date)
+        return key, [calendar_name] if calendar_name else None, window, compute
+
+    def get_free_busy(self, start_date: datetime.datetime, end_date: datetime.datetime,
+                      calendar_names: Optional[List[str]] = None, timezone: str = "UTC",
+                      include_all_day: bool = False) -> List[dict]:
+        """Merged busy blocks across the selected calendars (all by default).
+
+        Naive dates are read as wall-clock time in timezone, and blocks are
+        returned in it.
+        """
+        return self._read(*self._free_busy_query(start_date, end_date, calendar_names, timezone, include_all_day))
+
+    async def get_free_busy_async(self, start_date: datetime.datetime, end_date: datetime.datetime,
+                                  calendar_names: Optional[List[str]] = None, timezone: str = "UTC",
+                                  include_all_day: bool = False) -> List[dict]:
+        return await self._read_async(*self._free_busy_query(start_date, end_date, calendar_names, timezone, include_all_day))
+
+    def _free_busy_query(self, start_date: datetime.datetime, end_date: datetime.datetime,
+                         calendar_names: Optional[List[str]], timezone: str, include_all_day: bool):
+        tz = freebusy.get_timezone(timezone)
+        start, end = freebusy.from_local(start_date, tz), freebusy.from_local(end_date, tz)
+
+        def compute(session: Session) -> List[dict]:
+            busy = self._busy_intervals(session, start, end, calendar_names, tz, include_all_day)
+            return [{"start": freebusy.to_local(s, tz).isoformat(), "end": freebusy.to_local(e, tz).isoformat()}
+                    for s, e in busy]
+
+        key = ("get_free_busy", start_date, end_date, _names_key(calendar_names), timezone, include_all_day)
+        return key, calendar_names, self._busy_window(start, end), compute
+
+    def find_free_slots(self, start_date: datetime.datetime, end_date: datetime.datetime, duration_minutes: int,
+                        calendar_names: Optional[List[str]] = None, timezone: str = "UTC",
+                        working_hours: Optional[tuple] = None, working_days=freebusy.DEFAULT_WORKING_DAYS,
+                        include_all_day: bool = False, limit: int = FREE_SLOT_LIMIT) -> List[dict]:
+        """Free gaps of at least duration_minutes, optionally only within working
+        hours (a (start, end) pair of datetime.time in timezone) on working_days."""
+        return self._read(*self._free_slots_query(start_date, end_date, duration_minutes, calendar_names, timezone,
+                                                  working_hours, working_days, include_all_day, limit))
+
+    async def find_free_slots_async(self, start_date: datetime.datetime, end_date: datetime.datetime,
+                                    duration_minutes: int, calendar_names: Optional[List[str]] = None,
+                                    timezone: str = "UTC", working_hours: Optional[tuple] = None,
+                                    working_days=freebusy.DEFAULT_WORKING_DAYS, include_all_day: bool = False,
+                                    limit: int = FREE_SLOT_LIMIT) -> List[dict]:
+        return await self._read_async(*self._free_slots_query(start_date, end_date, duration_minutes, calendar_names,
+                                                              timezone, working_hours, working_days, include_all_day,
+                                                              limit))
+
+    def _free_slots_query(self, start_date: datetime.datetime, end_date: datetime.datetime, duration_minutes: int,
+                          calendar_names: Optional[List[str]], timezone: str, working_hours: Optional[tuple],
+                          working_days, include_all_day: bool, limit: int):
+        if duration_minutes <= 0:
+            raise ValueError("duration_minutes must be positive")
+        tz = freebusy.get_timezone(timezone)
+        start, end = freebusy.from_local(start_date, tz), freebusy.from_local(end_date, tz)
+        day_start, day_end = working_hours or (None, None)
+
+        def compute(session: Session) -> List[dict]:
+            busy = self._busy_intervals(session, start, end, calendar_names, tz, include_all_day)
+            windows = freebusy.working_windows(start, end, tz, day_start, day_end, working_days)
+            slots = freebusy.free_slots(busy, windows, datetime.timedelta(minutes=duration_minutes), limit)
+            return [{"start": freebusy.to_local(s, tz).isoformat(), "end": freebusy.to_local(e, tz).isoformat()}
+                    for s, e in slots]
+
+        key = ("find_free_slots", start_date, end_date, duration_minutes, _names_key(calendar_names), timezone,
+               None if working_hours is None else tuple(working_hours), tuple(working_days), include_all_day, limit)
+        return key, calendar_names, self._busy_window(start, end), compute
+
+    @staticmethod
+    def _busy_window(start: datetime.datetime, end: datetime.datetime) -> tuple:
+        # All-day events are floating: widen the lookup so a day in any
+        # timezone offset is still found, then place it in tz
+        return start - datetime.timedelta(days=1), end + datetime.timedelta(days=1)
+
+    def _busy_intervals(self, session: Session, start: datetime.datetime, end: datetime.datetime,
+                        calendar_names: Optional[List[str]], tz, include_all_day: bool) -> List[freebusy.Interval]:
+        """Merged, clipped busy intervals (UTC-naive) inside [start, end)."""
+        query_start, query_end = self._busy_window(start, end)
+        single = session.query(Event.start, Event.end, Event.all_day).join(Calendar).filter(
+            Event.id.in_(overlapping_event_ids(query_start, query_end)),
+            Event.recurring.is_(False),
+            Event.transparent.is_(False),
+        )
+        occurrences = session.query(Occurrence.start, Occurrence.end, Event.all_day).join(Event).join(Calendar).filter(
+            Occurrence.id.in_(overlapping_occurrence_ids(query_start, query_end)),
+            Event.transparent.is_(False),
+        )
+        if not include_all_day:
+            single = single.filter(Event.all_day.is_(False))
+            occurrences = occurrences.filter(Event.all_day.is_(False))
+        if calendar_names:
+            single = single.filter(Calendar.name.in_(calendar_names))
+            occurrences = occurrences.filter(Calendar.name.in_(calendar_names))
+        intervals = []
+        for s, e, all_day in single.union_all(occurrences):
+            if all_day:
+                s, e = freebusy.from_local(s, tz), freebusy.from_local(e, tz)
+            if e > s:
+                intervals.append((s, e))
+        return freebusy.merge_intervals(freebusy.clip(intervals, start, end))
+
+    def _read(self, key: tuple, calendar_names: Optional[List[str]], window: Optional[tuple], compute):
+        self._catch_up()
+        calendar_ids = self._calendar_ids(calendar_names)
+
+        def run():
+            if window is not None:
+                self._ensure_expanded(*window)
+            session = self.db.ReadSessionLocal()
+            try:
+                return compute(session)
+            finally:
+                session.close()
+        return self.cache.get_or_compute(key, calendar_ids, run)
+
+    async def _read_async(self, key: tuple, calendar_names: Optional[List[str]], window: Optional[tuple], compute):
+        self._catch_up()
+        calendar_ids = await self._calendar_ids_async(calendar_names)
+        hit, value, stamp = self.cache.lookup(key, calendar_ids)
+        if hit:
+            return value
+        async with self.db.AsyncReadSession() as session:
+            if window is not None:
+                stale = await session.run_sync(self._series_to_expand, *window)
+                if stale:
+                    # Expanding writes, so it goes to the writer engine off the event loop
+                    await asyncio.to_thread(self._expand_series, stale, *window)
+                    # Start a fresh read snapshot that sees the new occurrences
+                    await session.rollback()
+            value = await session.run_sync(compute)
+        self.cache.store(key, stamp, value)
+        return value
+
+    def _calendar_ids(self, names: Optional[List[str]]) -> Optional[List[int]]:
+        """Calendar ids behind names, for stamping cached results; None (all calendars) if names is empty or unknown."""
+        if not names:
+            return None
+        self._catch_up()
+        index = self._calendar_index
+        if index is None:
+            session = self.db.ReadSessionLocal()
+            try:
+                index = self._calendar_index = self._load_calendar_index(session)
+            finally:
+                session.close()
+        return self._ids_in(index, names)
+
+    async def _calendar_ids_async(self, names: Optional[List[str]]) -> Optional[List[int]]:
+        """_calendar_ids for the event loop: a cold index is loaded through the async read pool."""
+        if not names:
+            return None
+        index = self._calendar_index
+        if index is None:
+            async with self.db.AsyncReadSession() as session:
+                index = self._calendar_index = await session.run_sync(self._load_calendar_index)
+        return self._ids_in(index, names)
+
+    @staticmethod
+    def _load_calendar_index(session: Session) -> Dict[str, List[int]]:
+        """Maps each calendar name to the ids of the calendars carrying it."""
+        index = {}
+        for calendar_id, name in session.query(Calendar.id, Calendar.name):
+            index.setdefault(name, []).append(calendar_id)
+        return index
+
+    @staticmethod
+    def _ids_in(index: Dict[str, List[int]], names: List[str]) -> Optional[List[int]]:
+        if any(name not in index for name in names):
+            return None
+        return [calendar_id for name in set(names) for calendar_id in index[name]]
+
+    def _invalidate(self, calendar_ids: Optional[List[int]] = None, calendars_changed: bool = False):
+        """Drops cached reads over the given calendars and tells the change listeners; call after committing."""
+        if calendars_changed:
+            self._calendar_index = None
+        self.cache.bump(calendar_ids)
+        for listener in self.change_listeners:
+            listener(calendar_ids, calendars_changed)
+
+    def catch_up(self):
+        """Drops cached reads over calendars another process changed since the last call.
+
+        Compares the calendars' generations with the ones seen last time, which
+        is only needed when SQLite's data_version says someone else committed.
+        """
+        version = self.db.data_version()
+        if version is None or version == self._data_version:
+            return
+        with self._catch_up_lock:
+            if version == self._data_version:
+                return
+            session = self.db.ReadSessionLocal()
+            try:
+                generations = {calendar_id: (name, generation) for calendar_id, name, generation
+                               in session.query(Calendar.id, Calendar.name, Calendar.generation)}
+            finally:
+                session.close()
+            previous, self._generations, self._data_version = self._generations, generations, version
+        calendars_changed = {(i, name) for i, (name, _) in generations.items()} != \
+            {(i, name) for i, (name, _) in previous.items()}
+        changed = [i for i, value in generations.items() if previous.get(i) != value]
+        if calendars_changed:
+            self._invalidate(calendars_changed=True)
+        elif changed:
+            self._invalidate(changed)
+
+    def _catch_up(self):
+        if self.shared:
+            self.catch_up()
+
+    @staticmethod
+    def _default_horizon():
+        now = datetime.datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        return now - OCCURRENCE_LOOKBACK, now + OCCURRENCE_HORIZON
+
+    def _ensure_expanded(self, start_date: datetime.datetime, end_date: datetime.datetime):
+        """Re-expands recurring series whose materialized occurrences do not cover the window."""
+        session = self.db.ReadSessionLocal()
+        try:
+            stale = self._series_to_expand(session, start_date, end_date)
         finally:
             session.close()
+        if stale:
+            self._expand_series(stale, start_date, end_date)
+
+    @staticmethod
+    def _expansion_window(event_start, event_end, start_date: datetime.datetime) -> datetime.datetime:
+        # A day of slack catches occurrences that began before the window and still run
+        return start_date - max(event_end - event_start, datetime.timedelta(days=1))
 
-    def list_events(self, start_date: datetime.datetime, end_date: datetime.datetime, calendar_name: Optional[str] = None) -> List[dict]:
-        session = SessionLocal()
+    def _series_to_expand(self, session: Session, start_date: datetime.datetime, end_date: datetime.datetime) -> List[int]:
+        """Ids of recurring series whose occurrences do not cover the window; only reads."""
+        slack = datetime.timedelta(days=1)
+        candidates = session.query(Event.id, Event.start, Event.end, Event.expanded_from, Event.expanded_until).filter(
+            Event.recurring.is_(True),
+            Event.start < end_date,
+            or_(Event.expanded_until < end_date, Event.expanded_from > start_date - slack),
+        )
+        stale = []
+        for id_, start, end, expanded_from, expanded_until in candidates:
+            window_from = self._expansion_window(start, end, start_date)
+            if expanded_from > window_from:
+                stale.append(id_)
+            elif expanded_until < end_date and not self._hit_limit(session, id_, window_from):
+                stale.append(id_)
+        return stale
+
+    @staticmethod
+    def _hit_limit(session: Session, event_id: int, window_from: datetime.datetime) -> bool:
+        """Whether the series already holds MAX_OCCURRENCES from window_from, so expanding again cannot get further."""
+        count = session.query(func.count(Occurrence.id)).filter(
+            Occurrence.event_id == event_id,
+            Occurrence.recurrence_id >= window_from,
+        ).scalar()
+        return count >= recurrence.MAX_OCCURRENCES
+
+    def _expand_series(self, event_ids: List[int], start_date: datetime.datetime, end_date: datetime.datetime):
+        """Re-expands the given series over the window on the writer engine.
+
+        Coverage is grown to the union of old and requested range while that
+        stays under OCCURRENCE_MAX_SPAN, otherwise it moves to the requested
+        range, so each series keeps a bounded number of rows. If the union
+        runs into MAX_OCCURRENCES before the window ends, the requested range
+        is expanded instead.
+        """
+        session = self.db.SessionLocal()
         try:
-            query = session.query(Event).join(Calendar).filter(
-                Event.start >= start_date,
-                Event.start <= end_date
-            )
-            
-            if calendar_name:
-                query = query.filter(Calendar.name == calendar_name)
-                
-            events = query.all()
-            return [{
-                "uid": e.uid,
-                "summary": e.summary,
-                "description": e.description,
-                "start": e.start.isoformat(),
-                "end": e.end.isoformat(),
-                "location": e.location,
-                "calendar": e.calendar.name
-            } for e in events]
+            for event in session.query(Event).filter(Event.id.in_(event_ids)):
+                window_from = self._expansion_window(event.start, event.end, start_date)
+                # Another reader may have expanded it in the meantime
+                if event.expanded_from <= window_from and event.expanded_until >= end_date:
+                    continue
+                window_until = end_date + datetime.timedelta(days=30)
+                union_from = min(window_from, event.expanded_from)
+                union_until = max(window_until, event.expanded_until)
+                expanded = None
+                if union_until - union_from <= OCCURRENCE_MAX_SPAN:
+                    expanded = recurrence.expand(event.ics, event.uid, union_from, union_until)
+                if expanded is None or expanded[2] < end_date:
+                    expanded = recurrence.expand(event.ics, event.uid, window_from, window_until)
+                occurrences, event.expanded_from, event.expanded_until = expanded
+                session.query(Occurrence).filter(Occurrence.event_id == event.id).delete(synchronize_session=False)
+                if occurrences:
+                    session.execute(insert(Occurrence), [dict(row, event_id=event.id) for row in occurrences])
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
         finally:
             session.close()
 
-    def create_event(self, calendar_name: str, summary: str, start: datetime.datetime, end: datetime.datetime, description: str = "", location: str = ""):
-        # Create on server first
-        cal = self._get_dav_calendar(calendar_name)
-        if not cal:
+    def create_event(self, calendar_name: str, summary: str, start: datetime.datetime, end: datetime.datetime, description: str = "", location: str = "") -> str:
+        """Creates the event on the server, then writes it straight into the local DB.
+
+        Returns the new event's UID.
+        """
+        calendar_url = self._calendar_urls([calendar_name]).get(calendar_name)
+        if calendar_url is None:
             raise ValueError(f"Calendar '{calendar_name}' not found on server")
 
-        cal.save_event(
-            dtstart=start,
-            dtend=end,
-            summary=summary,
-            description=description,
-            location=location
+        uid = str(uuid.uuid4())
+        ical_data = self._build_ics(uid, summary, start, end, description, location)
+        href = webdav.normalize_href(calendar_url, f"{uid}.ics")
+        response = self._dav_client().put(
+            self._object_url(calendar_url, f"{uid}.ics"),
+            ical_data,
+            {"Content-Type": "text/calendar; charset=utf-8", "If-None-Match": "*"},
         )
-        
-        # Trigger sync to update local DB
-        self.sync()
+        if response.status >= 400:
+            raise caldav_error.PutError(f"Creating event failed with HTTP {response.status}")
+
+        # Apply the confirmed write locally instead of re-syncing every calendar
+        etag = response.headers.get("ETag")
+        self._write_through({calendar_url: lambda calendar_id: self._changes_for_objects(calendar_id, [(href, etag, ical_data)])})
+        return uid
 
     def delete_event(self, calendar_name: str, uid: str):
-        cal = self._get_dav_calendar(calendar_name)
-        if not cal:
+        """Deletes the event on the server, then drops the local row.
+
+        An event in the local DB takes one conditional DELETE (see _delete_object).
+        """
+        calendar_url = self._calendar_urls([calendar_name]).get(calendar_name)
+        if calendar_url is None:
             raise ValueError(f"Calendar '{calendar_name}' not found on server")
 
-        event = cal.event_by_uid(uid)
-        event.delete()
-        
-        # Trigger sync
-        self.sync()
-
-    def _get_dav_calendar(self, name: str):
-        calendars = self.principal.calendars()
-        for cal in calendars:
-            if cal.name == name:
-                return cal
-        return None
+        stored = self._stored_objects([calendar_url], [uid]).get((calendar_url, uid))
+        found = self._delete_object(calendar_url, uid, stored)
+
+        # Drop the local row right away; the server already confirmed the DELETE (or no longer has the event)
+        if found or stored is not None:
+            self._write_through({calendar_url: lambda calendar_id: self._changes_for_removal(calendar_id, [uid])})
+        if not found:
+            raise ValueError(f"Event '{uid}' not found in calendar '{calendar_name}'")
+
+    @staticmethod
+    def _build_ics(uid: str, summary: str, start: datetime.datetime, end: datetime.datetime, description: str, location: str) -> str:
+        event = icalendar.Event()
+        event.add('uid', uid)
+        event.add('dtstamp', datetime.datetime.now(pytz.UTC))
+        event.add('dtstart', start)
+        event.add('dtend', end)
+        event.add('summary', summary)
+        if description:
+            event.add('description', description)
+        if location:
+            event.add('location', location)
+        cal_obj = icalendar.Calendar()
+        cal_obj.add('prodid', '-//fast-calendar-mcp//EN')
+        cal_obj.add('version', '2.0')
+        cal_obj.add_component(event)
+        return cal_obj.to_ical().decode("utf-8")
+
+    def create_events(self, items: List[dict]) -> List[dict]:
+        """Creates many events: local calendar lookups, concurrent PUTs, one local transaction.
+
+        Each item has calendar_name, summary, start and end (datetime or ISO
+        string) and optionally description and location. Returns one status per
+        item, in order: {"status": "created", "uid": ...} or {"status": "error",
+        "error": ...}; a failing item does not affect the others.
+        """
+        self._check_batch(items)
+        results: List[dict] = [{} for _ in items]
+        calendar_urls = self._calendar_urls(item.get("calendar_name") for item in items if isinstance(item, dict))
+        puts = []
+        for i, item in enumerate(items):
+            try:
+                calendar_url = calendar_urls.get(item["calendar_name"])
+                if calendar_url is None:
+                    raise ValueError(f"Calendar '{item['calendar_name']}' not found on server")
+                uid = str(uuid.uuid4())
+                ical_data = self._build_ics(uid, item["summary"], _as_datetime(item["start"]), _as_datetime(item["end"]),
+                                            item.get("description", ""), item.get("location", ""))
+                puts.append((i, calendar_url, uid, ical_data))
+            except (KeyError, TypeError, ValueError) as e:
+                results[i] = {"status": "error", "error": _describe(e)}
+
+        def put(calendar_url: str, uid: str, ical_data: str):
+            response = self._dav_client().put(
+                self._object_url(calendar_url, f"{uid}.ics"),
+                ical_data,
+                {"Content-Type": "text/calendar; charset=utf-8", "If-None-Match": "*"},
+            )
+            if response.status >= 400:
+                raise caldav_error.PutError(f"Creating event failed with HTTP {response.status}")
+            return response.headers.get("ETag")
+
+        created: Dict[str, list] = {}
+        for (i, calendar_url, uid, ical_data), outcome in zip(puts, self._run_batch(put, [p[1:] for p in puts])):
+            if isinstance(outcome, Exception):
+                results[i] = {"status": "error", "error": _describe(outcome)}
+            else:
+                results[i] = {"status": "created", "uid": uid}
+                href = webdav.normalize_href(calendar_url, f"{uid}.ics")
+                created.setdefault(calendar_url, []).append((href, outcome, ical_data))
+
+        if created:
+            self._write_through({
+                url: (lambda calendar_id, objects=objects: self._changes_for_objects(calendar_id, objects))
+                for url, objects in created.items()
+            })
+        return results
+
+    def delete_events(self, items: List[dict]) -> List[dict]:
+        """Deletes many events by calendar_name and uid with concurrent DELETEs and one local transaction.
+
+        Returns one status per item, in order: "deleted", "not_found" (the
+        server no longer has it; the local copy is dropped too) or "error".
+        """
+        self._check_batch(items)
+        results: List[dict] = [{} for _ in items]
+        calendar_urls = self._calendar_urls(item.get("calendar_name") for item in items if isinstance(item, dict))
+        stored = self._stored_objects(list(calendar_urls.values()),
+                                      [item["uid"] for item in items if isinstance(item, dict) and "uid" in item])
+        deletes = []
+        for i, item in enumerate(items):
+            try:
+                calendar_url = calendar_urls.get(item["calendar_name"])
+                if calendar_url is None:
+                    raise ValueError(f"Calendar '{item['calendar_name']}' not found on server")
+                deletes.append((i, calendar_url, item["uid"], stored.get((calendar_url, item["uid"]))))
+            except (KeyError, TypeError, ValueError) as e:
+                results[i] = {"status": "error", "error": _describe(e)}
+
+        removed: Dict[str, list] = {}
+        for (i, calendar_url, uid, _), outcome in zip(deletes, self._run_batch(self._delete_object, [d[1:] for d in deletes])):
+            if isinstance(outcome, Exception):
+                results[i] = {"status": "error", "uid": uid, "error": _describe(outcome)}
+                continue
+            results[i] = {"status": "deleted" if outcome else "not_found", "uid": uid}
+            removed.setdefault(calendar_url, []).append(uid)
+
+        if removed:
+            self._write_through({
+                url: (lambda calendar_id, uids=uids: self._changes_for_removal(calendar_id, uids))
+                for url, uids in removed.items()
+            })
+        return results
+
+    @staticmethod
+    def _check_batch(items: List[dict]):
+        if len(items) > BATCH_MAX_ITEMS:
+            raise ValueError(f"At most {BATCH_MAX_ITEMS} items per batch")
+
+    def _calendar_urls(self, names) -> Dict[str, str]:
+        """Calendar name -> URL from the local calendars table.
+
+        Only names it does not know (calendars added since the last sync) cost
+        a server listing.
+        """
+        names = {name for name in names if isinstance(name, str)}
+        urls: Dict[str, str] = {}
+        if not names:
+            return urls
+        session = self.db.ReadSessionLocal()
+        try:
+            for name, url in session.query(Calendar.name, Calendar.url).filter(Calendar.name.in_(names)).order_by(Calendar.id):
+                urls.setdefault(name, url)
+        finally:
+            session.close()
+        if names - set(urls):
+            for cal in self._server_calendars():
+                if cal.name in names:
+                    urls.setdefault(cal.name, str(cal.url))
+        return urls
+
+    def _stored_objects(self, urls: List[str], uids: List[str]) -> Dict[tuple, Tuple[str, Optional[str]]]:
+        """(calendar url, uid) -> stored (href, etag) for the events that are in the local DB."""
+        objects = {}
+        if not urls or not uids:
+            return objects
+        session = self.db.ReadSessionLocal()
+        try:
+            for i in range(0, len(uids), DELETE_CHUNK_SIZE):
+                rows = session.query(Calendar.url, Event.uid, Event.href, Event.etag).join(Calendar).filter(
+                    Calendar.url.in_(urls), Event.uid.in_(uids[i:i + DELETE_CHUNK_SIZE]), Event.href.isnot(None)
+                )
+                objects.update({(url, uid): (href, etag) for url, uid, href, etag in rows})
+        finally:
+            session.close()
+        return objects
+
+    @staticmethod
+    def _object_url(calendar_url: str, href: str) -> str:
+        return str(caldav.lib.url.URL.objectify(calendar_url).join(href))
+
+    def _delete_object(self, calendar_url: str, uid: str, stored: Optional[Tuple[str, Optional[str]]]) -> bool:
+        """DELETEs the event; False if the server does not have it.
+
+        With a stored (href, etag) that is one request, conditional on the
+        ETag so a copy the server changed since the last sync is noticed. Only
+        then (412), if the href is gone (404) or without a stored copy is the
+        UID looked up on the server, and its current href deleted.
+        """
+        client = self._dav_client()
+        if stored is not None:
+            href, etag = stored
+            response = client.request(self._object_url(calendar_url, href), "DELETE", "", {"If-Match": etag} if etag else {})
+            if response.status not in (404, 412):
+                if response.status >= 400:
+                    raise caldav_error.DeleteError(f"Deleting event failed with HTTP {response.status}")
+                return True
+        try:
+            href = str(client.calendar(url=calendar_url).event_by_uid(uid).url)
+        except caldav_error.NotFoundError:
+            return False
+        response = client.delete(self._object_url(calendar_url, href))
+        if response.status == 404:
+            return False
+        if response.status >= 400:
+            raise caldav_error.DeleteError(f"Deleting event failed with HTTP {response.status}")
+        return True
+
+    def _run_batch(self, fn, args_list: List[tuple]) -> list:
+        """Runs fn over args_list with bounded parallelism; each result is the return value or the exception."""
+        def call(args):
+            try:
+                return fn(*args)
+            except Exception as e:
+                return e
+        if not args_list:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.write_concurrency, len(args_list)),
+                                thread_name_prefix="caldav-write") as pool:
+            return list(pool.map(call, args_list))
+
+    def _changes_for_objects(self, calendar_id: int, objects: List[tuple]) -> CalendarChanges:
+        """Changes for (href, etag, ics) objects the server just accepted."""
+        changes = CalendarChanges(calendar_id=calendar_id)
+        self._collect_objects(changes, objects, self._known_objects(calendar_id, [href for href, _, _ in objects]))
+        return changes
+
+    def _changes_for_removal(self, calendar_id: int, uids: List[str]) -> CalendarChanges:
+        changes = CalendarChanges(calendar_id=calendar_id)
+        session = self.db.SessionLocal()
+        try:
+            for i in range(0, len(uids), DELETE_CHUNK_SIZE):
+                changes.stale_ids += [event_id for (event_id,) in session.query(Event.id).filter(
+                    Event.calendar_id == calendar_id, Event.uid.in_(uids[i:i + DELETE_CHUNK_SIZE]))]
+        finally:
+            session.close()
+        return changes
+
+    def _write_through(self, builds: Dict[str, Callable[[int], CalendarChanges]]):
+        """Applies confirmed server writes to the local DB in one transaction and
+        reconciles the touched calendars in the background.
+
+        builds maps each calendar URL to a function building its changes from
+        the local calendar id.
+        """
+        session = self.db.SessionLocal()
+        calendar_ids: Optional[List[int]] = []
+        try:
+            known = dict(session.query(Calendar.url, Calendar.id).filter(Calendar.url.in_(list(builds))))
+            stats = {"fetched": 0, "parsed": 0, "skipped": 0, "deleted": 0}
+            for url, build_changes in builds.items():
+                if url in known:
+                    self._write_changes(session, build_changes(known[url]), stats)
+                    calendar_ids.append(known[url])
+            session.commit()
+            self._invalidate(calendar_ids)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        # A calendar we have never synced needs a full sync
+        self._schedule_reconcile(calendar_ids if len(calendar_ids) == len(builds) else None)
+
+    def _schedule_reconcile(self, calendar_ids: Optional[List[int]]):
+        """Catches up with anything else that changed on the touched calendars, off the request path.
+
+        None falls back to a full sync. Like SyncScheduler, requests made
+        while a reconcile runs are merged into the single next one, which
+        starts after this call.
+        """
+        with self._reconcile_lock:
+            if calendar_ids is None or self._reconcile_pending is None:
+                self._reconcile_pending = None
+            else:
+                self._reconcile_pending.update(calendar_ids)
+            if self._reconciling:
+                return
+            self._reconciling = True
+            self._reconcile_thread = threading.Thread(target=self._run_reconciles, name="caldav-reconcile", daemon=True)
+            self._reconcile_thread.start()
+
+    def _run_reconciles(self):
+        """Reconciles the pending calendars until none are left; the thread's whole life."""
+        while True:
+            with self._reconcile_lock:
+                pending = self._reconcile_pending
+                if pending is not None and not pending:
+                    self._reconciling = False
+                    return
+                self._reconcile_pending = set()
+            self._reconcile(None if pending is None else sorted(pending))
+
+    def _reconcile(self, calendar_ids: Optional[List[int]]):
+        try:
+            if calendar_ids is None:
+                self.sync()
+                return
+            with self._sync_lock:
+                session = self.db.SessionLocal()
+                try:
+                    jobs = [(c.id, c.name, c.url, c.sync_token)
+                            for c in session.query(Calendar).filter(Calendar.id.in_(calendar_ids))]
+                    stats = {"calendars": 0, "fetched": 0, "parsed": 0, "skipped": 0, "deleted": 0, "failed": []}
+                    self._sync_calendars(session, jobs, stats)
+                finally:
+                    session.close()
+        except Exception as e:
+            print(f"Background reconcile failed: {e}")
@@ -1,7 +1,20 @@
+import asyncio
+import contextlib
 import datetime
+import sqlite3
+import threading
+import time
 from typing import Optional
-from sqlalchemy import String, DateTime, ForeignKey, Text, create_engine
+from sqlalchemy import DDL, String, DateTime, ForeignKey, Text, UniqueConstraint, column, create_engine, event, func, literal_column, select, table, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, sessionmaker
+from src import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
 class Base(DeclarativeBase):
     pass
@@ -12,35 +25,344 @@ class Calendar(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(255))
     url: Mapped[str] = mapped_column(String(1024), unique=True)
+    sync_token: Mapped[Optional[str]] = mapped_column(String(1024))
+    # Bumped with every commit that changes the calendar's events, so other
+    # worker processes sharing the database know which cached reads are stale
+    generation: Mapped[int] = mapped_column(default=0)
     
     events: Mapped[list["Event"]] = relationship(back_populates="calendar", cascade="all, delete-orphan")
 
     def __repr__(self) -> str:
         return f"Calendar(id={self.id!r}, name={self.name!r})"
 
+class Discovery(Base):
+    """Principal and calendar-home URLs found for a server account, so startup can skip discovery."""
+    __tablename__ = "discovery"
+    __table_args__ = (UniqueConstraint("base_url", "username"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    base_url: Mapped[str] = mapped_column(String(1024))
+    username: Mapped[str] = mapped_column(String(255))
+    principal_url: Mapped[str] = mapped_column(String(1024))
+    calendar_home_url: Mapped[str] = mapped_column(String(1024))
+
+    def __repr__(self) -> str:
+        return f"Discovery(base_url={self.base_url!r}, calendar_home_url={self.calendar_home_url!r})"
+
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (UniqueConstraint("calendar_id", "uid"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     calendar_id: Mapped[int] = mapped_column(ForeignKey("calendars.id"))
-    uid: Mapped[str] = mapped_column(String(255), index=True)
+    uid: Mapped[str] = mapped_column(String(255))
+    href: Mapped[Optional[str]] = mapped_column(String(1024), index=True)
+    etag: Mapped[Optional[str]] = mapped_column(String(255))
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64))
     summary: Mapped[Optional[str]] = mapped_column(String(255))
     description: Mapped[Optional[str]] = mapped_column(Text)
     start: Mapped[datetime.datetime] = mapped_column(DateTime)
     end: Mapped[datetime.datetime] = mapped_column(DateTime)
     location: Mapped[Optional[str]] = mapped_column(String(255))
+    # Free/busy: all-day events are stored as floating UTC midnights, and
+    # transparent ones (TRANSP:TRANSPARENT or cancelled) never block time
+    all_day: Mapped[bool] = mapped_column(default=False)
+    transparent: Mapped[bool] = mapped_column(default=False)
+    # Recurring series keep their raw iCalendar object so the occurrence
+    # horizon can be extended later without a server round-trip
+    recurring: Mapped[bool] = mapped_column(default=False, index=True)
+    ics: Mapped[Optional[str]] = mapped_column(Text)
+    expanded_from: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime)
+    expanded_until: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime)
+    # Mark of the last full server listing that included the event, so a
+    # listing is applied chunk by chunk (see CalendarChanges.listing)
+    listing: Mapped[Optional[int]] = mapped_column()
 
     calendar: Mapped["Calendar"] = relationship(back_populates="events")
 
     def __repr__(self) -> str:
         return f"Event(id={self.id!r}, summary={self.summary!r}, start={self.start!r})"
 
+class Occurrence(Base):
+    """One materialized instance of a recurring series.
+
+    Override columns are NULL unless a RECURRENCE-ID component changed them,
+    in which case they win over the master's values.
+    """
+    __tablename__ = "occurrences"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    event_id: Mapped[int] = mapped_column(ForeignKey("events.id"), index=True)
+    recurrence_id: Mapped[datetime.datetime] = mapped_column(DateTime)
+    start: Mapped[datetime.datetime] = mapped_column(DateTime)
+    end: Mapped[datetime.datetime] = mapped_column(DateTime)
+    summary: Mapped[Optional[str]] = mapped_column(String(255))
+    description: Mapped[Optional[str]] = mapped_column(Text)
+    location: Mapped[Optional[str]] = mapped_column(String(255))
+
+    event: Mapped["Event"] = relationship()
+
+    def __repr__(self) -> str:
+        return f"Occurrence(id={self.id!r}, event_id={self.event_id!r}, start={self.start!r})"
+
+# Interval indexes: a SQLite R*Tree per table keyed by its id holding
+# [start, end] in minutes since the epoch, kept in step by triggers so every
+# write path (ORM, bulk upserts, deletes) maintains it. R*Tree stores 32-bit
+# floats and rounds boxes outwards, so it is a conservative pre-filter and
+# callers still compare the exact columns.
+events_rtree = table("events_rtree", column("id"), column("start_minute"), column("end_minute"))
+occurrences_rtree = table("occurrences_rtree", column("id"), column("start_minute"), column("end_minute"))
+
+# DDL() applies %-formatting, hence the doubled %%
+_NEW_START = "strftime('%%s', NEW.start) / 60.0"
+_NEW_END = "max(strftime('%%s', NEW.start), strftime('%%s', NEW.\"end\")) / 60.0"
+
+def _interval_index(source, index):
+    for statement in (
+        f"CREATE VIRTUAL TABLE {index.name} USING rtree(id, start_minute, end_minute)",
+        f"CREATE TRIGGER {index.name}_insert AFTER INSERT ON {source.name} BEGIN "
+        f"INSERT INTO {index.name} VALUES (NEW.id, {_NEW_START}, {_NEW_END}); END",
+        f"CREATE TRIGGER {index.name}_update AFTER UPDATE OF start, \"end\" ON {source.name} BEGIN "
+        f"UPDATE {index.name} SET start_minute = {_NEW_START}, end_minute = {_NEW_END} WHERE id = NEW.id; END",
+        f"CREATE TRIGGER {index.name}_delete AFTER DELETE ON {source.name} BEGIN "
+        f"DELETE FROM {index.name} WHERE id = OLD.id; END",
+    ):
+        event.listen(source, "after_create", DDL(statement))
+    event.listen(source, "after_drop", DDL(f"DROP TABLE IF EXISTS {index.name}"))
+
+_interval_index(Event.__table__, events_rtree)
+_interval_index(Occurrence.__table__, occurrences_rtree)
+
+# Occurrences go with their series, and are invalidated when its content changes
+for statement in (
+    "CREATE TRIGGER occurrences_event_delete AFTER DELETE ON events BEGIN "
+    "DELETE FROM occurrences WHERE event_id = OLD.id; END",
+    "CREATE TRIGGER occurrences_event_update AFTER UPDATE OF content_hash ON events "
+    "WHEN OLD.content_hash IS NOT NEW.content_hash BEGIN "
+    "DELETE FROM occurrences WHERE event_id = NEW.id; END",
+):
+    event.listen(Occurrence.__table__, "after_create", DDL(statement))
+
+# Full-text index over the searchable event fields: an external-content FTS5
+# table (it stores only the index, the text stays in events) kept in step by
+# triggers, like the interval indexes above
+events_fts = table("events_fts", column("rowid"))
+_FTS_COLUMNS = "summary, description, location"
+
+for statement in (
+    f"CREATE VIRTUAL TABLE events_fts USING fts5({_FTS_COLUMNS}, content='events', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER events_fts_insert AFTER INSERT ON events BEGIN "
+    f"INSERT INTO events_fts(rowid, {_FTS_COLUMNS}) VALUES (NEW.id, NEW.summary, NEW.description, NEW.location); END",
+    f"CREATE TRIGGER events_fts_update AFTER UPDATE OF {_FTS_COLUMNS} ON events BEGIN "
+    f"INSERT INTO events_fts(events_fts, rowid, {_FTS_COLUMNS}) "
+    "VALUES ('delete', OLD.id, OLD.summary, OLD.description, OLD.location); "
+    f"INSERT INTO events_fts(rowid, {_FTS_COLUMNS}) VALUES (NEW.id, NEW.summary, NEW.description, NEW.location); END",
+    f"CREATE TRIGGER events_fts_delete AFTER DELETE ON events BEGIN "
+    f"INSERT INTO events_fts(events_fts, rowid, {_FTS_COLUMNS}) "
+    "VALUES ('delete', OLD.id, OLD.summary, OLD.description, OLD.location); END",
+):
+    event.listen(Event.__table__, "after_create", DDL(statement))
+event.listen(Event.__table__, "after_drop", DDL("DROP TABLE IF EXISTS events_fts"))
+
+# BM25 column weights for summary, description and location: a hit in the
+# title says more about an event than one in a long description
+FTS_WEIGHTS = (10.0, 1.0, 5.0)
+
+def fts_query(text_query: str) -> str:
+    """Turns free text into an FTS5 query matching all terms.
+
+    Each term is quoted so punctuation cannot produce FTS5 syntax errors; a
+    trailing * is kept outside the quotes as a prefix search.
+    """
+    terms = []
+    for term in text_query.split():
+        prefix = term.endswith("*")
+        term = term.rstrip("*")
+        if term:
+            terms.append('"' + term.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+def matching_events(text_query: str):
+    """Subquery of (id, rank) for events matching text_query; lower rank is a better match."""
+    fts = literal_column("events_fts")
+    return select(
+        events_fts.c.rowid.label("id"), func.bm25(fts, *FTS_WEIGHTS).label("rank"),
+    ).where(fts.op("MATCH")(fts_query(text_query))).subquery()
+
+def _overlapping_ids(index, start: datetime.datetime, end: datetime.datetime):
+    epoch = datetime.datetime(1970, 1, 1)
+    return select(index.c.id).where(
+        index.c.start_minute <= (end - epoch).total_seconds() / 60,
+        index.c.end_minute >= (start - epoch).total_seconds() / 60,
+    )
+
+def overlapping_event_ids(start: datetime.datetime, end: datetime.datetime):
+    """Subquery of event ids whose [start, end] may intersect the window, answered by the R*Tree."""
+    return _overlapping_ids(events_rtree, start, end)
+
+def overlapping_occurrence_ids(start: datetime.datetime, end: datetime.datetime):
+    """Subquery of occurrence ids whose [start, end] may intersect the window, answered by the R*Tree."""
+    return _overlapping_ids(occurrences_rtree, start, end)
+
 # Database setup
 import os
-os.makedirs("data", exist_ok=True)
-DATABASE_URL = "sqlite:///./data/calendar.db"
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/calendar.db")
+if DATABASE_URL == "sqlite:///./data/calendar.db":
+    os.makedirs("data", exist_ok=True)
+
+# Read connections kept per pool (sync and async each)
+READ_POOL_SIZE = int(os.getenv("DATABASE_READ_POOL_SIZE", "8"))
+
+# Applied to every SQLite connection: WAL lets readers run while a sync is
+# writing, and NORMAL synchronous is safe in WAL mode (a crash can only lose
+# the last commits of what is a cache anyway)
+SQLITE_PRAGMAS = (
+    "journal_mode = WAL",
+    "synchronous = NORMAL",
+    "busy_timeout = 5000",
+)
+# Read connections only: mmap serves reads from the page cache without
+# copying, while on the writer it made a sync's memory grow with the
+# database (see benchmarks/bench_sync_memory.py)
+READ_PRAGMAS = (
+    "mmap_size = 268435456",
+    "query_only = ON",
+)
+
+def _configure_sqlite(target, read_only: bool = False):
+    @event.listens_for(target, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(f"PRAGMA {pragma}")
+        for pragma in READ_PRAGMAS if read_only else ():
+            cursor.execute(f"PRAGMA {pragma}")
+        cursor.close()
+
+# Statement types timed separately in db_query_seconds; anything else is "OTHER"
+TIMED_STATEMENTS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "PRAGMA"}
+
+def _time_queries(target, pool: str):
+    """Feeds every statement's latency into the db_query_seconds histogram."""
+    @event.listens_for(target, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_start = time.perf_counter()
+
+    @event.listens_for(target, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_query_start", None)
+        if start is not None:
+            kind = statement.lstrip()[:6].upper()
+            metrics.DB_QUERY_DURATION.observe(time.perf_counter() - start, pool=pool,
+                                              statement=kind if kind in TIMED_STATEMENTS else "OTHER")
+
+class Database:
+    """Engines and session factories over one database: the default DATABASE_URL or an account's shard."""
+
+    def __init__(self, url: str, read_pool_size: int = READ_POOL_SIZE):
+        self.url = url
+        # The writer engine, used by sync and write paths
+        self.engine = create_engine(url)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+
+        # A separate pool of query-only connections for the read tools, so reads
+        # never queue behind the writer's connection
+        self.read_engine = create_engine(url, pool_size=read_pool_size, max_overflow=read_pool_size)
+        self.ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.read_engine)
+
+        # The same read pool for asyncio callers (aiosqlite), so the MCP server's
+        # read tools do not hop through a worker thread
+        self.async_read_engine = create_async_engine(
+            make_url(url).set(drivername="sqlite+aiosqlite"),
+            pool_size=read_pool_size, max_overflow=read_pool_size,
+        )
+        self.AsyncReadSession = async_sessionmaker(self.async_read_engine, autoflush=False, expire_on_commit=False)
+
+        if make_url(url).get_backend_name() == "sqlite":
+            _configure_sqlite(self.engine)
+            _configure_sqlite(self.read_engine, read_only=True)
+            _configure_sqlite(self.async_read_engine.sync_engine, read_only=True)
+        _time_queries(self.engine, "writer")
+        _time_queries(self.read_engine, "read")
+        _time_queries(self.async_read_engine.sync_engine, "async_read")
+
+        # Connection only asked for PRAGMA data_version (see data_version)
+        self._version_conn: Optional[sqlite3.Connection] = None
+        self._version_lock = threading.Lock()
+
+    @property
+    def path(self) -> Optional[str]:
+        """The SQLite file behind url, or None for other backends and in-memory databases."""
+        url = make_url(self.url)
+        if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+            return None
+        return url.database
+
+    def init(self):
+        """Creates the schema, rebuilding a database written by another SCHEMA_VERSION.
+
+        Worker processes starting together take turns, so only the first one creates tables.
+        """
+        with _file_lock(f"{self.path}.init-lock" if self.path else None):
+            with self.engine.begin() as conn:
+                version = conn.execute(text("PRAGMA user_version")).scalar()
+                if version != SCHEMA_VERSION:
+                    Base.metadata.drop_all(bind=conn)
+            Base.metadata.create_all(bind=self.engine)
+            with self.engine.begin() as conn:
+                conn.execute(text(f"PRAGMA user_version = {SCHEMA_VERSION}"))
+
+    def data_version(self) -> Optional[int]:
+        """SQLite's data_version: changes whenever another connection (or process) commits.
+
+        Cheap enough to ask before every read; None if the database is not a SQLite file.
+        """
+        if self.path is None:
+            return None
+        with self._version_lock:
+            if self._version_conn is None:
+                self._version_conn = sqlite3.connect(self.path, check_same_thread=False)
+            return self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def dispose(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Closes the pooled connections; the engines reconnect if used again.
+
+        aiosqlite connections can only be closed on an event loop, so the async
+        pool is closed on loop, if given.
+        """
+        self.engine.dispose()
+        self.read_engine.dispose()
+        with self._version_lock:
+            if self._version_conn is not None:
+                self._version_conn.close()
+                self._version_conn = None
+        if loop is not None and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self.async_read_engine.dispose(), loop)
+
+@contextlib.contextmanager
+def _file_lock(path: Optional[str]):
+    """Holds an exclusive lock on path across processes; a no-op without a path or fcntl (Windows)."""
+    if path is None or fcntl is None:
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+# Bump whenever the schema changes. The local DB is only a cache of the CalDAV
+# server, so an outdated file is rebuilt and refilled by the next sync.
+SCHEMA_VERSION = 11
+
+# The single-account database; the module-level names below are its engines and factories
+default_db = Database(DATABASE_URL)
+engine, SessionLocal = default_db.engine, default_db.SessionLocal
+read_engine, ReadSessionLocal = default_db.read_engine, default_db.ReadSessionLocal
+async_read_engine, AsyncReadSession = default_db.async_read_engine, default_db.AsyncReadSession
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    default_db.init()
@@ -0,0 +1,99 @@
+"""Busy-time merging and free-slot search over UTC-naive intervals.
+
+Both passes are linear sweeps over intervals sorted by start, so the cost is
+dominated by reading the events of the window from the database.
+"""
+import datetime
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import pytz
+
+Interval = Tuple[datetime.datetime, datetime.datetime]
+
+# Monday..Friday as ISO weekdays
+DEFAULT_WORKING_DAYS = (1, 2, 3, 4, 5)
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Merges overlapping or touching intervals; the input need not be sorted."""
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def clip(intervals: Iterable[Interval], window_start: datetime.datetime, window_end: datetime.datetime) -> List[Interval]:
+    return [(max(start, window_start), min(end, window_end))
+            for start, end in intervals if start < window_end and end > window_start]
+
+
+def working_windows(window_start: datetime.datetime, window_end: datetime.datetime, tz,
+                    day_start: Optional[datetime.time], day_end: Optional[datetime.time],
+                    working_days: Sequence[int] = DEFAULT_WORKING_DAYS) -> List[Interval]:
+    """Returns the working-hour periods inside the UTC window as UTC-naive intervals.
+
+    Hours are wall-clock times in tz, so they follow DST changes. Without
+    working hours the whole window is one period.
+    """
+    if day_start is None or day_end is None:
+        return [(window_start, window_end)]
+    windows = []
+    day = to_local(window_start, tz).date()
+    last = to_local(window_end, tz).date()
+    while day <= last:
+        if day.isoweekday() in working_days:
+            start = from_local(datetime.datetime.combine(day, day_start), tz)
+            end = from_local(datetime.datetime.combine(day, day_end), tz)
+            windows.extend(clip([(start, end)], window_start, window_end))
+        day += datetime.timedelta(days=1)
+    return windows
+
+
+def free_slots(busy: List[Interval], windows: List[Interval], duration: datetime.timedelta,
+               limit: Optional[int] = None) -> List[Interval]:
+    """Gaps of at least duration inside windows not covered by busy.
+
+    busy must be merged (sorted, non-overlapping) and windows sorted; both are
+    walked once.
+    """
+    slots: List[Interval] = []
+    i = 0
+    for window_start, window_end in windows:
+        cursor = window_start
+        # Skip busy blocks that ended before this window
+        while i < len(busy) and busy[i][1] <= window_start:
+            i += 1
+        j = i
+        while j < len(busy) and busy[j][0] < window_end:
+            if busy[j][0] - cursor >= duration:
+                slots.append((cursor, busy[j][0]))
+            cursor = max(cursor, busy[j][1])
+            j += 1
+        if window_end - cursor >= duration:
+            slots.append((cursor, window_end))
+        if limit is not None and len(slots) >= limit:
+            return slots[:limit]
+    return slots
+
+
+def get_timezone(name: str):
+    try:
+        return pytz.timezone(name)
+    except pytz.UnknownTimeZoneError:
+        raise ValueError(f"Unknown timezone: {name}")
+
+
+def from_local(value: datetime.datetime, tz) -> datetime.datetime:
+    """Interprets a naive value as wall-clock time in tz (aware values keep their offset) and returns UTC-naive."""
+    if value.tzinfo is None:
+        value = tz.localize(value)
+    return value.astimezone(pytz.UTC).replace(tzinfo=None)
+
+
+def to_local(value: datetime.datetime, tz) -> datetime.datetime:
+    """Converts a UTC-naive value to an aware datetime in tz."""
+    return pytz.UTC.localize(value).astimezone(tz)
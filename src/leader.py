@@ -0,0 +1,136 @@
+"""Multi-worker mode: one leader process syncs and writes, the others serve reads.
+
+With WEB_CONCURRENCY > 1 (uvicorn's --workers) every worker opens the same
+WAL database. The first to take an exclusive lock on LEADER_DIR/leader.lock
+becomes the leader: it runs the startup and background syncs and every tool
+that writes, which the followers forward to it over a Unix socket
+(LEADER_DIR/leader.sock). Followers answer reads from the shared database and
+catch up with the leader's commits through the calendar generations (see
+CalDAVWrapper.catch_up) before every read, and every FOLLOWER_POLL_INTERVAL
+seconds so their resource subscribers are notified too. The lock goes with
+the leader's process, so if it dies a follower takes over at its next poll.
+
+The one write left to followers is expanding recurring series when a read
+reaches past the materialized occurrences; SQLite's busy_timeout queues it
+behind the leader's commits.
+"""
+import asyncio
+import json
+import os
+import tempfile
+from typing import Awaitable, Callable, Optional
+
+from src.db import default_db
+
+try:
+    import fcntl
+except ImportError:  # Windows: no multi-worker mode, every process leads
+    fcntl = None
+
+# Worker processes started by uvicorn (its --workers option reads the same variable)
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+# Directory of the leader lock and socket; defaults to the database's
+LEADER_DIR = os.getenv("LEADER_DIR") or (
+    os.path.dirname(os.path.abspath(default_db.path)) if default_db.path else tempfile.gettempdir())
+# Seconds between a follower's checks for the leader's commits and attempts to take over
+FOLLOWER_POLL_INTERVAL = float(os.getenv("FOLLOWER_POLL_INTERVAL", "1"))
+
+# Requests and responses are one JSON object per line; tool results stay well below this
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+
+class LeaderElection:
+    def __init__(self, directory: str = LEADER_DIR):
+        self.lock_path = os.path.join(directory, "leader.lock")
+        self.socket_path = os.path.join(directory, "leader.sock")
+        self.is_leader = False
+        self._lock_file = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def try_acquire(self) -> bool:
+        """Whether this process leads, taking the lock if no one holds it; never blocks."""
+        if self.is_leader:
+            return True
+        if fcntl is None:
+            self.is_leader = True
+            return True
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file, self.is_leader = lock_file, True
+        return True
+
+    def release(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+        self.is_leader = False
+
+    async def serve(self, handle: Callable[[dict], Awaitable[dict]]):
+        """Leader only: answers the followers' forwarded requests with handle(request)."""
+        self._server = await serve_json(self.socket_path, handle)
+
+    async def forward(self, request: dict) -> dict:
+        """Follower only: the leader's response to request.
+
+        Raises ConnectionError if no leader is listening, e.g. while a follower takes over.
+        """
+        try:
+            return await request_json(self.socket_path, request)
+        except ConnectionError as e:
+            raise ConnectionError("No leader worker is reachable; try again shortly") from e
+
+
+def worker_socket_path(worker_id: str, directory: str = LEADER_DIR) -> str:
+    """Socket on which a worker accepts messages for its MCP sessions (see src/main.py)."""
+    return os.path.join(directory, f"worker-{worker_id}.sock")
+
+
+async def serve_json(path: str, handle: Callable[[dict], Awaitable[dict]]) -> asyncio.AbstractServer:
+    """Answers each JSON line received on the Unix socket path with handle(request) as a JSON line.
+
+    Errors raised by handle are sent back as {"error": message}.
+    """
+    # A socket file left by a process that died; the caller owns the path
+    if os.path.exists(path):
+        os.unlink(path)
+
+    async def on_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                try:
+                    response = await handle(json.loads(line))
+                except Exception as e:
+                    response = {"error": str(e) or type(e).__name__}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_unix_server(on_connection, path, limit=MAX_MESSAGE_BYTES)
+
+
+async def request_json(path: str, request: dict) -> dict:
+    """The response of the serve_json server on path; ConnectionError if it is not running."""
+    try:
+        reader, writer = await asyncio.open_unix_connection(path, limit=MAX_MESSAGE_BYTES)
+    except (FileNotFoundError, ConnectionRefusedError) as e:
+        raise ConnectionError(f"Nothing is listening on {path}") from e
+    try:
+        writer.write(json.dumps(request).encode() + b"\n")
+        await writer.drain()
+        line = await reader.readline()
+    finally:
+        writer.close()
+    if not line:
+        raise ConnectionError(f"{path} closed the connection")
+    return json.loads(line)
@@ -3,34 +3,110 @@ from starlette.routing import Mount, Route
 from mcp.server.sse import SseServerTransport
 from dotenv import load_dotenv
 
-# Load env vars BEFORE importing mcp_server which initializes CalDAVWrapper
+# Load env vars BEFORE importing mcp_server, whose modules read their configuration from the environment
 load_dotenv()
 
-from src.mcp_server import server, run as mcp_run
+import base64
+import os
 
-sse = SseServerTransport("/messages")
+from src import metrics
+from src.leader import WORKERS, request_json, serve_json, worker_socket_path
+from src.mcp_server import initialization_options, registry, server, session_account, run as mcp_run
 
-from starlette.responses import Response
+# With several workers (WEB_CONCURRENCY) a session's messages can reach any of
+# them, but only the worker that accepted its /sse stream can deliver them: the
+# message endpoint it hands out names that worker, and the others relay to it
+WORKER_ID = str(os.getpid())
+sse = SseServerTransport(f"/messages/{WORKER_ID}/" if WORKERS > 1 else "/messages")
+
+from starlette.responses import PlainTextResponse, Response
 
 async def handle_sse(request):
+    # /sse?account=<id> binds the session to one account in multi-account mode
+    account = request.query_params.get("account")
+    if account is not None and (registry is None or account not in registry.accounts):
+        return PlainTextResponse(f"Unknown account: {account}", status_code=404)
+    session_account.set(account)
     async with sse.connect_sse(request.scope, request.receive, request._send) as streams:
         await server.run(
             streams[0],
             streams[1],
-            server.create_initialization_options()
+            initialization_options()
         )
     return Response(status_code=200)
 
+async def handle_metrics(request):
+    """Prometheus text exposition of tool, sync and DB timings (see src/metrics.py)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+async def handle_messages(scope, receive, send):
+    """Multi-worker mode: delivers a message here or relays it to the worker holding its session."""
+    worker = scope["path"].rstrip("/").rsplit("/", 1)[-1]
+    if worker == WORKER_ID:
+        return await sse.handle_post_message(scope, receive, send)
+    body, more_body = b"", True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    try:
+        if not worker.isdigit():
+            raise ConnectionError(worker)
+        response = await request_json(worker_socket_path(worker), {
+            "method": scope["method"],
+            "path": scope["path"],
+            "query_string": scope["query_string"].decode("latin-1"),
+            "headers": [[key.decode("latin-1"), value.decode("latin-1")] for key, value in scope["headers"]],
+            "body": base64.b64encode(body).decode(),
+        })
+    except ConnectionError:
+        # That worker, and with it the session, is gone
+        return await PlainTextResponse("Could not find session", status_code=404)(scope, receive, send)
+    await Response(base64.b64decode(response["body"]), status_code=response["status"],
+                   media_type=response.get("media_type"))(scope, receive, send)
+
+async def deliver_relayed(request: dict) -> dict:
+    """Runs a message relayed by another worker through this worker's SSE transport."""
+    scope = {
+        "type": "http",
+        "method": request["method"],
+        "path": request["path"],
+        "query_string": request["query_string"].encode("latin-1"),
+        "headers": [(key.encode("latin-1"), value.encode("latin-1")) for key, value in request["headers"]],
+    }
+    received = [{"type": "http.request", "body": base64.b64decode(request["body"]), "more_body": False}]
+    response = {"status": 500, "body": b"", "media_type": None}
+
+    async def receive():
+        return received.pop() if received else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["media_type"] = dict(message.get("headers", [])).get(b"content-type", b"").decode() or None
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await sse.handle_post_message(scope, receive, send)
+    return dict(response, body=base64.b64encode(response["body"]).decode())
+
 async def startup():
     import asyncio
+    if WORKERS > 1:
+        await serve_json(worker_socket_path(WORKER_ID), deliver_relayed)
     asyncio.create_task(mcp_run())
 
+async def shutdown():
+    if WORKERS > 1 and os.path.exists(worker_socket_path(WORKER_ID)):
+        os.unlink(worker_socket_path(WORKER_ID))
+
 routes = [
     Route("/sse", endpoint=handle_sse),
-    Mount("/messages", app=sse.handle_post_message),
+    Route("/metrics", endpoint=handle_metrics),
+    Mount("/messages", app=handle_messages if WORKERS > 1 else sse.handle_post_message),
 ]
 
-app = Starlette(debug=True, routes=routes, on_startup=[startup])
+app = Starlette(debug=True, routes=routes, on_startup=[startup], on_shutdown=[shutdown])
 
 if __name__ == "__main__":
     import uvicorn
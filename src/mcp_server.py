@@ -1,28 +1,216 @@
 import datetime
 import asyncio
-from typing import Optional
+import functools
+import json
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
 from mcp.server import Server
+from mcp.server.lowlevel.helper_types import ReadResourceContents
 from mcp.types import Tool, TextContent, ImageContent, EmbeddedResource
 import mcp.types as types
-from src.caldav_wrapper import CalDAVWrapper
+from src.accounts import AccountRegistry
+from src.caldav_wrapper import BATCH_MAX_ITEMS, EVENT_FIELDS, CalDAVWrapper
+from src import metrics, vevent
 from src.db import init_db
+from src.leader import FOLLOWER_POLL_INTERVAL, WORKERS, LeaderElection
+from src.scheduler import SyncLimiter, SyncScheduler
+from src.subscriptions import Subscriptions
 import logging
+import threading
 
-# Initialize DB
-init_db()
+# The DB and CalDAV wrapper are set up on first use rather than at import, and
+# creating the wrapper does no network access, so the server starts accepting
+# connections immediately and answers from the existing local DB
+_caldav_wrapper: Optional[CalDAVWrapper] = None
+_initialized = False
+_init_lock = threading.Lock()
 
-# Initialize CalDAV Wrapper
-try:
-    caldav_wrapper = CalDAVWrapper()
-except Exception as e:
-    logging.error(f"Failed to initialize CalDAV wrapper: {e}")
-    caldav_wrapper = None
+def get_wrapper() -> Optional[CalDAVWrapper]:
+    """The shared CalDAV wrapper, or None if it cannot be created (e.g. missing credentials)."""
+    global _caldav_wrapper, _initialized
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                init_db()
+                try:
+                    _caldav_wrapper = CalDAVWrapper()
+                    _caldav_wrapper.shared = is_follower()
+                    _caldav_wrapper.change_listeners.append(subscriptions.changed)
+                except Exception as e:
+                    logging.error(f"Failed to initialize CalDAV wrapper: {e}")
+                _initialized = True
+    return _caldav_wrapper
+
+def _sync() -> dict:
+    caldav_wrapper = get_wrapper()
+    if not caldav_wrapper:
+        raise RuntimeError("CalDAV wrapper not initialized. Check credentials.")
+    return caldav_wrapper.sync()
+
+# Multi-worker mode (WEB_CONCURRENCY > 1, see src/leader.py); None when this is the only process
+election: Optional[LeaderElection] = LeaderElection() if WORKERS > 1 else None
+# Tools that write the database or the CalDAV server: only the leader runs them, followers forward them
+LEADER_TOOLS = {"create_event", "delete_event", "create_events", "delete_events", "sync_calendar"}
+
+def is_follower() -> bool:
+    return election is not None and not election.is_leader
+
+def _open_wrappers() -> list[CalDAVWrapper]:
+    if registry is not None:
+        return registry.open_wrappers()
+    return [_caldav_wrapper] if _caldav_wrapper is not None else []
 
 server = Server("fast-calendar-mcp")
+# One sync at a time for all sessions: background syncs and sync_calendar calls share it
+scheduler = SyncScheduler(_sync)
+
+# Multi-account mode (CALDAV_ACCOUNTS_FILE, see src/accounts.py); None serves the one CALDAV_* account
+registry: Optional[AccountRegistry] = AccountRegistry.from_env()
+# The account of a session that connected with /sse?account=<id>; its requests cannot name another one
+session_account: ContextVar[Optional[str]] = ContextVar("session_account", default=None)
+# Shared by the accounts' schedulers: bounds concurrent syncs and their start rate across accounts
+sync_limiter = SyncLimiter()
+_account_schedulers: Dict[str, SyncScheduler] = {}
+_account_subscriptions: Dict[str, Subscriptions] = {}
+
+def resolve_account(requested: Optional[str] = None) -> Optional[str]:
+    """The account a request is for: its session's, else the one it names; None in single-account mode."""
+    if registry is None:
+        return None
+    bound = session_account.get()
+    if bound is not None and requested is not None and requested != bound:
+        raise ValueError(f"This session is bound to account {bound}")
+    account = bound or requested
+    if account is None:
+        if len(registry.accounts) != 1:
+            raise ValueError("An account is required: connect to /sse?account=<id> or pass the account argument")
+        account = next(iter(registry.accounts))
+    if account not in registry.accounts:
+        raise ValueError(f"Unknown account: {account}")
+    return account
+
+async def wrapper_for(account: Optional[str]) -> Optional[CalDAVWrapper]:
+    """get_wrapper() for single-account mode, else the account's wrapper; shards are opened off the event loop."""
+    if account is None:
+        return get_wrapper() if _initialized else await asyncio.to_thread(get_wrapper)
+    return registry.get_open(account) or await asyncio.to_thread(registry.wrapper, account)
+
+def scheduler_for(account: Optional[str]) -> SyncScheduler:
+    if account is None:
+        return scheduler
+    if account not in _account_schedulers:
+        _account_schedulers[account] = SyncScheduler(lambda: registry.wrapper(account).sync(), limiter=sync_limiter)
+    return _account_schedulers[account]
+
+def subscriptions_for(account: Optional[str]) -> Subscriptions:
+    if account is None:
+        return subscriptions
+    if account not in _account_subscriptions:
+        _account_subscriptions[account] = Subscriptions(functools.partial(read_resource, account=account))
+    return _account_subscriptions[account]
+
+def _on_account_open(account: str, wrapper: CalDAVWrapper):
+    wrapper.shared = is_follower()
+    wrapper.change_listeners.append(subscriptions_for(account).changed)
+
+if registry is not None:
+    registry.open_listeners.append(_on_account_open)
+
+def initialization_options():
+    """Server options for a session; the SDK never advertises resource subscriptions itself."""
+    options = server.create_initialization_options()
+    options.capabilities.resources.subscribe = True
+    return options
+
+# Default and maximum page size of list_events
+LIST_EVENTS_LIMIT = 100
+LIST_EVENTS_MAX_LIMIT = 1000
+
+def to_json(data) -> str:
+    """Compact JSON for tool results: no whitespace, non-ASCII kept as is."""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+def parse_datetime(value: str) -> datetime.datetime:
+    """An ISO 8601 argument as the DB stores times: with an offset (e.g. Z) converted to UTC-naive, else as is."""
+    return vevent.to_utc_naive(datetime.datetime.fromisoformat(value))
+
+CALENDARS_URI = "calendar://calendars"
+EVENTS_URI_TEMPLATE = "calendar://events{?start,end,calendar}"
+
+@server.list_resources()
+async def handle_list_resources() -> list[types.Resource]:
+    return [
+        types.Resource(
+            uri=CALENDARS_URI,
+            name="calendars",
+            description="All calendars, as returned by list_calendars",
+            mimeType="application/json",
+        )
+    ]
+
+@server.list_resource_templates()
+async def handle_list_resource_templates() -> list[types.ResourceTemplate]:
+    return [
+        types.ResourceTemplate(
+            uriTemplate=EVENTS_URI_TEMPLATE if registry is None else EVENTS_URI_TEMPLATE[:-1] + ",account}",
+            name="events",
+            description="Events between start and end (ISO 8601), optionally of one calendar, as the first "
+                        f"{LIST_EVENTS_MAX_LIMIT} results of list_events. Subscribe to be notified when they change.",
+            mimeType="application/json",
+        )
+    ]
+
+@server.read_resource()
+async def handle_read_resource(uri) -> list[ReadResourceContents]:
+    content = await read_resource(str(uri), _resource_account(str(uri)))
+    return [ReadResourceContents(content=content, mime_type="application/json")]
+
+@server.subscribe_resource()
+async def handle_subscribe_resource(uri) -> None:
+    account = _resource_account(str(uri))
+    await subscriptions_for(account).subscribe(server.request_context.session, str(uri))
+
+@server.unsubscribe_resource()
+async def handle_unsubscribe_resource(uri) -> None:
+    subscriptions_for(_resource_account(str(uri))).unsubscribe(server.request_context.session, str(uri))
+
+def _resource_query(uri: str) -> dict:
+    return {key: values[0] for key, values in parse_qs(urlsplit(uri).query).items()}
+
+def _resource_account(uri: str) -> Optional[str]:
+    """In multi-account mode a resource URI may name its account with ?account=<id>."""
+    return resolve_account(_resource_query(uri).get("account"))
+
+async def read_resource(uri: str, account: Optional[str] = None) -> str:
+    """Content of a calendar:// resource, from the local DB."""
+    caldav_wrapper = await wrapper_for(account)
+    if not caldav_wrapper:
+        raise RuntimeError("CalDAV wrapper not initialized. Check credentials.")
+    parts = urlsplit(uri)
+    if parts.scheme == "calendar" and parts.netloc == "calendars":
+        return to_json(await caldav_wrapper.list_calendars_async())
+    if parts.scheme == "calendar" and parts.netloc == "events":
+        query = _resource_query(uri)
+        if "start" not in query or "end" not in query:
+            raise ValueError(f"Resource {uri} needs start and end")
+        page = await caldav_wrapper.list_events_page_async(
+            parse_datetime(query["start"]),
+            parse_datetime(query["end"]),
+            query.get("calendar"),
+            None,
+            LIST_EVENTS_MAX_LIMIT,
+            None
+        )
+        return to_json(page)
+    raise ValueError(f"Unknown resource: {uri}")
+
+subscriptions = Subscriptions(read_resource)
 
 @server.list_tools()
 async def handle_list_tools() -> list[types.Tool]:
-    return [
+    tools = [
         types.Tool(
             name="list_calendars",
             description="List all available calendars",
@@ -33,20 +221,77 @@ async def handle_list_tools() -> list[types.Tool]:
         ),
         types.Tool(
             name="list_events",
-            description="List events within a date range",
+            description="List events within a date range, ordered by start. Returns {\"events\": [...], \"next_cursor\": ...}; "
+                        "pass next_cursor back to get the following page.",
             inputSchema={
                 "type": "object",
                 "properties": {
                     "start_date": {"type": "string", "description": "Start date (ISO 8601, e.g., 2023-01-01T00:00:00)"},
                     "end_date": {"type": "string", "description": "End date (ISO 8601)"},
                     "calendar_name": {"type": "string", "description": "Optional calendar name to filter by"},
+                    "limit": {"type": "integer", "description": f"Maximum number of events per page (default {LIST_EVENTS_LIMIT}, at most {LIST_EVENTS_MAX_LIMIT})"},
+                    "cursor": {"type": "string", "description": "Opaque cursor from a previous page's next_cursor"},
+                    "fields": {"type": "array", "items": {"type": "string", "enum": list(EVENT_FIELDS)},
+                               "description": "Optional subset of fields to return per event (default: all)"},
                 },
                 "required": ["start_date", "end_date"],
             },
         ),
+        types.Tool(
+            name="search_events",
+            description="Full-text search over event title, description and location, best matches first. "
+                        "Prefer this over list_events when looking for a specific event.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "Words to search for; all must match. End a word with * for a prefix match"},
+                    "start_date": {"type": "string", "description": "Optional start of a date range to restrict results to (ISO 8601, requires end_date)"},
+                    "end_date": {"type": "string", "description": "Optional end of the date range (ISO 8601, requires start_date)"},
+                    "calendar_name": {"type": "string", "description": "Optional calendar name to filter by"},
+                    "limit": {"type": "integer", "description": "Maximum number of results (default 20, at most 200)"},
+                },
+                "required": ["query"],
+            },
+        ),
+        types.Tool(
+            name="get_free_busy",
+            description="Merged busy blocks across calendars within a date range",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "start_date": {"type": "string", "description": "Start date (ISO 8601; without offset it is read in timezone)"},
+                    "end_date": {"type": "string", "description": "End date (ISO 8601)"},
+                    "calendar_names": {"type": "array", "items": {"type": "string"}, "description": "Optional calendars to include (default: all)"},
+                    "timezone": {"type": "string", "description": "IANA timezone for inputs and results (default UTC)"},
+                    "include_all_day": {"type": "boolean", "description": "Count all-day events as busy (default false)"},
+                },
+                "required": ["start_date", "end_date"],
+            },
+        ),
+        types.Tool(
+            name="find_free_slots",
+            description="Find free time slots of a given length across calendars, optionally within working hours. "
+                        "Returns free gaps at least duration_minutes long.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "start_date": {"type": "string", "description": "Start date (ISO 8601; without offset it is read in timezone)"},
+                    "end_date": {"type": "string", "description": "End date (ISO 8601)"},
+                    "duration_minutes": {"type": "integer", "description": "Required slot length in minutes"},
+                    "calendar_names": {"type": "array", "items": {"type": "string"}, "description": "Optional calendars to include (default: all)"},
+                    "timezone": {"type": "string", "description": "IANA timezone for inputs, working hours and results (default UTC)"},
+                    "working_hours_start": {"type": "string", "description": "Optional start of the working day, HH:MM"},
+                    "working_hours_end": {"type": "string", "description": "Optional end of the working day, HH:MM"},
+                    "working_days": {"type": "array", "items": {"type": "integer"}, "description": "ISO weekdays counted as working days (default 1-5, Monday to Friday)"},
+                    "include_all_day": {"type": "boolean", "description": "Count all-day events as busy (default false)"},
+                    "limit": {"type": "integer", "description": "Maximum number of slots (default 10)"},
+                },
+                "required": ["start_date", "end_date", "duration_minutes"],
+            },
+        ),
         types.Tool(
             name="create_event",
-            description="Create a new event",
+            description="Create a new event. Returns the UID of the created event.",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -72,38 +317,158 @@ async def handle_list_tools() -> list[types.Tool]:
                 "required": ["calendar_name", "uid"],
             },
         ),
+        types.Tool(
+            name="create_events",
+            description="Create several events in one call. Returns a status per item, in order: created (with uid) or error.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "events": {
+                        "type": "array",
+                        "description": f"Events to create (at most {BATCH_MAX_ITEMS})",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "calendar_name": {"type": "string", "description": "Name of the calendar"},
+                                "summary": {"type": "string", "description": "Event title"},
+                                "start": {"type": "string", "description": "Start time (ISO 8601)"},
+                                "end": {"type": "string", "description": "End time (ISO 8601)"},
+                                "description": {"type": "string", "description": "Event description"},
+                                "location": {"type": "string", "description": "Event location"},
+                            },
+                            "required": ["calendar_name", "summary", "start", "end"],
+                        },
+                    },
+                },
+                "required": ["events"],
+            },
+        ),
+        types.Tool(
+            name="delete_events",
+            description="Delete several events by UID in one call. Returns a status per item, in order: deleted, not_found or error.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "events": {
+                        "type": "array",
+                        "description": f"Events to delete (at most {BATCH_MAX_ITEMS})",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "calendar_name": {"type": "string", "description": "Name of the calendar"},
+                                "uid": {"type": "string", "description": "UID of the event to delete"},
+                            },
+                            "required": ["calendar_name", "uid"],
+                        },
+                    },
+                },
+                "required": ["events"],
+            },
+        ),
         types.Tool(
             name="sync_calendar",
-            description="Force sync with CalDAV server",
+            description="Force sync with CalDAV server. The server also syncs in the background and notifies "
+                        "resource subscribers of changes, so polling is not needed.",
             inputSchema={
                 "type": "object",
                 "properties": {},
             },
         )
     ]
+    if registry is not None:
+        for tool in tools:
+            tool.inputSchema["properties"]["account"] = {
+                "type": "string",
+                "description": "Account id; only needed if the session did not connect with /sse?account=<id>",
+            }
+    return tools
 
 @server.call_tool()
 async def handle_call_tool(
     name: str, arguments: dict | None
 ) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+    start = time.perf_counter()
+    status = "error"
+    try:
+        result = await _call_tool(name, arguments)
+        status = "ok"
+        return result
+    finally:
+        metrics.TOOL_DURATION.observe(time.perf_counter() - start, tool=name, status=status)
+
+async def _call_tool(
+    name: str, arguments: dict | None
+) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+    account = resolve_account((arguments or {}).get("account"))
+    if name in LEADER_TOOLS and is_follower():
+        return await _forward(name, arguments, account)
+    caldav_wrapper = await wrapper_for(account)
     if not caldav_wrapper:
         return [types.TextContent(type="text", text="CalDAV wrapper not initialized. Check credentials.")]
 
     if name == "list_calendars":
-        calendars = await asyncio.to_thread(caldav_wrapper.list_calendars)
-        return [types.TextContent(type="text", text=str(calendars))]
+        calendars = await caldav_wrapper.list_calendars_async()
+        return [types.TextContent(type="text", text=to_json(calendars))]
 
     elif name == "list_events":
-        start_date = datetime.datetime.fromisoformat(arguments["start_date"])
-        end_date = datetime.datetime.fromisoformat(arguments["end_date"])
+        start_date = parse_datetime(arguments["start_date"])
+        end_date = parse_datetime(arguments["end_date"])
         calendar_name = arguments.get("calendar_name")
-        events = await asyncio.to_thread(caldav_wrapper.list_events, start_date, end_date, calendar_name)
-        return [types.TextContent(type="text", text=str(events))]
+        limit = max(1, min(arguments.get("limit", LIST_EVENTS_LIMIT), LIST_EVENTS_MAX_LIMIT))
+        page = await caldav_wrapper.list_events_page_async(
+            start_date,
+            end_date,
+            calendar_name,
+            arguments.get("fields"),
+            limit,
+            arguments.get("cursor")
+        )
+        return [types.TextContent(type="text", text=to_json(page))]
+
+    elif name == "search_events":
+        start_date = arguments.get("start_date")
+        end_date = arguments.get("end_date")
+        events = await caldav_wrapper.search_events_async(
+            arguments["query"],
+            parse_datetime(start_date) if start_date else None,
+            parse_datetime(end_date) if end_date else None,
+            arguments.get("calendar_name"),
+            arguments.get("limit", 20)
+        )
+        return [types.TextContent(type="text", text=to_json(events))]
+
+    elif name == "get_free_busy":
+        busy = await caldav_wrapper.get_free_busy_async(
+            datetime.datetime.fromisoformat(arguments["start_date"]),
+            datetime.datetime.fromisoformat(arguments["end_date"]),
+            arguments.get("calendar_names"),
+            arguments.get("timezone", "UTC"),
+            arguments.get("include_all_day", False)
+        )
+        return [types.TextContent(type="text", text=to_json(busy))]
+
+    elif name == "find_free_slots":
+        working_hours = None
+        if arguments.get("working_hours_start") and arguments.get("working_hours_end"):
+            working_hours = (datetime.time.fromisoformat(arguments["working_hours_start"]),
+                             datetime.time.fromisoformat(arguments["working_hours_end"]))
+        slots = await caldav_wrapper.find_free_slots_async(
+            datetime.datetime.fromisoformat(arguments["start_date"]),
+            datetime.datetime.fromisoformat(arguments["end_date"]),
+            arguments["duration_minutes"],
+            arguments.get("calendar_names"),
+            arguments.get("timezone", "UTC"),
+            working_hours,
+            arguments.get("working_days", [1, 2, 3, 4, 5]),
+            arguments.get("include_all_day", False),
+            arguments.get("limit", 10)
+        )
+        return [types.TextContent(type="text", text=to_json(slots))]
 
     elif name == "create_event":
         start = datetime.datetime.fromisoformat(arguments["start"])
         end = datetime.datetime.fromisoformat(arguments["end"])
-        await asyncio.to_thread(
+        uid = await asyncio.to_thread(
             caldav_wrapper.create_event,
             arguments["calendar_name"],
             arguments["summary"],
@@ -112,25 +477,82 @@ async def handle_call_tool(
             arguments.get("description", ""),
             arguments.get("location", "")
         )
-        return [types.TextContent(type="text", text="Event created successfully")]
+        return [types.TextContent(type="text", text=f"Event created successfully. UID: {uid}")]
 
     elif name == "delete_event":
         await asyncio.to_thread(caldav_wrapper.delete_event, arguments["calendar_name"], arguments["uid"])
         return [types.TextContent(type="text", text="Event deleted successfully")]
 
+    elif name == "create_events":
+        results = await asyncio.to_thread(caldav_wrapper.create_events, arguments["events"])
+        return [types.TextContent(type="text", text=to_json(results))]
+
+    elif name == "delete_events":
+        results = await asyncio.to_thread(caldav_wrapper.delete_events, arguments["events"])
+        return [types.TextContent(type="text", text=to_json(results))]
+
     elif name == "sync_calendar":
-        await asyncio.to_thread(caldav_wrapper.sync)
-        return [types.TextContent(type="text", text="Calendar synced successfully")]
+        stats = await scheduler_for(account).request()
+        return [types.TextContent(type="text", text=f"Calendar synced successfully: {stats}")]
 
     else:
         raise ValueError(f"Unknown tool: {name}")
 
+async def _forward(name: str, arguments: dict | None, account: Optional[str]) -> list[types.TextContent]:
+    """Runs a write tool on the leader worker; this worker's next read catches up with what it committed."""
+    response = await election.forward({"tool": name, "arguments": dict(arguments or {}, account=account)})
+    if "error" in response:
+        raise RuntimeError(response["error"])
+    return [types.TextContent(type="text", text=text) for text in response["content"]]
+
+async def _handle_forwarded(request: dict) -> dict:
+    content = await _call_tool(request["tool"], request["arguments"])
+    return {"content": [item.text for item in content]}
+
+def _catch_up_all():
+    for caldav_wrapper in _open_wrappers():
+        caldav_wrapper.catch_up()
+
 async def run():
-    # Initial sync
+    """Startup task: prepares the local DB, refreshes it from the server and
+    starts the background syncs (CALDAV_SYNC_INTERVAL).
+
+    Tools answer from the existing local DB while this sync runs. In
+    multi-worker mode only the leader does this; a follower polls for the
+    leader's commits until it takes over.
+    """
+    if election is not None:
+        if not election.try_acquire():
+            print("Following the leader worker; writes and syncs are forwarded to it")
+            while not election.try_acquire():
+                await asyncio.sleep(FOLLOWER_POLL_INTERVAL)
+                try:
+                    await asyncio.to_thread(_catch_up_all)
+                except Exception as e:
+                    print(f"Catching up with the leader failed: {e}")
+            print("Took over as the leader worker")
+        await election.serve(_handle_forwarded)
+        # Reads no longer need to check for other writers once the last leader's commits are seen
+        await asyncio.to_thread(_catch_up_all)
+        for caldav_wrapper in _open_wrappers():
+            caldav_wrapper.shared = False
+    if registry is not None:
+        registry.loop = asyncio.get_running_loop()
+        await asyncio.gather(*(_start_account(account) for account in registry.accounts))
+        return
+    caldav_wrapper = await asyncio.to_thread(get_wrapper)
     if caldav_wrapper:
-        print("Performing initial sync...")
+        print("Performing background sync...")
         try:
-            await asyncio.to_thread(caldav_wrapper.sync)
-            print("Initial sync complete.")
+            await scheduler.request()
+            print("Background sync complete.")
         except Exception as e:
-            print(f"Initial sync failed: {e}")
+            print(f"Background sync failed: {e}")
+        scheduler.start()
+
+async def _start_account(account: str):
+    try:
+        await scheduler_for(account).request()
+    except Exception as e:
+        print(f"Background sync of account {account} failed: {e}")
+    scheduler_for(account).start()
@@ -0,0 +1,167 @@
+"""In-process counters and latency histograms, rendered in the Prometheus text format.
+
+Recording is a dict lookup, a bisect and a few additions under a lock, so the
+instrumentation stays on in production. Every metric keeps at most
+MAX_SERIES label combinations; further ones are folded into "other" so a
+misbehaving client cannot grow memory without bound.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+MAX_SERIES = 500
+
+# Upper bounds in seconds, from sub-millisecond DB queries to multi-minute syncs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+                   60.0, 300.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str]):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        if key not in self._series and len(self._series) >= MAX_SERIES:
+            return ("other",) * len(self.labelnames)
+        return key
+
+    def _labels(self, key: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        for key, values in series:
+            lines += self._render_series(key, values)
+        return lines
+
+    def _render_series(self, key, values) -> List[str]:
+        raise NotImplementedError
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            values = self._series.setdefault(key, [0])
+            values[0] += amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._series.get(tuple(str(labels[name]) for name in self.labelnames), [0])[0]
+
+    def _render_series(self, key, values) -> List[str]:
+        return [f"{self.name}{self._labels(key)} {values[0]:g}"]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; each series is [bucket counts..., +Inf count, sum]."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._series.get(key)
+            if values is None:
+                values = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            values[index] += 1
+            values[-1] += value
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            values = self._series.get(tuple(str(labels[name]) for name in self.labelnames))
+            return sum(values[:-1]) if values else 0
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_series(self, key, values) -> List[str]:
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+            cumulative += count
+            le = 'le="%s"' % ("+Inf" if bound == float("inf") else f"{bound:g}")
+            lines.append(f"{self.name}_bucket{self._labels(key, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{self._labels(key)} {values[-1]:.6f}")
+        lines.append(f"{self.name}_count{self._labels(key)} {cumulative}")
+        return lines
+
+
+@contextmanager
+def phase(timings: dict, name: str):
+    """Adds the time spent in the block to timings[name]."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+TOOL_DURATION = Histogram("mcp_tool_duration_seconds", "MCP tool call latency by tool and outcome.",
+                          ("tool", "status"))
+SYNC_PHASE_DURATION = Histogram("caldav_sync_phase_seconds",
+                                "Time per calendar sync spent in each phase (fetch, parse, expand, upsert, delete, commit).",
+                                ("calendar", "phase"))
+SYNC_OBJECTS = Counter("caldav_sync_objects_total",
+                       "Calendar objects seen by syncs: fetched, parsed, skipped (unchanged), failed (unparsable), deleted.",
+                       ("calendar", "outcome"))
+SYNC_FAILURES = Counter("caldav_sync_failures_total", "Calendar syncs that failed and were rolled back.",
+                        ("calendar",))
+SYNC_REQUESTS = Counter("caldav_sync_requests_total",
+                        "Sync requests (background and sync_calendar): started a sync or coalesced into a queued one.",
+                        ("outcome",))
+RESOURCE_NOTIFICATIONS = Counter("mcp_resource_notifications_total",
+                                 "resources/updated notifications sent to subscribed sessions.", ())
+DB_QUERY_DURATION = Histogram("db_query_seconds", "SQLite statement latency by connection pool and statement type.",
+                              ("pool", "statement"))
+
+METRICS = (TOOL_DURATION, SYNC_PHASE_DURATION, SYNC_OBJECTS, SYNC_FAILURES, SYNC_REQUESTS, RESOURCE_NOTIFICATIONS,
+           DB_QUERY_DURATION)
+
+
+def record_sync(calendar: str, timings: dict, stats: dict):
+    """Records one calendar sync's phase timings and object counts."""
+    for name, seconds in timings.items():
+        SYNC_PHASE_DURATION.observe(seconds, calendar=calendar, phase=name)
+    for outcome, count in stats.items():
+        if count:
+            SYNC_OBJECTS.inc(count, calendar=calendar, outcome=outcome)
+
+
+def render() -> str:
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
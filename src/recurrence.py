@@ -0,0 +1,167 @@
+"""Expansion of recurring VEVENTs (RRULE/RDATE/EXDATE plus RECURRENCE-ID overrides)
+into concrete occurrences, stored as UTC-naive datetimes like the rest of the DB."""
+import datetime
+from typing import Dict, List, Optional, Tuple
+
+import icalendar
+import pytz
+from dateutil.rrule import rruleset, rrulestr
+
+# Hard cap on rows produced by a single expansion, so an open-ended daily
+# series (or a query asking for a century) cannot blow up the table
+MAX_OCCURRENCES = 2000
+
+# Sentinels for "the series has no occurrences beyond this point"
+EXPANDED_MIN = datetime.datetime(1, 1, 1)
+EXPANDED_MAX = datetime.datetime(9999, 12, 31)
+
+
+def is_recurring(component) -> bool:
+    return component.get('rrule') is not None or component.get('rdate') is not None
+
+
+def _as_datetime(value) -> datetime.datetime:
+    if isinstance(value, datetime.datetime):
+        return value
+    return datetime.datetime.combine(value, datetime.time.min)
+
+
+def _to_utc_naive(value: datetime.datetime) -> datetime.datetime:
+    if value.tzinfo:
+        return value.astimezone(pytz.UTC).replace(tzinfo=None)
+    return value
+
+
+def _localize(naive: datetime.datetime, tz) -> datetime.datetime:
+    """Attaches tz to a wall-clock time (pytz zones need localize())."""
+    if tz is None:
+        return naive
+    if hasattr(tz, "localize"):
+        return tz.localize(naive)
+    return naive.replace(tzinfo=tz)
+
+
+def _wall_clock(value, tz) -> datetime.datetime:
+    """Converts a DATE/DATE-TIME property value to naive wall-clock time in tz."""
+    value = _as_datetime(value)
+    if value.tzinfo is not None and tz is not None:
+        value = value.astimezone(tz)
+    return value.replace(tzinfo=None)
+
+
+def _date_values(component, name: str) -> list:
+    prop = component.get(name)
+    if prop is None:
+        return []
+    values = []
+    for item in prop if isinstance(prop, list) else [prop]:
+        for entry in item.dts:
+            value = entry.dt
+            # RDATE may be a PERIOD; only its start matters here
+            values.append(value[0] if isinstance(value, tuple) else value)
+    return values
+
+
+def _duration(component, dtstart) -> datetime.timedelta:
+    if component.get('dtend') is not None:
+        return _as_datetime(component.get('dtend').dt) - _as_datetime(dtstart)
+    if component.get('duration') is not None:
+        return component.get('duration').dt
+    if not isinstance(dtstart, datetime.datetime):
+        return datetime.timedelta(days=1)
+    return datetime.timedelta(0)
+
+
+def _text(component, name: str) -> str:
+    return str(component.get(name, ''))
+
+
+def expand(ical_data: str, uid: str, window_start: datetime.datetime, window_end: datetime.datetime,
+           limit: int = MAX_OCCURRENCES) -> Tuple[List[dict], datetime.datetime, datetime.datetime]:
+    """Expands the series uid of an iCalendar object over [window_start, window_end).
+
+    Occurrences are selected by their start time. Returns the occurrence rows
+    and the range that is now known to be complete; the range end is
+    EXPANDED_MAX once the rule is exhausted, and stops early at the last
+    produced occurrence if the limit was hit.
+    """
+    cal_obj = icalendar.Calendar.from_ical(ical_data)
+    master = None
+    overrides: Dict[datetime.datetime, object] = {}
+    for component in cal_obj.walk('VEVENT'):
+        if str(component.get('uid')) != uid:
+            continue
+        if component.get('recurrence-id') is not None:
+            overrides[_to_utc_naive(_as_datetime(component.get('recurrence-id').dt))] = component
+        elif master is None:
+            master = component
+    if master is None:
+        return [], window_start, window_end
+
+    dtstart = master.get('dtstart').dt
+    tz = dtstart.tzinfo if isinstance(dtstart, datetime.datetime) else None
+    local_start = _wall_clock(dtstart, tz)
+    duration = _duration(master, dtstart)
+
+    rules = rruleset()
+    if master.get('rrule') is not None:
+        recur = dict(master.get('rrule'))
+        until = recur.pop('UNTIL', None)
+        rule = rrulestr(icalendar.vRecur(recur).to_ical().decode(), dtstart=local_start)
+        if until:
+            rule = rule.replace(until=_wall_clock(until[0], tz))
+        rules.rrule(rule)
+    else:
+        rules.rdate(local_start)
+    for value in _date_values(master, 'rdate'):
+        rules.rdate(_wall_clock(value, tz))
+    for value in _date_values(master, 'exdate'):
+        rules.exdate(_wall_clock(value, tz))
+
+    occurrences = []
+    complete_until = window_end
+    # Convert the UTC window to wall-clock bounds with a day of slack for offsets
+    slack = datetime.timedelta(days=1)
+    local_end = window_end + slack
+    for local in rules.xafter(window_start - slack, inc=True):
+        if local >= local_end:
+            break
+        start = _to_utc_naive(_localize(local, tz))
+        if start < window_start:
+            continue
+        if start >= window_end:
+            break
+        if len(occurrences) >= limit:
+            complete_until = start
+            break
+        if start not in overrides:
+            end = _to_utc_naive(_localize(local + duration, tz))
+            occurrences.append({"start": start, "end": end, "recurrence_id": start,
+                                "summary": None, "description": None, "location": None})
+    else:
+        complete_until = EXPANDED_MAX
+
+    # An override belongs to the window holding the instance it replaces, even
+    # if it was moved elsewhere, so adjacent expansions never duplicate it
+    for recurrence_id, override in overrides.items():
+        if window_start <= recurrence_id < complete_until:
+            row = _override_row(override, recurrence_id)
+            if row is not None:
+                occurrences.append(row)
+    occurrences.sort(key=lambda row: row["start"])
+
+    complete_from = window_start
+    if window_start <= _to_utc_naive(_localize(local_start, tz)):
+        complete_from = EXPANDED_MIN
+    return occurrences, complete_from, complete_until
+
+
+def _override_row(component, recurrence_id: datetime.datetime) -> Optional[dict]:
+    if str(component.get('status', '')).upper() == 'CANCELLED':
+        return None
+    dtstart = component.get('dtstart').dt
+    start = _to_utc_naive(_as_datetime(dtstart))
+    end = _to_utc_naive(_as_datetime(dtstart) + _duration(component, dtstart))
+    return {"start": start, "end": end, "recurrence_id": recurrence_id,
+            "summary": _text(component, 'summary'), "description": _text(component, 'description'),
+            "location": _text(component, 'location')}
@@ -0,0 +1,104 @@
+"""Background and on-demand syncs, coalesced so one sync serves every caller.
+
+A request made while no sync is queued starts one (after the running sync, if
+any); requests arriving before it starts share it. So however many clients
+ask for a sync at once, at most one runs and one waits, and every caller gets
+a sync that started after its request.
+
+In multi-account mode every account has its own SyncScheduler, and all of
+them share one SyncLimiter, which bounds how many accounts sync at once and
+how fast syncs start.
+"""
+import asyncio
+import contextlib
+import os
+import random
+import time
+from typing import Callable, Optional
+
+from src import metrics
+
+# Seconds between background syncs; 0 only syncs at startup and on request
+SYNC_INTERVAL = float(os.getenv("CALDAV_SYNC_INTERVAL", "300"))
+# Random spread of the interval (0.1 = +/-10%), so processes started together do not sync in lockstep
+SYNC_JITTER = float(os.getenv("CALDAV_SYNC_JITTER", "0.1"))
+# Multi-account mode: accounts syncing at the same time, and syncs started per second across all accounts
+ACCOUNT_SYNC_CONCURRENCY = int(os.getenv("CALDAV_ACCOUNT_SYNC_CONCURRENCY", "4"))
+ACCOUNT_SYNC_RATE = float(os.getenv("CALDAV_ACCOUNT_SYNC_RATE", "2"))
+
+
+class SyncLimiter:
+    """Global bounds on syncs: at most concurrency at once, started at most rate per second.
+
+    Waiting syncs start in the order they asked (asyncio.Semaphore is FIFO),
+    so a busy account cannot starve the others.
+    """
+
+    def __init__(self, concurrency: int = ACCOUNT_SYNC_CONCURRENCY, rate: float = ACCOUNT_SYNC_RATE):
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._next_start = 0.0
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            if self.rate > 0:
+                now = time.monotonic()
+                start = max(now, self._next_start)
+                self._next_start = start + 1 / self.rate
+                await asyncio.sleep(start - now)
+            yield
+
+
+class SyncScheduler:
+    def __init__(self, sync: Callable[[], dict], interval: float = SYNC_INTERVAL, jitter: float = SYNC_JITTER,
+                 limiter: Optional[SyncLimiter] = None):
+        self._sync = sync
+        self._limiter = limiter
+        self.interval = interval
+        self.jitter = min(max(jitter, 0.0), 1.0)
+        self.last_finished = time.monotonic()
+        self._running: Optional[asyncio.Task] = None
+        self._queued: Optional[asyncio.Task] = None
+        self._periodic: Optional[asyncio.Task] = None
+
+    async def request(self) -> dict:
+        """Stats of a sync that starts no earlier than this call."""
+        if self._queued is None:
+            self._queued = asyncio.ensure_future(self._run(self._running))
+            metrics.SYNC_REQUESTS.inc(outcome="started")
+        else:
+            metrics.SYNC_REQUESTS.inc(outcome="coalesced")
+        # Shielded: a caller that goes away does not cancel the sync the others wait for
+        return await asyncio.shield(self._queued)
+
+    async def _run(self, previous: Optional[asyncio.Task]) -> dict:
+        if previous is not None:
+            await asyncio.wait([previous])
+        self._queued, self._running = None, asyncio.current_task()
+        try:
+            async with self._limiter.slot() if self._limiter else contextlib.nullcontext():
+                return await asyncio.to_thread(self._sync)
+        finally:
+            self._running = None
+            self.last_finished = time.monotonic()
+
+    def start(self):
+        """Starts the background syncs on the running loop; a no-op without an interval or if already started."""
+        if self.interval <= 0 or (self._periodic is not None and not self._periodic.done()):
+            return
+        self._periodic = asyncio.ensure_future(self._run_periodic())
+
+    async def _run_periodic(self):
+        while True:
+            factor = random.uniform(1 - self.jitter, 1 + self.jitter)
+            # A sync requested in the meantime pushes the next one back
+            while (wait := self.last_finished + self.interval * factor - time.monotonic()) > 0:
+                await asyncio.sleep(wait)
+            try:
+                await self.request()
+            except Exception as e:
+                print(f"Background sync failed: {e}")
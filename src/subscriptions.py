@@ -0,0 +1,82 @@
+"""MCP resource subscriptions and their resources/updated notifications.
+
+The CalDAV wrapper reports every committed change (sync chunks and
+write-through) through changed(), from whichever thread made it. That only
+schedules a check on the event loop NOTIFY_DELAY later, so the many commits of
+one sync end in a single round of notifications. The check reads every
+subscribed resource once, however many sessions subscribed to it, and
+notifies the subscribers of those whose content differs from what they last
+saw: a change outside a subscribed window notifies nobody.
+"""
+import asyncio
+import hashlib
+import weakref
+from typing import Awaitable, Callable, Dict, Optional
+
+from pydantic import AnyUrl
+
+from src import metrics
+
+# Seconds changes are collected before subscribed resources are checked
+NOTIFY_DELAY = 0.5
+
+
+class Subscriptions:
+    def __init__(self, read: Callable[[str], Awaitable[str]], delay: float = NOTIFY_DELAY):
+        self._read = read
+        self.delay = delay
+        # uri -> sessions subscribed to it; sessions that disconnect drop out on their own
+        self._sessions: Dict[str, weakref.WeakSet] = {}
+        self._digests: Dict[str, str] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Optional[asyncio.TimerHandle] = None
+
+    async def subscribe(self, session, uri: str):
+        self._loop = asyncio.get_running_loop()
+        if uri not in self._digests:
+            self._digests[uri] = _digest(await self._read(uri))
+        self._sessions.setdefault(uri, weakref.WeakSet()).add(session)
+
+    def unsubscribe(self, session, uri: str):
+        sessions = self._sessions.get(uri)
+        if sessions is not None:
+            sessions.discard(session)
+
+    def changed(self, *_):
+        """Schedules a check of the subscribed resources; safe to call from any thread."""
+        loop = self._loop
+        if loop is None or not self._sessions or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._schedule)
+
+    def _schedule(self):
+        if self._pending is None:
+            self._pending = self._loop.call_later(self.delay, lambda: asyncio.ensure_future(self.check()))
+
+    async def check(self):
+        """Notifies the subscribers of every subscribed resource whose content changed."""
+        self._pending = None
+        for uri, sessions in list(self._sessions.items()):
+            if not sessions:
+                del self._sessions[uri]
+                self._digests.pop(uri, None)
+                continue
+            try:
+                digest = _digest(await self._read(uri))
+            except Exception as e:
+                print(f"Error reading subscribed resource {uri}: {e}")
+                continue
+            if digest == self._digests.get(uri):
+                continue
+            self._digests[uri] = digest
+            for session in list(sessions):
+                try:
+                    await session.send_resource_updated(AnyUrl(uri))
+                    metrics.RESOURCE_NOTIFICATIONS.inc()
+                except Exception:
+                    # The connection is gone
+                    sessions.discard(session)
+
+
+def _digest(content: str) -> str:
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
@@ -0,0 +1,304 @@
+"""Extraction of the stored VEVENT fields from raw iCalendar objects.
+
+parse() reads the handful of properties the DB keeps straight from the
+content lines and only hands objects with anything unusual to the full
+icalendar parser (parse_with_icalendar), which defines the expected result.
+Timezones are resolved through icalendar's own timezone provider, so both
+paths agree on TZIDs and DST, and each distinct VTIMEZONE definition is only
+built once per process.
+
+parse_many() parses a batch, on a process pool when the batch is large
+enough for that to pay off (CALDAV_PARSE_PROCESSES).
+"""
+import datetime
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Union
+
+import icalendar
+import pytz
+from icalendar.timezone import tzp
+
+from src import recurrence
+
+# Worker processes for parsing big batches; 0 parses on the calling thread
+PARSE_PROCESSES = int(os.getenv("CALDAV_PARSE_PROCESSES", str(min(4, (os.cpu_count() or 1) - 1))))
+# Smallest batch sent to the pool; below this pickling costs more than it saves
+PARSE_PROCESS_MIN_BATCH = 200
+
+_UNFOLD = re.compile(r"\r?\n[ \t]")
+_UNESCAPE = re.compile(r"\\([\\;,:nN])")
+# Properties that must appear at most once for the fast path; icalendar turns repeats into lists
+_SINGLE = {"UID", "SUMMARY", "DESCRIPTION", "LOCATION", "DTSTART", "DTEND", "DURATION", "TRANSP", "STATUS",
+           "RECURRENCE-ID"}
+_DATETIMES = {"DTSTART", "DTEND"}
+
+# VTIMEZONE blocks already handed to icalendar's timezone cache (bounded by
+# MAX_SEEN_TIMEZONES; forgetting one only means building it again)
+MAX_SEEN_TIMEZONES = 1000
+_seen_timezones: set = set()
+_seen_lock = threading.Lock()
+
+
+class _Unsupported(Exception):
+    """The object needs the full parser."""
+
+
+def parse(ical_data: str) -> List[dict]:
+    """Stored fields of every VEVENT in an iCalendar object (see parse_with_icalendar)."""
+    try:
+        return _parse_fast(ical_data)
+    except _Unsupported:
+        return parse_with_icalendar(ical_data)
+
+
+def parse_many(objects: List[str], parse: Callable[[str], List[dict]] = parse) -> List[Union[List[dict], Exception]]:
+    """Parses a batch; a failing object yields its exception instead of rows.
+
+    Large batches go to the process pool, which always runs vevent.parse;
+    smaller ones are parsed here with the given function. If a worker process
+    died (e.g. killed for memory), the batch is parsed here and the next one
+    gets a new pool.
+    """
+    pool = _pool() if len(objects) >= PARSE_PROCESS_MIN_BATCH else None
+    if pool is not None:
+        chunksize = max(1, len(objects) // (PARSE_PROCESSES * 4))
+        try:
+            return list(pool.map(_parse_or_error, objects, chunksize=chunksize))
+        except BrokenProcessPool as e:
+            print(f"Parse process pool failed, parsing in-thread: {e}")
+            _discard_pool(pool)
+    return [_parse_or_error(ical_data, parse) for ical_data in objects]
+
+
+def _parse_or_error(ical_data: str, parse: Callable[[str], List[dict]] = parse) -> Union[List[dict], Exception]:
+    try:
+        return parse(ical_data)
+    except Exception as e:
+        return e
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _pool() -> Optional[ProcessPoolExecutor]:
+    global _executor
+    if PARSE_PROCESSES <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            # spawn, not fork: the server process has threads and open DB connections
+            _executor = ProcessPoolExecutor(PARSE_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    global _executor
+    with _executor_lock:
+        if _executor is pool:
+            _executor = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def parse_with_icalendar(ical_data: str) -> List[dict]:
+    """Extracts the stored fields of every VEVENT in an iCalendar object.
+
+    One row per UID: when a series carries RECURRENCE-ID overrides, the
+    master component is the one that is kept.
+    """
+    cal_obj = icalendar.Calendar.from_ical(ical_data)
+    parsed = {}
+    for component in cal_obj.walk():
+        if component.name == "VEVENT":
+            uid = str(component.get('uid'))
+            if uid in parsed and component.get('recurrence-id') is not None:
+                continue
+            dtstart = component.get('dtstart').dt
+            if component.get('dtend'):
+                dtend = component.get('dtend').dt
+            elif component.get('duration'):
+                dtend = dtstart + component.get('duration').dt
+            elif not isinstance(dtstart, datetime.datetime):
+                # RFC 5545: an all-day event without DTEND lasts one day
+                dtend = dtstart + datetime.timedelta(days=1)
+            else:
+                dtend = dtstart
+            series = recurrence.is_recurring(component)
+            parsed[uid] = {
+                "uid": uid,
+                "summary": str(component.get('summary', '')),
+                "description": str(component.get('description', '')),
+                "location": str(component.get('location', '')),
+                "start": to_utc_naive(dtstart),
+                "end": to_utc_naive(dtend),
+                "all_day": not isinstance(dtstart, datetime.datetime),
+                "transparent": (str(component.get('transp', '')).upper() == 'TRANSPARENT'
+                                or str(component.get('status', '')).upper() == 'CANCELLED'),
+                "recurring": series,
+                "ics": ical_data if series else None,
+            }
+    return list(parsed.values())
+
+
+def to_utc_naive(value) -> datetime.datetime:
+    """Normalize to UTC naive for DB"""
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo:
+            value = value.astimezone(pytz.UTC).replace(tzinfo=None)
+        return value
+    return datetime.datetime.combine(value, datetime.time.min)
+
+
+def _parse_fast(ical_data: str) -> List[dict]:
+    lines = _UNFOLD.sub("", ical_data).splitlines()
+    stack: List[str] = []
+    events: List[Dict[str, object]] = []
+    event: Optional[Dict[str, object]] = None
+    timezone_lines: Optional[List[str]] = None
+    calendars = 0
+    for line in lines:
+        if not line:
+            continue
+        if timezone_lines is not None:
+            timezone_lines.append(line)
+        name, params, value = _split(line)
+        if name == "BEGIN":
+            component = value.upper()
+            if not stack:
+                if component != "VCALENDAR" or calendars:
+                    raise _Unsupported
+                calendars += 1
+            elif component == "VEVENT":
+                if stack != ["VCALENDAR"]:
+                    raise _Unsupported
+                event = {}
+                events.append(event)
+            elif component == "VTIMEZONE" and stack == ["VCALENDAR"]:
+                timezone_lines = [line]
+            stack.append(component)
+        elif name == "END":
+            if not stack or stack.pop() != value.upper():
+                raise _Unsupported
+            if value.upper() == "VTIMEZONE" and timezone_lines is not None:
+                _register_timezone("\r\n".join(timezone_lines) + "\r\n")
+                timezone_lines = None
+            elif value.upper() == "VEVENT":
+                event = None
+        elif event is not None and len(stack) == 2:
+            if name in _SINGLE and name in event:
+                raise _Unsupported
+            if name in _DATETIMES:
+                event[name] = _datetime(params, value)
+            elif name in ("RRULE", "RDATE"):
+                event["RECURRING"] = True
+            else:
+                event[name] = value
+        elif not stack:
+            raise _Unsupported
+    if stack or not calendars:
+        raise _Unsupported
+
+    parsed = {}
+    for event in events:
+        if "UID" not in event or "DTSTART" not in event or "DURATION" in event:
+            raise _Unsupported
+        uid = _text(event["UID"])
+        if uid in parsed and "RECURRENCE-ID" in event:
+            continue
+        dtstart = event["DTSTART"]
+        if "DTEND" in event:
+            dtend = event["DTEND"]
+        elif not isinstance(dtstart, datetime.datetime):
+            dtend = dtstart + datetime.timedelta(days=1)
+        else:
+            dtend = dtstart
+        series = bool(event.get("RECURRING"))
+        parsed[uid] = {
+            "uid": uid,
+            "summary": _text(event.get("SUMMARY", "")),
+            "description": _text(event.get("DESCRIPTION", "")),
+            "location": _text(event.get("LOCATION", "")),
+            "start": to_utc_naive(dtstart),
+            "end": to_utc_naive(dtend),
+            "all_day": not isinstance(dtstart, datetime.datetime),
+            "transparent": (_text(event.get("TRANSP", "")).upper() == "TRANSPARENT"
+                            or _text(event.get("STATUS", "")).upper() == "CANCELLED"),
+            "recurring": series,
+            "ics": ical_data if series else None,
+        }
+    return list(parsed.values())
+
+
+def _split(line: str):
+    """Splits a content line into (NAME, {PARAM: value}, value)."""
+    colon = line.find(":")
+    if colon < 0:
+        raise _Unsupported
+    head = line[:colon]
+    if '"' in head:
+        # A quoted parameter value may itself contain ":" or ";"
+        quoted = False
+        for colon, char in enumerate(line):
+            if char == '"':
+                quoted = not quoted
+            elif char == ":" and not quoted:
+                break
+        else:
+            raise _Unsupported
+        head = line[:colon]
+    name, _, rest = head.partition(";")
+    params = {}
+    if rest:
+        for param in re.split(r';(?=(?:[^"]*"[^"]*")*[^"]*$)', rest):
+            key, sep, param_value = param.partition("=")
+            if not sep:
+                raise _Unsupported
+            params[key.upper()] = param_value.strip('"')
+    return name.upper(), params, line[colon + 1:]
+
+
+def _text(value: str) -> str:
+    return _UNESCAPE.sub(lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def _datetime(params: dict, value: str):
+    kind = params.get("VALUE", "").upper()
+    tzid = params.get("TZID")
+    if len(value) == 8 and value.isdigit() and kind in ("DATE", "") and tzid is None:
+        return datetime.date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+    if len(value) not in (15, 16) or value[8] != "T" or kind not in ("DATE-TIME", ""):
+        raise _Unsupported
+    try:
+        naive = datetime.datetime(int(value[:4]), int(value[4:6]), int(value[6:8]),
+                                  int(value[9:11]), int(value[11:13]), int(value[13:15]))
+    except ValueError:
+        raise _Unsupported
+    suffix = value[15:]
+    if tzid is None:
+        if suffix == "Z":
+            return naive.replace(tzinfo=datetime.timezone.utc)
+        if suffix:
+            raise _Unsupported
+        return naive
+    tz = tzp.timezone(tzid)
+    if tz is None or suffix:
+        raise _Unsupported
+    return tzp.localize(naive, tz)
+
+
+def _register_timezone(block: str):
+    """Gives a VTIMEZONE to icalendar's timezone cache, as its parser does; each distinct block only once."""
+    with _seen_lock:
+        if block in _seen_timezones:
+            return
+        if len(_seen_timezones) >= MAX_SEEN_TIMEZONES:
+            _seen_timezones.clear()
+        _seen_timezones.add(block)
+    timezone = icalendar.Timezone.from_ical(block)
+    if "TZID" in timezone:
+        tzp.cache_timezone_component(timezone)
@@ -0,0 +1,205 @@
+"""Thin helpers for the WebDAV/CalDAV REPORTs that the caldav library does not
+expose in a version-stable way (RFC 6578 sync-collection, RFC 4791 calendar-query
+and multiget)."""
+import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urljoin, urlparse
+from xml.etree import ElementTree as ET
+from xml.sax.saxutils import escape
+
+from caldav.lib import error
+
+DAV_NS = "{DAV:}"
+CALDAV_NS = "{urn:ietf:params:xml:ns:caldav}"
+
+SYNC_COLLECTION_BODY = """<?xml version="1.0" encoding="utf-8"?>
+<d:sync-collection xmlns:d="DAV:">
+  <d:sync-token>{token}</d:sync-token>
+  <d:sync-level>1</d:sync-level>
+  <d:prop><d:getetag/></d:prop>
+</d:sync-collection>"""
+
+MULTIGET_BODY = """<?xml version="1.0" encoding="utf-8"?>
+<c:calendar-multiget xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:caldav">
+  <d:prop><d:getetag/><c:calendar-data/></d:prop>
+  {hrefs}
+</c:calendar-multiget>"""
+
+CALENDAR_QUERY_BODY = """<?xml version="1.0" encoding="utf-8"?>
+<c:calendar-query xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:caldav">
+  <d:prop><d:getetag/></d:prop>
+  <c:filter><c:comp-filter name="VCALENDAR"><c:comp-filter name="VEVENT">{time_range}</c:comp-filter></c:comp-filter></c:filter>
+</c:calendar-query>"""
+
+# Status codes a server uses to reject an unknown or expired sync-token
+# (RFC 6578 section 3.2: DAV:valid-sync-token precondition)
+INVALID_TOKEN_STATUSES = {403, 409, 412}
+
+# Bytes of a streamed REPORT response read and parsed at a time
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+class SyncTokenInvalid(Exception):
+    """The server no longer accepts the stored sync-token; a full resync is needed."""
+
+
+class CollectionDelta:
+    """Members listed by a sync-collection or calendar-query REPORT.
+
+    The response is parsed while it downloads: iterating (once) yields
+    (href, etag, deleted) per member, so the listing is never held in memory
+    as a whole. sync_token is known once the iteration is done.
+    """
+
+    def __init__(self, url: str, response):
+        self.url = url
+        self.sync_token: Optional[str] = None
+        self._response = response
+
+    def __iter__(self) -> Iterator[Tuple[str, Optional[str], bool]]:
+        collection_path = normalize_href(self.url, self.url).rstrip("/")
+        for href, status, props in _stream_responses(self._response, self):
+            path = normalize_href(self.url, href)
+            if path.rstrip("/") == collection_path or (status >= 300 and status != 404):
+                continue
+            yield path, props.get(f"{DAV_NS}getetag"), status == 404
+
+
+def normalize_href(base_url: str, href: str) -> str:
+    """Returns the path component of href, unquoted, so hrefs compare reliably."""
+    return unquote(urlparse(urljoin(base_url, href)).path)
+
+
+def _iter_responses(tree) -> Iterable[Tuple[str, int, Dict[str, Optional[str]]]]:
+    """Yields (href, status, props) for each DAV:response of a multistatus."""
+    for resp in tree.iter(f"{DAV_NS}response"):
+        href = resp.findtext(f"{DAV_NS}href")
+        if href is None:
+            continue
+        status_text = resp.findtext(f"{DAV_NS}status")
+        props: Dict[str, Optional[str]] = {}
+        status = 200
+        for propstat in resp.iter(f"{DAV_NS}propstat"):
+            ps_status = _parse_status(propstat.findtext(f"{DAV_NS}status"))
+            if ps_status != 200:
+                continue
+            for prop in propstat.iter(f"{DAV_NS}prop"):
+                for child in prop:
+                    props[child.tag] = child.text
+        if status_text is not None:
+            status = _parse_status(status_text)
+        yield href.strip(), status, props
+
+
+def _stream_report(client, url: str, body: str):
+    """Sends a Depth: 1 REPORT with the client's session, credentials and
+    headers, returning the response before its body is read."""
+    def send():
+        return client.session.request(
+            "REPORT", str(url), data=body.encode("utf-8"), headers=dict(client.headers, Depth="1"),
+            proxies={urlparse(str(url)).scheme: client.proxy} if client.proxy else None,
+            auth=client.auth, timeout=client.timeout, verify=client.ssl_verify_cert, cert=client.ssl_cert,
+            stream=True,
+        )
+
+    response = send()
+    challenge = response.headers.get("WWW-Authenticate")
+    # Negotiate the auth scheme on the first 401, as DAVClient.request does
+    if response.status_code == 401 and challenge and not client.auth and client.username is not None:
+        response.close()
+        client.build_auth_object(list(client.extract_auth_types(challenge)))
+        response = send()
+    return response
+
+
+def _stream_responses(response, delta: Optional[CollectionDelta] = None) -> Iterable[Tuple[str, int, Dict[str, Optional[str]]]]:
+    """_iter_responses over a streamed multistatus, dropping each DAV:response once
+    it is parsed; sets delta.sync_token when the token element goes by."""
+    parser = ET.XMLPullParser(events=("start", "end"))
+    root = None
+    try:
+        for data in response.iter_content(STREAM_CHUNK_BYTES):
+            parser.feed(data)
+            for event, element in parser.read_events():
+                if event == "start":
+                    root = element if root is None else root
+                elif element.tag == f"{DAV_NS}response":
+                    yield from _iter_responses(element)
+                    root.clear()
+                elif element.tag == f"{DAV_NS}sync-token" and delta is not None:
+                    delta.sync_token = element.text
+        parser.close()
+    finally:
+        response.close()
+
+
+def _parse_status(text: Optional[str]) -> int:
+    if not text:
+        return 200
+    parts = text.split()
+    return int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 200
+
+
+def sync_collection(client, url: str, sync_token: Optional[str]) -> CollectionDelta:
+    """Runs a sync-collection REPORT against a calendar collection.
+
+    Without a token the server lists every member (initial sync); with a token
+    only members added, changed or removed since then are returned.
+    """
+    body = SYNC_COLLECTION_BODY.format(token=escape(sync_token or ""))
+    response = _stream_report(client, url, body)
+    status = response.status_code
+    if status >= 400:
+        response.close()
+        # Most servers reject a stale token with 403
+        if sync_token and status in INVALID_TOKEN_STATUSES:
+            raise SyncTokenInvalid(f"Server rejected sync-token (HTTP {status})")
+        if status in (401, 403):
+            raise error.AuthorizationError(f"sync-collection REPORT failed with HTTP {status}")
+        raise error.ReportError(f"sync-collection REPORT failed with HTTP {status}")
+    return CollectionDelta(url, response)
+
+
+def calendar_query(client, url: str, start: Optional[datetime.datetime] = None,
+                   end: Optional[datetime.datetime] = None) -> CollectionDelta:
+    """Lists the hrefs and ETags of a collection's events with a calendar-query REPORT.
+
+    With start and/or end (UTC-naive) only events overlapping that range are
+    listed (RFC 4791 time-range; recurring events match if any instance does).
+    The result never carries a sync-token.
+    """
+    time_range = ""
+    if start is not None or end is not None:
+        bounds = "".join(f' {name}="{value:%Y%m%dT%H%M%S}Z"' for name, value in (("start", start), ("end", end))
+                         if value is not None)
+        time_range = f"<c:time-range{bounds}/>"
+    response = _stream_report(client, url, CALENDAR_QUERY_BODY.format(time_range=time_range))
+    if response.status_code >= 400:
+        response.close()
+        raise error.ReportError(f"calendar-query REPORT failed with HTTP {response.status_code}")
+    return CollectionDelta(url, response)
+
+
+def multiget(client, url: str, hrefs: List[str]) -> List[Tuple[str, Optional[str], str]]:
+    """Fetches calendar objects in one calendar-multiget REPORT.
+
+    Returns (href, etag, ics) for every object the server returned; hrefs that
+    vanished in the meantime are silently left out.
+    """
+    if not hrefs:
+        return []
+    body = MULTIGET_BODY.format(
+        hrefs="".join(f"<d:href>{escape(h)}</d:href>" for h in hrefs)
+    )
+    response = _stream_report(client, url, body)
+    if response.status_code >= 400:
+        response.close()
+        raise error.ReportError(f"calendar-multiget REPORT failed with HTTP {response.status_code}")
+
+    objects = []
+    for href, status, props in _stream_responses(response):
+        data = props.get(f"{CALDAV_NS}calendar-data")
+        if status != 200 or not data:
+            continue
+        objects.append((normalize_href(url, href), props.get(f"{DAV_NS}getetag"), data))
+    return objects
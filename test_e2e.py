@@ -3,7 +3,7 @@ import os
 import subprocess
 import time
 import httpx
-import ast
+import json
 from mcp.client.sse import sse_client
 from mcp.client.session import ClientSession
 
@@ -63,7 +63,7 @@ async def run_tests():
                     return
 
                 try:
-                    calendars = ast.literal_eval(result.content[0].text)
+                    calendars = json.loads(result.content[0].text)
                 except:
                     print("Failed to parse calendars.")
                     calendars = []
@@ -99,7 +99,7 @@ async def run_tests():
                     "end_date": "2023-10-27T23:59:59",
                     "calendar_name": calendar_name
                 })
-                events = ast.literal_eval(result.content[0].text)
+                events = json.loads(result.content[0].text)["events"]
                 print("Events found:", events)
                 
                 target_event = next((e for e in events if e["summary"] == summary), None)
@@ -121,7 +121,7 @@ async def run_tests():
                     "end_date": "2023-10-27T23:59:59",
                     "calendar_name": calendar_name
                 })
-                events = ast.literal_eval(result.content[0].text)
+                events = json.loads(result.content[0].text)["events"]
                 target_event = next((e for e in events if e["summary"] == summary), None)
                 assert target_event is None
                 print("Deletion verified.")
@@ -0,0 +1,416 @@
+"""A small in-process CalDAV server used as a stand-in for Nextcloud & co.
+
+It implements just enough of WebDAV/CalDAV for the ``caldav`` client and
+``CalDAVWrapper`` (principal discovery, calendar listing, sync-collection,
+calendar-multiget, GET/PUT/DELETE) and records every request it serves so
+tests can assert on the number and kind of round-trips.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+from xml.etree import ElementTree as ET
+from xml.sax.saxutils import escape
+
+DAV_NS = "DAV:"
+CALDAV_NS = "urn:ietf:params:xml:ns:caldav"
+
+BASE_PATH = "/dav/"
+PRINCIPAL_PATH = "/dav/principals/user/"
+HOME_PATH = "/dav/calendars/user/"
+SYNC_TOKEN_PREFIX = "http://stub.invalid/sync/"
+
+
+@dataclass
+class StubCalendar:
+    name: str
+    path: str
+    objects: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+    # Change log of (revision, href); the latest entry per href wins
+    changes: List[Tuple[int, str]] = field(default_factory=list)
+    revision: int = 0
+
+    @property
+    def sync_token(self) -> str:
+        return f"{SYNC_TOKEN_PREFIX}{self.path}{self.revision}"
+
+
+@dataclass
+class RequestRecord:
+    method: str
+    path: str
+    report: Optional[str] = None
+    hrefs: int = 0
+    bytes_out: int = 0
+    connection: int = 0  # client port, identifies the TCP connection
+
+
+def make_event_ics(uid: str, summary: str, start: str, end: str, extra: str = "") -> str:
+    """Builds a minimal single-VEVENT iCalendar object (start/end as YYYYMMDDTHHMMSSZ)."""
+    return (
+        "BEGIN:VCALENDAR\r\n"
+        "VERSION:2.0\r\n"
+        "PRODID:-//fast-calendar-mcp//stub//EN\r\n"
+        "BEGIN:VEVENT\r\n"
+        f"UID:{uid}\r\n"
+        "DTSTAMP:20240101T000000Z\r\n"
+        f"DTSTART:{start}\r\n"
+        f"DTEND:{end}\r\n"
+        f"SUMMARY:{summary}\r\n"
+        f"{extra}"
+        "END:VEVENT\r\n"
+        "END:VCALENDAR\r\n"
+    )
+
+
+class CalDAVStub:
+    """Threaded CalDAV stand-in; use as a context manager or call start()/stop()."""
+
+    def __init__(self, supports_sync: bool = True, latency: float = 0.0):
+        self.supports_sync = supports_sync
+        self.latency = latency
+        self.calendars: Dict[str, StubCalendar] = {}
+        self.requests: List[RequestRecord] = []
+        self.fail_paths: set = set()
+        self.lock = threading.RLock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # -- data manipulation -------------------------------------------------
+
+    def add_calendar(self, name: str, slug: Optional[str] = None) -> StubCalendar:
+        path = f"{HOME_PATH}{slug or name.lower()}/"
+        with self.lock:
+            cal = StubCalendar(name=name, path=path)
+            self.calendars[path] = cal
+            return cal
+
+    def put_object(self, cal: StubCalendar, filename: str, ics: str) -> str:
+        href = cal.path + filename
+        with self.lock:
+            etag = '"%s"' % hashlib.md5(ics.encode()).hexdigest()
+            cal.objects[href] = (etag, ics)
+            cal.revision += 1
+            cal.changes.append((cal.revision, href))
+            return href
+
+    def add_event(self, cal: StubCalendar, uid: str, summary: str,
+                  start: str = "20240101T100000Z", end: str = "20240101T110000Z",
+                  extra: str = "") -> str:
+        return self.put_object(cal, f"{uid}.ics", make_event_ics(uid, summary, start, end, extra))
+
+    def remove_object(self, cal: StubCalendar, href: str) -> None:
+        with self.lock:
+            del cal.objects[href]
+            cal.revision += 1
+            cal.changes.append((cal.revision, href))
+
+    def forget_history(self, cal: StubCalendar) -> None:
+        """Drops the change log so previously issued sync-tokens become invalid."""
+        with self.lock:
+            cal.changes.clear()
+            cal.revision += 1000
+
+    def reset_log(self) -> None:
+        with self.lock:
+            self.requests.clear()
+
+    def count(self, method: str, report: Optional[str] = None) -> int:
+        return sum(1 for r in self.requests
+                   if r.method == method and (report is None or r.report == report))
+
+    # -- server lifecycle ----------------------------------------------------
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{BASE_PATH}"
+
+    def calendar_url(self, cal: StubCalendar) -> str:
+        return self.url[:-len(BASE_PATH)] + cal.path
+
+    def start(self) -> "CalDAVStub":
+        stub = self
+
+        class Handler(_StubHandler):
+            server_stub = stub
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "CalDAVStub":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def _overlaps(ics: str, start: str, end: str) -> bool:
+    """Rough time-range match on the YYYYMMDDTHHMMSS text of DTSTART/DTEND.
+
+    Timezones are ignored and a recurring event matches from its first
+    instance on, which is all the tests need.
+    """
+    values = {}
+    for line in ics.splitlines():
+        name, _, value = line.partition(":")
+        key = name.split(";")[0]
+        if key in ("DTSTART", "DTEND", "RRULE") and key not in values:
+            values[key] = value.rstrip("Z")
+    dtstart = values.get("DTSTART", "")
+    dtend = "~" if "RRULE" in values else values.get("DTEND", dtstart)
+    return dtstart < end.rstrip("Z") and dtend > start.rstrip("Z")
+
+
+def _response_xml(href: str, props: str, status: str = "HTTP/1.1 200 OK") -> str:
+    if not props:
+        return f"<d:response><d:href>{escape(href)}</d:href><d:status>{status}</d:status></d:response>"
+    return (
+        f"<d:response><d:href>{escape(href)}</d:href>"
+        f"<d:propstat><d:prop>{props}</d:prop><d:status>{status}</d:status></d:propstat>"
+        "</d:response>"
+    )
+
+
+def _multistatus(body: str, extra: str = "") -> str:
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        f'<d:multistatus xmlns:d="DAV:" xmlns:c="{CALDAV_NS}" xmlns:cs="http://calendarserver.org/ns/">'
+        f"{body}{extra}</d:multistatus>"
+    )
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    server_stub: CalDAVStub = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    # -- helpers -------------------------------------------------------------
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status: int, body: str = "", headers: Optional[dict] = None,
+              content_type: str = "application/xml; charset=utf-8") -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+        record = getattr(self, "_current", None)
+        if record is not None:
+            record.bytes_out = len(data)
+
+    def _record(self, report: Optional[str] = None, hrefs: int = 0) -> str:
+        path = unquote(urlparse(self.path).path)
+        stub = self.server_stub
+        self._current = RequestRecord(self.command, path, report, hrefs, connection=self.client_address[1])
+        with stub.lock:
+            stub.requests.append(self._current)
+        if stub.latency:
+            time.sleep(stub.latency)
+        return path
+
+    def _calendar_for(self, path: str) -> Optional[StubCalendar]:
+        if not path.endswith("/"):
+            path = path.rsplit("/", 1)[0] + "/"
+        return self.server_stub.calendars.get(path)
+
+    # -- verbs ---------------------------------------------------------------
+
+    def do_OPTIONS(self):
+        self._record()
+        self._send(200, headers={
+            "DAV": "1, 2, 3, calendar-access",
+            "Allow": "OPTIONS, GET, PUT, DELETE, PROPFIND, REPORT",
+        })
+
+    def do_PROPFIND(self):
+        self._read_body()
+        path = self._record()
+        stub = self.server_stub
+        depth = self.headers.get("Depth", "0")
+        if path in stub.fail_paths:
+            return self._send(500, "boom", content_type="text/plain")
+
+        principal_props = (
+            f"<d:current-user-principal><d:href>{PRINCIPAL_PATH}</d:href></d:current-user-principal>"
+            f"<c:calendar-home-set><d:href>{HOME_PATH}</d:href></c:calendar-home-set>"
+            "<d:resourcetype><d:collection/></d:resourcetype>"
+            "<d:displayname>user</d:displayname>"
+        )
+        with stub.lock:
+            if path in (BASE_PATH, PRINCIPAL_PATH, "/"):
+                return self._send(207, _multistatus(_response_xml(path, principal_props)))
+            # HOME_PATH, or any other collection holding calendars (e.g. one home per account)
+            children = [cal for cal in stub.calendars.values()
+                        if cal.path.startswith(path) and cal.path[len(path):].count("/") == 1]
+            if path == HOME_PATH or (children and path.endswith("/")):
+                body = _response_xml(path, principal_props)
+                if depth != "0":
+                    for cal in children:
+                        body += _response_xml(cal.path, self._calendar_props(cal))
+                return self._send(207, _multistatus(body))
+            cal = stub.calendars.get(path)
+            if cal is not None:
+                body = _response_xml(cal.path, self._calendar_props(cal))
+                if depth != "0":
+                    for href, (etag, _) in cal.objects.items():
+                        body += _response_xml(href, f"<d:getetag>{escape(etag)}</d:getetag>")
+                return self._send(207, _multistatus(body))
+        self._send(404, "")
+
+    def _calendar_props(self, cal: StubCalendar) -> str:
+        return (
+            "<d:resourcetype><d:collection/><c:calendar/></d:resourcetype>"
+            f"<d:displayname>{escape(cal.name)}</d:displayname>"
+            '<c:supported-calendar-component-set><c:comp name="VEVENT"/></c:supported-calendar-component-set>'
+            f"<cs:getctag>{cal.revision}</cs:getctag>"
+            f"<d:sync-token>{escape(cal.sync_token)}</d:sync-token>"
+        )
+
+    def do_REPORT(self):
+        raw = self._read_body()
+        root = ET.fromstring(raw)
+        kind = root.tag.split("}")[-1]
+        hrefs = [h.text for h in root.iter(f"{{{DAV_NS}}}href")]
+        path = self._record(kind, len(hrefs))
+        stub = self.server_stub
+        if path in stub.fail_paths:
+            return self._send(500, "boom", content_type="text/plain")
+        # Built under the lock but sent outside it, so a client that reads a
+        # long listing as it goes can fetch other objects meanwhile
+        with stub.lock:
+            response = self._report(kind, root, hrefs, stub.calendars.get(path))
+        self._send(*response)
+
+    def _report(self, kind: str, root: ET.Element, hrefs: List[str], cal: Optional[StubCalendar]) -> tuple:
+        """Arguments of the _send answering a REPORT; the caller holds the lock."""
+        if cal is None:
+            return 404, ""
+        if kind == "sync-collection":
+            return self._sync_collection(cal, root)
+        if kind == "calendar-multiget":
+            body = ""
+            for href in hrefs:
+                href = unquote(href)
+                if href in cal.objects:
+                    etag, ics = cal.objects[href]
+                    body += _response_xml(href, self._object_props(etag, ics))
+                else:
+                    body += _response_xml(href, "", "HTTP/1.1 404 Not Found")
+            return 207, _multistatus(body)
+        if kind == "calendar-query":
+            want_data = root.find(f".//{{{CALDAV_NS}}}calendar-data") is not None
+            time_range = root.find(f".//{{{CALDAV_NS}}}time-range")
+            start, end = ((time_range.get("start", ""), time_range.get("end", "~"))
+                          if time_range is not None else ("", "~"))
+            body = ""
+            for href, (etag, ics) in cal.objects.items():
+                if _overlaps(ics, start, end):
+                    body += _response_xml(href, self._object_props(etag, ics if want_data else None))
+            return 207, _multistatus(body)
+        return 501, ""
+
+    def _object_props(self, etag: str, ics: Optional[str]) -> str:
+        props = f"<d:getetag>{escape(etag)}</d:getetag>"
+        if ics is not None:
+            props += f"<c:calendar-data>{escape(ics)}</c:calendar-data>"
+        return props
+
+    def _sync_collection(self, cal: StubCalendar, root: ET.Element):
+        stub = self.server_stub
+        if not stub.supports_sync:
+            return 501, "sync-collection not supported", None, "text/plain"
+        token_el = root.find(f"{{{DAV_NS}}}sync-token")
+        token = (token_el.text or "").strip() if token_el is not None else ""
+        since = 0
+        if token:
+            prefix = f"{SYNC_TOKEN_PREFIX}{cal.path}"
+            rev = token[len(prefix):] if token.startswith(prefix) else ""
+            known = {r for r, _ in cal.changes}
+            if not rev.isdigit() or (int(rev) not in known and int(rev) != cal.revision):
+                return (
+                    403,
+                    _multistatus("").replace("multistatus", "error")
+                    .replace("</d:error>", "<d:valid-sync-token/></d:error>"),
+                )
+            since = int(rev)
+        body = ""
+        if since == 0:
+            for href, (etag, _) in cal.objects.items():
+                body += _response_xml(href, f"<d:getetag>{escape(etag)}</d:getetag>")
+        else:
+            touched = []
+            for rev, href in cal.changes:
+                if rev > since and href not in touched:
+                    touched.append(href)
+            for href in touched:
+                if href in cal.objects:
+                    body += _response_xml(href, f"<d:getetag>{escape(cal.objects[href][0])}</d:getetag>")
+                else:
+                    body += _response_xml(href, "", "HTTP/1.1 404 Not Found")
+        return 207, _multistatus(body, f"<d:sync-token>{escape(cal.sync_token)}</d:sync-token>")
+
+    def do_GET(self):
+        path = self._record()
+        stub = self.server_stub
+        with stub.lock:
+            cal = self._calendar_for(path)
+            if cal is not None and path in cal.objects:
+                etag, ics = cal.objects[path]
+                return self._send(200, ics, {"ETag": etag}, "text/calendar; charset=utf-8")
+        self._send(404, "")
+
+    def do_PUT(self):
+        body = self._read_body().decode("utf-8")
+        path = self._record()
+        stub = self.server_stub
+        with stub.lock:
+            cal = self._calendar_for(path)
+            if cal is None:
+                return self._send(409, "")
+            existed = path in cal.objects
+            if self.headers.get("If-None-Match") == "*" and existed:
+                return self._send(412, "")
+            filename = path[len(cal.path):]
+            stub.put_object(cal, filename, body)
+            etag = cal.objects[path][0]
+        self._send(204 if existed else 201, "", {"ETag": etag})
+
+    def do_DELETE(self):
+        path = self._record()
+        stub = self.server_stub
+        with stub.lock:
+            cal = self._calendar_for(path)
+            if cal is None or path not in cal.objects:
+                return self._send(404, "")
+            if_match = self.headers.get("If-Match")
+            if if_match and if_match != cal.objects[path][0]:
+                return self._send(412, "")
+            stub.remove_object(cal, path)
+        self._send(204, "")
+
+
+def new_uid() -> str:
+    return str(uuid.uuid4())
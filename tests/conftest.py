@@ -0,0 +1,35 @@
+import os
+import tempfile
+
+# Point the app at a throwaway database before src.db is imported
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/calendar.db"
+
+import pytest
+
+from src.db import Base, engine, init_db, read_engine
+from tests.caldav_stub import CalDAVStub
+
+
+@pytest.fixture
+def db():
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    # Pooled read connections may still hold the schema of the previous test
+    read_engine.dispose()
+    yield engine
+
+
+@pytest.fixture
+def stub():
+    with CalDAVStub() as server:
+        yield server
+
+
+@pytest.fixture
+def wrapper(db, stub, monkeypatch):
+    from src.caldav_wrapper import CalDAVWrapper
+
+    monkeypatch.setenv("CALDAV_BASE_URL", stub.url)
+    monkeypatch.setenv("CALDAV_USERNAME", "user")
+    monkeypatch.setenv("CALDAV_PASSWORD", "secret")
+    return CalDAVWrapper()
@@ -0,0 +1,148 @@
+import asyncio
+import datetime
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from src import mcp_server
+from src.accounts import Account, AccountRegistry, load_accounts
+from src.db import Database
+from src.scheduler import SyncLimiter, SyncScheduler
+from tests.caldav_stub import CalDAVStub
+
+MARCH = (datetime.datetime(2024, 3, 1), datetime.datetime(2024, 4, 1))
+
+
+@pytest.fixture
+def stubs():
+    with CalDAVStub() as alice, CalDAVStub() as bob:
+        for stub, uid in ((alice, "alice-event"), (bob, "bob-event")):
+            stub.add_event(stub.add_calendar("Work"), uid, uid, "20240301T100000Z", "20240301T110000Z")
+        yield alice, bob
+
+
+@pytest.fixture
+def registry(stubs, tmp_path):
+    alice, bob = stubs
+    registry = AccountRegistry({"alice": Account("alice", alice.url, "alice", "secret"),
+                                "bob": Account("bob", bob.url, "bob", "secret")}, db_dir=str(tmp_path))
+    yield registry
+    registry.close_all()
+
+
+def uids(wrapper):
+    return [event["uid"] for event in wrapper.list_events(*MARCH)]
+
+
+def test_accounts_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("BOB_PASSWORD", "from-env")
+    path = tmp_path / "accounts.json"
+    path.write_text(json.dumps([
+        {"id": "alice", "base_url": "https://dav.example.com/", "username": "alice", "password": "inline"},
+        {"id": "bob", "base_url": "https://dav.example.com/", "username": "bob", "password_env": "BOB_PASSWORD"},
+    ]))
+
+    accounts = load_accounts(str(path))
+
+    assert accounts["alice"].password == "inline" and accounts["bob"].password == "from-env"
+    path.write_text(json.dumps([{"id": "../etc", "base_url": "x", "username": "u", "password": "p"}]))
+    with pytest.raises(ValueError):
+        load_accounts(str(path))
+
+
+def test_each_account_syncs_into_its_own_shard(registry, tmp_path):
+    registry.wrapper("alice").sync()
+    registry.wrapper("bob").sync()
+
+    assert uids(registry.wrapper("alice")) == ["alice-event"]
+    assert uids(registry.wrapper("bob")) == ["bob-event"]
+    assert {"alice.db", "bob.db"} <= set(os.listdir(tmp_path))
+    with pytest.raises(ValueError):
+        registry.wrapper("carol")
+
+
+def test_least_recently_used_account_is_closed(registry):
+    registry.max_open = 1
+    alice = registry.wrapper("alice")
+    alice.sync()
+
+    registry.wrapper("bob")
+
+    assert registry.open_count() == 1 and registry.get_open("alice") is None
+    # Reopened from its shard, without another sync
+    assert registry.wrapper("alice") is not alice
+    assert uids(registry.wrapper("alice")) == ["alice-event"]
+
+
+def test_opening_an_account_does_not_block_open_ones(registry, monkeypatch):
+    alice = registry.wrapper("alice")
+    started, release = threading.Event(), threading.Event()
+    init = Database.init
+
+    def slow_init(db):
+        started.set()
+        release.wait(5)
+        init(db)
+
+    monkeypatch.setattr(Database, "init", slow_init)
+    opening = threading.Thread(target=registry.wrapper, args=("bob",))
+    opening.start()
+    assert started.wait(5)
+
+    t0 = time.perf_counter()
+    assert registry.get_open("alice") is alice and registry.wrapper("alice") is alice
+    assert time.perf_counter() - t0 < 1
+    release.set()
+    opening.join()
+    assert registry.get_open("bob") is not None
+
+
+def test_tool_calls_are_routed_by_session_or_argument(registry, monkeypatch):
+    monkeypatch.setattr(mcp_server, "registry", registry)
+    monkeypatch.setattr(mcp_server, "_account_schedulers", {})
+    registry.wrapper("alice").sync()
+    registry.wrapper("bob").sync()
+    window = {"start_date": "2024-03-01T00:00:00", "end_date": "2024-04-01T00:00:00"}
+
+    async def main():
+        by_argument = await mcp_server.handle_call_tool("list_events", dict(window, account="bob"))
+        mcp_server.session_account.set("alice")
+        by_session = await mcp_server.handle_call_tool("list_events", window)
+        with pytest.raises(ValueError):
+            await mcp_server.handle_call_tool("list_events", dict(window, account="bob"))
+        tools = await mcp_server.handle_list_tools()
+        return by_argument[0].text, by_session[0].text, tools
+
+    by_argument, by_session, tools = asyncio.run(main())
+
+    assert '"bob-event"' in by_argument and '"alice-event"' not in by_argument
+    assert '"alice-event"' in by_session and '"bob-event"' not in by_session
+    assert all("account" in tool.inputSchema["properties"] for tool in tools)
+    with pytest.raises(ValueError):
+        mcp_server.resolve_account()
+
+
+def test_limiter_bounds_concurrency_and_start_rate():
+    running, peak, starts = [0], [0], []
+
+    def sync():
+        starts.append(time.perf_counter())
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        running[0] -= 1
+        return {}
+
+    limiter = SyncLimiter(concurrency=2, rate=20)
+    schedulers = [SyncScheduler(sync, interval=0, limiter=limiter) for _ in range(6)]
+
+    async def main():
+        await asyncio.gather(*(scheduler.request() for scheduler in schedulers))
+
+    asyncio.run(main())
+
+    assert peak[0] <= 2
+    assert starts[-1] - starts[0] >= 5 / 20 - 0.01
@@ -0,0 +1,87 @@
+import datetime
+
+import pytest
+
+from src.db import Event, SessionLocal
+
+
+def _events():
+    session = SessionLocal()
+    try:
+        return {e.uid: e for e in session.query(Event)}
+    finally:
+        session.close()
+
+
+def _wait(wrapper):
+    if wrapper._reconcile_thread:
+        wrapper._reconcile_thread.join(timeout=5)
+
+
+def _item(calendar_name, summary, day=1):
+    return {"calendar_name": calendar_name, "summary": summary,
+            "start": datetime.datetime(2024, 5, day, 9), "end": datetime.datetime(2024, 5, day, 10)}
+
+
+def test_create_events_reports_each_item(wrapper, stub):
+    work = stub.add_calendar("Work")
+    home = stub.add_calendar("Home")
+    wrapper.sync()
+    stub.reset_log()
+
+    results = wrapper.create_events([
+        _item("Work", "Planning", 1),
+        _item("Nope", "Lost"),
+        {"calendar_name": "Home", "summary": "Dentist", "start": "2024-05-02T15:00:00", "end": "2024-05-02T16:00:00"},
+        {"calendar_name": "Work", "start": "2024-05-03T09:00:00", "end": "2024-05-03T10:00:00"},
+        {"calendar_name": "Work", "summary": "Bad date", "start": "tomorrow", "end": "2024-05-03T10:00:00"},
+    ])
+
+    assert [r["status"] for r in results] == ["created", "error", "created", "error", "error"]
+    assert results[1]["error"] == "Calendar 'Nope' not found on server"
+    assert results[3]["error"] == "Missing field 'summary'"
+    events = _events()
+    assert events[results[0]["uid"]].summary == "Planning"
+    assert events[results[2]["uid"]].start == datetime.datetime(2024, 5, 2, 15)
+    assert len(work.objects) == 1 and len(home.objects) == 1
+    # Calendars are resolved from the local DB, except "Nope", which costs one listing
+    assert stub.count("PROPFIND") <= 1
+    assert stub.count("PUT") == 2
+
+    _wait(wrapper)
+    assert set(_events()) == {results[0]["uid"], results[2]["uid"]}
+
+
+def test_delete_events_uses_stored_hrefs(wrapper, stub):
+    work = stub.add_calendar("Work")
+    home = stub.add_calendar("Home")
+    stub.add_event(work, "a", "A")
+    stub.add_event(work, "b", "B")
+    stub.add_event(home, "c", "C")
+    stub.add_event(home, "kept", "Kept")
+    wrapper.sync()
+    # Gone on the server behind our back
+    stub.remove_object(work, f"{work.path}b.ics")
+    stub.reset_log()
+
+    results = wrapper.delete_events([
+        {"calendar_name": "Work", "uid": "a"},
+        {"calendar_name": "Work", "uid": "b"},
+        {"calendar_name": "Home", "uid": "c"},
+        {"calendar_name": "Home"},
+    ])
+
+    assert [r["status"] for r in results] == ["deleted", "not_found", "deleted", "error"]
+    assert stub.count("DELETE") == 3
+    # The stored hrefs make UID lookups unnecessary, except for the one the server no longer has
+    assert stub.count("REPORT") == 1
+    assert stub.count("PROPFIND") == 0
+    assert set(_events()) == {"kept"}
+    _wait(wrapper)
+    assert set(_events()) == {"kept"}
+
+
+def test_batch_size_is_bounded(wrapper, monkeypatch):
+    monkeypatch.setattr("src.caldav_wrapper.BATCH_MAX_ITEMS", 2)
+    with pytest.raises(ValueError):
+        wrapper.create_events([_item("Work", "x")] * 3)
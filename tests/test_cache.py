@@ -0,0 +1,71 @@
+import datetime
+import time
+
+from src.cache import QueryCache
+
+MARCH = (datetime.datetime(2024, 3, 1), datetime.datetime(2024, 4, 1))
+
+
+def test_repeated_reads_are_served_from_cache(wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "one", "One", "20240301T100000Z", "20240301T110000Z")
+    wrapper.sync()
+
+    first = wrapper.list_events(*MARCH)
+    assert wrapper.list_events(*MARCH) is first
+    assert wrapper.list_events(*MARCH, calendar_name="Work") == first
+    stats = wrapper.cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        wrapper.list_events(*MARCH)
+    assert (time.perf_counter() - t0) / 1000 < 0.001
+
+
+def test_sync_and_writes_invalidate_only_touched_calendars(wrapper, stub):
+    work = stub.add_calendar("Work")
+    home = stub.add_calendar("Home")
+    stub.add_event(work, "one", "One", "20240301T100000Z", "20240301T110000Z")
+    wrapper.sync()
+    home_events = wrapper.list_events(*MARCH, calendar_name="Home")
+    assert wrapper.list_events(*MARCH, calendar_name="Work")[0]["summary"] == "One"
+
+    stub.add_event(work, "one", "Renamed", "20240301T100000Z", "20240301T110000Z")
+    wrapper.sync()
+    assert wrapper.list_events(*MARCH, calendar_name="Work")[0]["summary"] == "Renamed"
+    assert wrapper.list_events(*MARCH, calendar_name="Home") is home_events
+
+    uid = wrapper.create_event("Home", "Dinner", datetime.datetime(2024, 3, 2, 18), datetime.datetime(2024, 3, 2, 20))
+    wrapper._reconcile_thread.join()
+    assert [e["uid"] for e in wrapper.list_events(*MARCH, calendar_name="Home")] == [uid]
+    assert [e["summary"] for e in wrapper.search_events("dinner")] == ["Dinner"]
+
+
+def test_unchanged_sync_keeps_cache(wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "one", "One", "20240301T100000Z", "20240301T110000Z")
+    wrapper.sync()
+    events = wrapper.list_events(*MARCH)
+
+    wrapper.sync()
+
+    assert wrapper.list_events(*MARCH) is events
+
+
+def test_lru_respects_entry_and_memory_bounds():
+    cache = QueryCache(max_entries=2, max_bytes=10_000, ttl=60)
+    for key in ("a", "b", "c"):
+        cache.get_or_compute(key, None, lambda: [key])
+    assert cache.stats()["entries"] == 2 and cache.stats()["evictions"] == 1
+
+    cache.get_or_compute("big", None, lambda: ["x" * 20_000])
+    assert cache.stats()["bytes"] <= 10_000
+
+
+def test_ttl_expires_entries():
+    cache = QueryCache(ttl=0)
+    calls = []
+    cache.get_or_compute("k", None, lambda: calls.append(1))
+    cache.get_or_compute("k", None, lambda: calls.append(1))
+    assert len(calls) == 2
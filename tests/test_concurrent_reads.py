@@ -0,0 +1,96 @@
+import asyncio
+import datetime
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+
+from src.cache import QueryCache
+from src.db import ReadSessionLocal, async_read_engine, engine
+
+READERS = 200
+
+
+def _populate(wrapper, stub, count=300):
+    work = stub.add_calendar("Work")
+    for i in range(count):
+        day = 1 + i % 28
+        stub.add_event(work, f"ev-{i}", f"Event {i}", f"202403{day:02d}T{8 + i % 10:02d}0000Z",
+                       f"202403{day:02d}T{9 + i % 10:02d}0000Z")
+    wrapper.sync()
+    # Every call must reach the database
+    wrapper.cache = QueryCache(max_entries=0)
+    return work
+
+
+async def _read_concurrently(wrapper):
+    async def one(i):
+        start = datetime.datetime(2024, 3, 1) + datetime.timedelta(hours=i)
+        page = await wrapper.list_events_page_async(start, start + datetime.timedelta(days=7), limit=50)
+        return len(page["events"])
+    try:
+        return await asyncio.gather(*(one(i) for i in range(READERS)))
+    finally:
+        # The async pool belongs to this event loop
+        await async_read_engine.dispose()
+
+
+def test_reads_do_not_block_on_an_open_write_transaction(wrapper, stub):
+    _populate(wrapper, stub)
+    writer = engine.raw_connection()
+    try:
+        cursor = writer.cursor()
+        cursor.execute("BEGIN EXCLUSIVE")
+        cursor.execute("DELETE FROM events")
+
+        t0 = time.perf_counter()
+        counts = asyncio.run(_read_concurrently(wrapper))
+        elapsed = time.perf_counter() - t0
+    finally:
+        writer.rollback()
+        writer.close()
+
+    # Readers see the last committed state and never wait for busy_timeout
+    assert all(count == 50 for count in counts)
+    assert elapsed < 4
+
+
+def test_reads_run_alongside_a_sync(wrapper, stub):
+    work = _populate(wrapper, stub)
+    for i in range(300, 1300):
+        stub.add_event(work, f"ev-{i}", f"Event {i}", "20240415T100000Z", "20240415T110000Z")
+    syncing = threading.Thread(target=wrapper.sync)
+    syncing.start()
+    try:
+        counts = asyncio.run(_read_concurrently(wrapper))
+    finally:
+        syncing.join()
+    assert all(count == 50 for count in counts)
+
+
+def test_read_pool_is_query_only(db):
+    session = ReadSessionLocal()
+    try:
+        assert session.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        with pytest.raises(Exception, match="readonly"):
+            session.execute(text("DELETE FROM events"))
+    finally:
+        session.close()
+
+
+def test_async_reads_load_the_calendar_index_without_blocking(wrapper, stub, monkeypatch):
+    _populate(wrapper, stub)
+    wrapper._calendar_index = None
+    monkeypatch.setattr(wrapper.db, "ReadSessionLocal", lambda: pytest.fail("blocking read on the event loop"))
+
+    async def main():
+        try:
+            page = await wrapper.list_events_page_async(datetime.datetime(2024, 3, 1), datetime.datetime(2024, 4, 1),
+                                                        calendar_name="Work", limit=10)
+        finally:
+            await async_read_engine.dispose()
+        return page
+
+    assert len(asyncio.run(main())["events"]) == 10
+    assert list(wrapper._calendar_index) == ["Work"]
@@ -0,0 +1,84 @@
+import datetime
+
+from src import freebusy
+
+
+def _dt(*args):
+    return datetime.datetime(*args)
+
+
+def test_merge_intervals_sweeps_unsorted_input():
+    merged = freebusy.merge_intervals([
+        (_dt(2024, 3, 1, 13), _dt(2024, 3, 1, 14)),
+        (_dt(2024, 3, 1, 9), _dt(2024, 3, 1, 10)),
+        (_dt(2024, 3, 1, 9, 30), _dt(2024, 3, 1, 11)),
+        (_dt(2024, 3, 1, 11), _dt(2024, 3, 1, 12)),
+        (_dt(2024, 3, 1, 9, 45), _dt(2024, 3, 1, 10)),
+    ])
+    assert merged == [(_dt(2024, 3, 1, 9), _dt(2024, 3, 1, 12)), (_dt(2024, 3, 1, 13), _dt(2024, 3, 1, 14))]
+
+
+def test_working_windows_follow_dst():
+    berlin = freebusy.get_timezone("Europe/Berlin")
+    # Friday 2024-03-29 to Monday 2024-04-01; summer time starts on Sunday
+    windows = freebusy.working_windows(_dt(2024, 3, 29), _dt(2024, 4, 2), berlin,
+                                       datetime.time(9), datetime.time(17))
+    assert windows == [(_dt(2024, 3, 29, 8), _dt(2024, 3, 29, 16)), (_dt(2024, 4, 1, 7), _dt(2024, 4, 1, 15))]
+
+
+def test_busy_blocks_merge_across_calendars(wrapper, stub):
+    work = stub.add_calendar("Work")
+    home = stub.add_calendar("Home")
+    stub.add_event(work, "a", "A", "20240301T090000Z", "20240301T100000Z")
+    stub.add_event(home, "b", "B", "20240301T093000Z", "20240301T110000Z")
+    stub.add_event(work, "free", "Tentative hold", "20240301T130000Z", "20240301T140000Z",
+                   extra="TRANSP:TRANSPARENT\r\n")
+    stub.add_event(work, "cancelled", "Cancelled", "20240301T150000Z", "20240301T160000Z",
+                   extra="STATUS:CANCELLED\r\n")
+    stub.add_event(home, "daily", "Daily", "20240301T120000Z", "20240301T121500Z",
+                   extra="RRULE:FREQ=DAILY;COUNT=2\r\n")
+    wrapper.sync()
+
+    busy = wrapper.get_free_busy(_dt(2024, 3, 1), _dt(2024, 3, 2))
+    assert busy == [
+        {"start": "2024-03-01T09:00:00+00:00", "end": "2024-03-01T11:00:00+00:00"},
+        {"start": "2024-03-01T12:00:00+00:00", "end": "2024-03-01T12:15:00+00:00"},
+    ]
+    assert wrapper.get_free_busy(_dt(2024, 3, 1), _dt(2024, 3, 2), ["Work"]) == [
+        {"start": "2024-03-01T09:00:00+00:00", "end": "2024-03-01T10:00:00+00:00"},
+    ]
+
+
+def test_all_day_events_block_the_local_day_when_included(wrapper, stub):
+    work = stub.add_calendar("Work")
+    ics = (
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:test\r\nBEGIN:VEVENT\r\nUID:offsite\r\n"
+        "DTSTAMP:20240101T000000Z\r\nDTSTART;VALUE=DATE:20240305\r\nSUMMARY:Offsite\r\n"
+        "END:VEVENT\r\nEND:VCALENDAR\r\n"
+    )
+    stub.put_object(work, "offsite.ics", ics)
+    wrapper.sync()
+
+    window = (_dt(2024, 3, 4), _dt(2024, 3, 7))
+    assert wrapper.get_free_busy(*window, timezone="Europe/Berlin") == []
+    assert wrapper.get_free_busy(*window, timezone="Europe/Berlin", include_all_day=True) == [
+        {"start": "2024-03-05T00:00:00+01:00", "end": "2024-03-06T00:00:00+01:00"},
+    ]
+
+
+def test_find_free_slots_within_working_hours(wrapper, stub):
+    work = stub.add_calendar("Work")
+    # 09:00-10:00 and 10:20-16:00 Berlin time on Monday 2024-03-04
+    stub.add_event(work, "a", "A", "20240304T080000Z", "20240304T090000Z")
+    stub.add_event(work, "b", "B", "20240304T092000Z", "20240304T150000Z")
+    wrapper.sync()
+
+    slots = wrapper.find_free_slots(_dt(2024, 3, 2), _dt(2024, 3, 6), 30, timezone="Europe/Berlin",
+                                    working_hours=(datetime.time(9), datetime.time(17)))
+    # Saturday and Sunday are skipped and the 20-minute gap is too short
+    assert slots == [
+        {"start": "2024-03-04T16:00:00+01:00", "end": "2024-03-04T17:00:00+01:00"},
+        {"start": "2024-03-05T09:00:00+01:00", "end": "2024-03-05T17:00:00+01:00"},
+    ]
+    assert len(wrapper.find_free_slots(_dt(2024, 3, 2), _dt(2024, 3, 6), 30, timezone="Europe/Berlin",
+                                       working_hours=(datetime.time(9), datetime.time(17)), limit=1)) == 1
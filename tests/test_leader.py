@@ -0,0 +1,89 @@
+import asyncio
+import datetime
+
+import pytest
+
+from src import mcp_server
+from src.caldav_wrapper import CalDAVWrapper
+from src.db import DATABASE_URL, Database
+from src.leader import LeaderElection
+
+MARCH = (datetime.datetime(2024, 3, 1), datetime.datetime(2024, 4, 1))
+
+
+def uids(wrapper):
+    return sorted(event["uid"] for event in wrapper.list_events(*MARCH))
+
+
+@pytest.fixture
+def follower(wrapper):
+    # Its own engines and connections over the same file, as in another worker process
+    follower = CalDAVWrapper(db=Database(DATABASE_URL))
+    follower.shared = True
+    yield follower
+    follower.close()
+
+
+def test_only_one_process_leads(tmp_path):
+    first, second = LeaderElection(str(tmp_path)), LeaderElection(str(tmp_path))
+
+    assert first.try_acquire() and not second.try_acquire()
+    first.release()
+    assert second.try_acquire() and not first.try_acquire()
+    second.release()
+
+
+def test_follower_catches_up_with_leader_commits(wrapper, follower, stub):
+    cal = stub.add_calendar("Work")
+    stub.add_event(cal, "first", "First", "20240301T100000Z", "20240301T110000Z")
+    wrapper.sync()
+    assert uids(follower) == ["first"]
+
+    stub.add_event(cal, "second", "Second", "20240302T100000Z", "20240302T110000Z")
+    wrapper.sync()
+
+    assert uids(follower) == ["first", "second"]
+    # Without catching up the follower would keep serving its cached read
+    follower.shared = False
+    stub.add_event(cal, "third", "Third", "20240303T100000Z", "20240303T110000Z")
+    wrapper.sync()
+    assert uids(follower) == ["first", "second"]
+
+
+def test_follower_forwards_writes_to_the_leader(wrapper, stub, tmp_path, monkeypatch):
+    stub.add_calendar("Work")
+    wrapper.sync()
+    leader, follower = LeaderElection(str(tmp_path)), LeaderElection(str(tmp_path))
+    assert leader.try_acquire() and not follower.try_acquire()
+    monkeypatch.setattr(mcp_server, "_initialized", True)
+    monkeypatch.setattr(mcp_server, "_caldav_wrapper", wrapper)
+    monkeypatch.setattr(mcp_server, "election", follower)
+    forwarded = []
+
+    async def on_leader(request):
+        # Both workers live in this process: run the tool as the leader would
+        forwarded.append(request["tool"])
+        with monkeypatch.context() as m:
+            m.setattr(mcp_server, "election", leader)
+            return await mcp_server._handle_forwarded(request)
+
+    async def main():
+        await leader.serve(on_leader)
+        created = await mcp_server.handle_call_tool("create_event", {
+            "calendar_name": "Work", "summary": "Forwarded",
+            "start": "2024-03-05T10:00:00", "end": "2024-03-05T11:00:00",
+        })
+        listed = await mcp_server.handle_call_tool("list_events", {
+            "start_date": "2024-03-01T00:00:00", "end_date": "2024-04-01T00:00:00",
+        })
+        leader.release()
+        with pytest.raises(ConnectionError):
+            await follower.forward({"tool": "sync_calendar", "arguments": {}})
+        return created[0].text, listed[0].text
+
+    created, listed = asyncio.run(main())
+    if wrapper._reconcile_thread is not None:
+        wrapper._reconcile_thread.join()
+
+    assert forwarded == ["create_event"]
+    assert created.startswith("Event created successfully") and '"Forwarded"' in listed
@@ -0,0 +1,153 @@
+import asyncio
+import datetime
+
+import pytest
+
+from sqlalchemy import text
+
+from src.db import SessionLocal
+
+
+def _window(wrapper, start, end, calendar=None):
+    return [e["uid"] for e in wrapper.list_events(start, end, calendar)]
+
+
+def test_overlap_semantics(wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "before", "Ends before", "20240301T080000Z", "20240301T090000Z")
+    stub.add_event(work, "running", "Started earlier", "20240228T090000Z", "20240302T090000Z")
+    stub.add_event(work, "inside", "Inside", "20240301T120000Z", "20240301T130000Z")
+    stub.add_event(work, "tail", "Starts inside", "20240301T170000Z", "20240301T200000Z")
+    stub.add_event(work, "after", "Starts at end", "20240301T180000Z", "20240301T190000Z")
+    stub.add_event(work, "instant", "Zero length", "20240301T100000Z", "20240301T100000Z")
+    wrapper.sync()
+
+    uids = _window(wrapper, datetime.datetime(2024, 3, 1, 10), datetime.datetime(2024, 3, 1, 18))
+
+    assert uids == ["running", "instant", "inside", "tail"]
+
+
+def test_all_day_event_without_dtend_covers_its_day(wrapper, stub):
+    work = stub.add_calendar("Work")
+    ics = (
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:test\r\nBEGIN:VEVENT\r\nUID:holiday\r\n"
+        "DTSTAMP:20240101T000000Z\r\nDTSTART;VALUE=DATE:20240501\r\nSUMMARY:Holiday\r\n"
+        "END:VEVENT\r\nEND:VCALENDAR\r\n"
+    )
+    stub.put_object(work, "holiday.ics", ics)
+    wrapper.sync()
+
+    assert _window(wrapper, datetime.datetime(2024, 5, 1, 12), datetime.datetime(2024, 5, 1, 13)) == ["holiday"]
+    assert _window(wrapper, datetime.datetime(2024, 5, 2), datetime.datetime(2024, 5, 3)) == []
+
+
+def test_interval_index_follows_updates_and_deletes(wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "moving", "Moving", "20240301T100000Z", "20240301T110000Z")
+    gone = stub.add_event(work, "gone", "Gone", "20240301T100000Z", "20240301T110000Z")
+    wrapper.sync()
+
+    stub.add_event(work, "moving", "Moving", "20240310T100000Z", "20240310T110000Z")
+    stub.remove_object(work, gone)
+    wrapper.sync()
+
+    march_1 = (datetime.datetime(2024, 3, 1), datetime.datetime(2024, 3, 2))
+    march_10 = (datetime.datetime(2024, 3, 10), datetime.datetime(2024, 3, 11))
+    assert _window(wrapper, *march_1) == []
+    assert _window(wrapper, *march_10) == ["moving"]
+    session = SessionLocal()
+    try:
+        assert session.execute(text("SELECT count(*) FROM events_rtree")).scalar() == 1
+    finally:
+        session.close()
+
+
+def test_range_query_is_answered_by_rtree(db):
+    from src.db import Calendar, Event, overlapping_event_ids
+
+    session = SessionLocal()
+    try:
+        query = session.query(Event).join(Calendar).filter(
+            Event.id.in_(overlapping_event_ids(datetime.datetime(2024, 1, 1), datetime.datetime(2024, 1, 8)))
+        )
+        sql = str(query.statement.compile(compile_kwargs={"literal_binds": True}))
+        plan = " ".join(row[-1] for row in session.execute(text("EXPLAIN QUERY PLAN " + sql)))
+    finally:
+        session.close()
+    assert "events_rtree VIRTUAL TABLE INDEX" in plan
+    assert "SEARCH events USING INTEGER PRIMARY KEY" in plan
+
+
+def test_pages_follow_cursor_across_events_and_occurrences(wrapper, stub):
+    work = stub.add_calendar("Work")
+    for day in range(1, 6):
+        stub.add_event(work, f"single-{day}", "Single", f"2024030{day}T100000Z", f"2024030{day}T110000Z")
+    stub.add_event(work, "daily", "Daily", "20240301T100000Z", "20240301T101500Z",
+                   extra="RRULE:FREQ=DAILY;COUNT=5\r\n")
+    wrapper.sync()
+    window = (datetime.datetime(2024, 3, 1), datetime.datetime(2024, 3, 10))
+    expected = wrapper.list_events(*window)
+
+    pages, cursor = [], None
+    while True:
+        page = wrapper.list_events_page(*window, limit=3, cursor=cursor)
+        pages.append(page["events"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert [len(p) for p in pages] == [3, 3, 3, 1]
+    assert [e for p in pages for e in p] == expected
+    assert len(expected) == 10
+
+
+def test_fields_projection(wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "one", "One", "20240301T100000Z", "20240301T110000Z",
+                   extra="DESCRIPTION:A very long description\r\n")
+    stub.add_event(work, "daily", "Daily", "20240301T120000Z", "20240301T121500Z",
+                   extra="RRULE:FREQ=DAILY;COUNT=1\r\n")
+    wrapper.sync()
+
+    events = wrapper.list_events(datetime.datetime(2024, 3, 1), datetime.datetime(2024, 3, 2),
+                                 fields=["uid", "start", "recurrence_id"])
+
+    assert events == [
+        {"uid": "one", "start": "2024-03-01T10:00:00"},
+        {"uid": "daily", "start": "2024-03-01T12:00:00", "recurrence_id": "2024-03-01T12:00:00"},
+    ]
+
+
+def test_rejects_unknown_fields_and_bad_cursors(wrapper):
+    window = (datetime.datetime(2024, 3, 1), datetime.datetime(2024, 3, 2))
+    with pytest.raises(ValueError):
+        wrapper.list_events(*window, fields=["password"])
+    with pytest.raises(ValueError):
+        wrapper.list_events_page(*window, cursor="not-a-cursor")
+
+
+def test_tool_arguments_with_an_offset_are_read_as_utc(wrapper, stub, monkeypatch):
+    from src import mcp_server
+
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "morning", "Morning", "20240301T090000Z", "20240301T100000Z")
+    wrapper.sync()
+    monkeypatch.setattr(mcp_server, "_initialized", True)
+    monkeypatch.setattr(mcp_server, "_caldav_wrapper", wrapper)
+
+    async def main():
+        listed = await mcp_server.handle_call_tool("list_events", {
+            "start_date": "2024-03-01T08:00:00Z", "end_date": "2024-03-01T12:00:00+02:00"})
+        found = await mcp_server.handle_call_tool("search_events", {
+            "query": "Morning", "start_date": "2024-03-01T00:00:00Z", "end_date": "2024-03-02T00:00:00Z"})
+        resource = await mcp_server.read_resource(
+            "calendar://events?start=2024-03-01T00:00:00Z&end=2024-03-01T09:30:00%2B00:00")
+        # 11:00+02:00 is 09:00 UTC, the event's start, which an overlap excludes
+        earlier = await mcp_server.handle_call_tool("list_events", {
+            "start_date": "2024-03-01T00:00:00Z", "end_date": "2024-03-01T11:00:00+02:00"})
+        return listed[0].text, found[0].text, resource, earlier[0].text
+
+    listed, found, resource, earlier = asyncio.run(main())
+
+    assert all('"morning"' in text for text in (listed, found, resource))
+    assert '"morning"' not in earlier
@@ -0,0 +1,80 @@
+import asyncio
+import datetime
+
+import pytest
+from starlette.testclient import TestClient
+
+from src import metrics
+from src.db import async_read_engine
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    for metric in metrics.METRICS:
+        metric.clear()
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("h_seconds", "Test.", ("kind",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, kind="a")
+
+    assert histogram.render()[2:] == [
+        'h_seconds_bucket{kind="a",le="0.1"} 2',
+        'h_seconds_bucket{kind="a",le="1"} 3',
+        'h_seconds_bucket{kind="a",le="+Inf"} 4',
+        'h_seconds_sum{kind="a"} 2.650000',
+        'h_seconds_count{kind="a"} 4',
+    ]
+
+
+def test_label_sets_are_bounded(monkeypatch):
+    monkeypatch.setattr(metrics, "MAX_SERIES", 2)
+    counter = metrics.Counter("c_total", "Test.", ("tool",))
+    for tool in ("a", "b", "c", "d"):
+        counter.inc(tool=tool)
+
+    assert counter.value(tool="other") == 2
+    assert len(counter.render()) == 2 + 3
+
+
+def test_sync_records_phases_and_object_counts(wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "a", "A")
+    stub.add_event(work, "daily", "Daily", extra="RRULE:FREQ=DAILY;COUNT=3\r\n")
+    stub.put_object(work, "broken.ics", "BEGIN:VCALENDAR\r\nnot ical\r\n")
+    wrapper.sync()
+
+    for phase in ("fetch", "parse", "expand", "upsert", "delete", "commit"):
+        assert metrics.SYNC_PHASE_DURATION.count(calendar="Work", phase=phase) == 1
+    assert metrics.SYNC_OBJECTS.value(calendar="Work", outcome="fetched") == 3
+    assert metrics.SYNC_OBJECTS.value(calendar="Work", outcome="parsed") == 2
+    assert metrics.SYNC_OBJECTS.value(calendar="Work", outcome="failed") == 1
+
+    wrapper.sync()
+    assert metrics.SYNC_OBJECTS.value(calendar="Work", outcome="fetched") == 3
+    assert metrics.DB_QUERY_DURATION.count(pool="writer", statement="INSERT") > 0
+
+
+def test_metrics_route_exposes_tool_calls(wrapper, stub, monkeypatch):
+    from src import main, mcp_server
+
+    stub.add_calendar("Work")
+    wrapper.sync()
+    monkeypatch.setattr(mcp_server, "_initialized", True)
+    monkeypatch.setattr(mcp_server, "_caldav_wrapper", wrapper)
+
+    async def call():
+        await mcp_server.handle_call_tool("list_events", {
+            "start_date": datetime.datetime(2024, 3, 1).isoformat(), "end_date": "2024-03-02T00:00:00",
+        })
+        with pytest.raises(ValueError):
+            await mcp_server.handle_call_tool("no_such_tool", {})
+        await async_read_engine.dispose()
+
+    asyncio.run(call())
+
+    body = TestClient(main.app).get("/metrics").text
+    assert 'mcp_tool_duration_seconds_count{tool="list_events",status="ok"} 1' in body
+    assert 'mcp_tool_duration_seconds_count{tool="no_such_tool",status="error"} 1' in body
+    assert 'db_query_seconds_count{pool="async_read",statement="SELECT"}' in body
@@ -0,0 +1,73 @@
+import time
+
+from src.db import Event, SessionLocal
+
+
+def _uids():
+    session = SessionLocal()
+    try:
+        return {uid for (uid,) in session.query(Event.uid)}
+    finally:
+        session.close()
+
+
+def _populate(stub, calendars=8, events=3):
+    cals = []
+    for c in range(calendars):
+        cal = stub.add_calendar(f"Calendar {c}", f"cal{c}")
+        for i in range(events):
+            stub.add_event(cal, f"c{c}-e{i}", f"Event {i}")
+        cals.append(cal)
+    return cals
+
+
+def test_calendars_are_fetched_concurrently(wrapper, stub):
+    _populate(stub)
+    wrapper.sync_concurrency = 1
+    stub.latency = 0.05
+    t0 = time.perf_counter()
+    wrapper.sync()
+    sequential = time.perf_counter() - t0
+
+    for cal in stub.calendars.values():
+        stub.forget_history(cal)
+    wrapper.sync_concurrency = 8
+    t0 = time.perf_counter()
+    stats = wrapper.sync()
+    parallel = time.perf_counter() - t0
+
+    assert stats["calendars"] == 8
+    assert len(_uids()) == 24
+    assert parallel < sequential * 0.6
+
+
+def test_workers_reuse_keep_alive_connections(wrapper, stub):
+    _populate(stub, calendars=12)
+    wrapper.sync_concurrency = 3
+    wrapper.sync()
+    first = {r.connection for r in stub.requests if r.method == "REPORT"}
+    stub.reset_log()
+
+    wrapper.sync()
+
+    reports = [r for r in stub.requests if r.method == "REPORT"]
+    assert len(reports) == 12
+    # Three workers, each keeping its pooled connection from the first run
+    second = {r.connection for r in reports}
+    assert len(second) <= 3 and second <= first
+
+
+def test_failing_calendar_does_not_abort_others(wrapper, stub, capsys):
+    cals = _populate(stub, calendars=4)
+    stub.fail_paths.add(cals[1].path)
+
+    stats = wrapper.sync()
+
+    assert stats["calendars"] == 3
+    assert stats["failed"] == ["Calendar 1"]
+    assert _uids() == {f"c{c}-e{i}" for c in (0, 2, 3) for i in range(3)}
+
+    stub.fail_paths.clear()
+    stats = wrapper.sync()
+    assert stats["failed"] == []
+    assert len(_uids()) == 12
@@ -0,0 +1,171 @@
+import datetime
+
+from src.db import Occurrence, SessionLocal
+
+BERLIN_WEEKLY = (
+    "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:test\r\n"
+    "BEGIN:VEVENT\r\nUID:standup\r\nDTSTAMP:20240101T000000Z\r\n"
+    "DTSTART;TZID=Europe/Berlin:20240311T090000\r\nDTEND;TZID=Europe/Berlin:20240311T091500\r\n"
+    "RRULE:FREQ=WEEKLY;COUNT=4\r\nEXDATE;TZID=Europe/Berlin:20240318T090000\r\nSUMMARY:Standup\r\n"
+    "END:VEVENT\r\n"
+    "BEGIN:VEVENT\r\nUID:standup\r\nDTSTAMP:20240101T000000Z\r\n"
+    "RECURRENCE-ID;TZID=Europe/Berlin:20240325T090000\r\n"
+    "DTSTART;TZID=Europe/Berlin:20240326T100000\r\nDTEND;TZID=Europe/Berlin:20240326T101500\r\n"
+    "SUMMARY:Standup (moved)\r\n"
+    "END:VEVENT\r\nEND:VCALENDAR\r\n"
+)
+
+
+def _occurrence_count():
+    session = SessionLocal()
+    try:
+        return session.query(Occurrence).count()
+    finally:
+        session.close()
+
+
+def test_series_is_expanded_with_exdate_override_and_dst(wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.put_object(work, "standup.ics", BERLIN_WEEKLY)
+    wrapper.sync()
+
+    events = wrapper.list_events(datetime.datetime(2024, 3, 1), datetime.datetime(2024, 5, 1))
+
+    # Berlin switches to summer time on 2024-03-31, so 09:00 local moves from 08:00 to 07:00 UTC
+    assert [(e["start"], e["summary"]) for e in events] == [
+        ("2024-03-11T08:00:00", "Standup"),
+        ("2024-03-26T09:00:00", "Standup (moved)"),
+        ("2024-04-01T07:00:00", "Standup"),
+    ]
+    assert events[1]["recurrence_id"] == "2024-03-25T08:00:00"
+
+
+def test_series_and_single_events_are_merged_by_start(wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "review", "Review", "20240312T120000Z", "20240312T130000Z")
+    stub.add_event(work, "daily", "Daily", "20240311T100000Z", "20240311T101500Z",
+                   extra="RRULE:FREQ=DAILY;COUNT=3\r\n")
+    wrapper.sync()
+
+    events = wrapper.list_events(datetime.datetime(2024, 3, 11), datetime.datetime(2024, 3, 14))
+
+    assert [(e["uid"], e["start"]) for e in events] == [
+        ("daily", "2024-03-11T10:00:00"),
+        ("daily", "2024-03-12T10:00:00"),
+        ("review", "2024-03-12T12:00:00"),
+        ("daily", "2024-03-13T10:00:00"),
+    ]
+
+
+def test_open_ended_series_is_expanded_lazily_and_bounded(wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "daily", "Daily", "20200101T100000Z", "20200101T101500Z",
+                   extra="RRULE:FREQ=DAILY\r\n")
+    wrapper.sync()
+    synced = _occurrence_count()
+
+    # Far outside the sync horizon: expanded on demand
+    events = wrapper.list_events(datetime.datetime(2040, 6, 1), datetime.datetime(2040, 6, 8))
+    assert [e["start"] for e in events][:2] == ["2040-06-01T10:00:00", "2040-06-02T10:00:00"]
+    assert len(events) == 7
+
+    # Coverage moved rather than grew across twenty years
+    assert _occurrence_count() < synced + 100
+
+
+def test_unchanged_series_is_not_re_expanded(wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "weekly", "Weekly", "20240311T100000Z", "20240311T110000Z",
+                   extra="RRULE:FREQ=WEEKLY;COUNT=10\r\n")
+    wrapper.sync()
+    march_to_june = (datetime.datetime(2024, 3, 1), datetime.datetime(2024, 6, 1))
+    wrapper.list_events(*march_to_june)
+    session = SessionLocal()
+    try:
+        first_ids = sorted(id_ for (id_,) in session.query(Occurrence.id))
+    finally:
+        session.close()
+
+    stub.add_event(work, "other", "Other", "20240312T100000Z", "20240312T110000Z")
+    wrapper.sync()
+    wrapper.list_events(*march_to_june)
+
+    session = SessionLocal()
+    try:
+        assert sorted(id_ for (id_,) in session.query(Occurrence.id)) == first_ids
+    finally:
+        session.close()
+    assert len(first_ids) == 10
+
+
+def test_changed_series_replaces_its_occurrences(wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "weekly", "Weekly", "20240311T100000Z", "20240311T110000Z",
+                   extra="RRULE:FREQ=WEEKLY;COUNT=10\r\n")
+    wrapper.sync()
+    march_to_june = (datetime.datetime(2024, 3, 1), datetime.datetime(2024, 6, 1))
+    assert len(wrapper.list_events(*march_to_june)) == 10
+
+    stub.add_event(work, "weekly", "Weekly", "20240311T100000Z", "20240311T110000Z",
+                   extra="RRULE:FREQ=WEEKLY;COUNT=2\r\n")
+    wrapper.sync()
+
+    events = wrapper.list_events(*march_to_june)
+    assert _occurrence_count() == 2
+    assert [e["start"] for e in events] == ["2024-03-11T10:00:00", "2024-03-18T10:00:00"]
+
+
+
+def test_series_moved_to_a_new_href_keeps_one_set_of_occurrences(wrapper, stub):
+    work = stub.add_calendar("Work")
+    # Within the default horizon, so the series is expanded at sync time
+    day = datetime.datetime.utcnow().replace(hour=10, minute=0, second=0, microsecond=0) + datetime.timedelta(days=1)
+    href = stub.add_event(work, "daily", "Daily", day.strftime("%Y%m%dT%H%M%SZ"),
+                          (day + datetime.timedelta(hours=1)).strftime("%Y%m%dT%H%M%SZ"),
+                          extra="RRULE:FREQ=DAILY;COUNT=5\r\n")
+    wrapper.sync()
+    week = (day - datetime.timedelta(days=1), day + datetime.timedelta(days=7))
+    assert len(wrapper.list_events(*week)) == 5
+
+    # Same object, same content hash, new href
+    ics = work.objects[href][1]
+    stub.remove_object(work, href)
+    stub.put_object(work, "moved.ics", ics)
+    wrapper.sync()
+
+    assert len(wrapper.list_events(*week)) == 5
+    assert _occurrence_count() == 5
+
+
+def test_window_beyond_max_occurrences_pages_through_the_expansion(wrapper, stub):
+    from src.recurrence import MAX_OCCURRENCES
+
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "daily", "Daily", "20240101T100000Z", "20240101T101500Z",
+                   extra="RRULE:FREQ=DAILY\r\n")
+    wrapper.sync()
+    decade = (datetime.datetime(2024, 1, 1), datetime.datetime(2034, 1, 1))
+
+    # The first page stops where the expansion did and says where to go on
+    page = wrapper.list_events_page(*decade)
+    assert len(page["events"]) == MAX_OCCURRENCES
+    assert page["next_cursor"] is not None
+    session = SessionLocal()
+    try:
+        first_ids = sorted(id_ for (id_,) in session.query(Occurrence.id))
+    finally:
+        session.close()
+
+    # Reading the same window again does not expand the series again
+    wrapper.cache.clear()
+    assert wrapper.list_events_page(*decade) == page
+    session = SessionLocal()
+    try:
+        assert sorted(id_ for (id_,) in session.query(Occurrence.id)) == first_ids
+    finally:
+        session.close()
+
+    starts = [e["start"] for e in wrapper.list_events(*decade)]
+    assert len(starts) == (decade[1] - decade[0]).days
+    assert len(set(starts)) == len(starts)
+    assert starts[0] == "2024-01-01T10:00:00" and starts[-1] == "2033-12-31T10:00:00"
@@ -0,0 +1,71 @@
+import datetime
+
+from sqlalchemy import text
+
+from src.db import SessionLocal, fts_query
+
+
+def _search(wrapper, query, **kwargs):
+    return [e["uid"] for e in wrapper.search_events(query, **kwargs)]
+
+
+def test_search_ranks_title_hits_first(wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "notes", "Weekly sync", extra="DESCRIPTION:Agenda: budget review with Alice\r\n")
+    stub.add_event(work, "budget", "Budget review", extra="LOCATION:Room 4\r\n")
+    stub.add_event(work, "lunch", "Lunch")
+    wrapper.sync()
+
+    assert _search(wrapper, "budget review") == ["budget", "notes"]
+    assert _search(wrapper, "room") == ["budget"]
+    assert _search(wrapper, "bud*") == ["budget", "notes"]
+    assert _search(wrapper, "budget", limit=1) == ["budget"]
+
+
+def test_search_filters_by_date_and_calendar(wrapper, stub):
+    work = stub.add_calendar("Work")
+    home = stub.add_calendar("Home")
+    stub.add_event(work, "march", "Dentist", "20240301T100000Z", "20240301T110000Z")
+    stub.add_event(work, "april", "Dentist", "20240401T100000Z", "20240401T110000Z")
+    stub.add_event(home, "home", "Dentist", "20240302T100000Z", "20240302T110000Z")
+    stub.add_event(home, "series", "Dentist checkup", "20240105T100000Z", "20240105T110000Z",
+                   extra="RRULE:FREQ=MONTHLY;COUNT=6\r\n")
+    wrapper.sync()
+
+    march = {"start_date": datetime.datetime(2024, 3, 1), "end_date": datetime.datetime(2024, 3, 10)}
+    assert set(_search(wrapper, "dentist", **march)) == {"march", "home", "series"}
+    assert _search(wrapper, "dentist", calendar_name="Work", **march) == ["march"]
+    late = {"start_date": datetime.datetime(2024, 7, 1), "end_date": datetime.datetime(2024, 8, 1)}
+    assert _search(wrapper, "dentist", **late) == []
+
+
+def test_index_follows_updates_and_deletes(wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "renamed", "Kickoff")
+    gone = stub.add_event(work, "gone", "Kickoff retro")
+    wrapper.sync()
+
+    stub.add_event(work, "renamed", "Planning")
+    stub.remove_object(work, gone)
+    wrapper.sync()
+
+    assert _search(wrapper, "kickoff") == []
+    assert _search(wrapper, "planning") == ["renamed"]
+    session = SessionLocal()
+    try:
+        # The external-content index must agree with the events table
+        session.execute(text("INSERT INTO events_fts(events_fts, rank) VALUES ('integrity-check', 1)"))
+    finally:
+        session.close()
+
+
+def test_punctuation_is_not_fts_syntax():
+    assert fts_query('C++ "q3" AND-NOT plan*') == '"C++" """q3""" "AND-NOT" "plan"*'
+
+
+def test_query_of_only_prefix_stars_matches_nothing(wrapper, stub):
+    stub.add_event(stub.add_calendar("Work"), "plan", "Plan")
+    wrapper.sync()
+
+    assert fts_query("* **") == ""
+    assert _search(wrapper, "*") == [] and _search(wrapper, "* **") == []
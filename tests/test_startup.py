@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+from src.caldav_wrapper import CalDAVWrapper
+from src.db import Discovery, SessionLocal
+
+
+def test_constructor_does_no_network_access(wrapper, stub):
+    stub.reset_log()
+    CalDAVWrapper()
+    assert stub.requests == []
+
+
+def test_discovery_is_persisted_and_reused(wrapper, stub):
+    stub.add_calendar("Work")
+    wrapper.sync()
+    first = stub.count("PROPFIND")
+
+    stub.reset_log()
+    CalDAVWrapper().sync()
+
+    # Only the calendar listing is left; principal and home lookups are skipped
+    assert stub.count("PROPFIND") < first
+    assert stub.count("PROPFIND") == 1
+
+
+def test_stale_discovery_is_refreshed(wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "one", "One")
+    wrapper.sync()
+    session = SessionLocal()
+    try:
+        session.query(Discovery).update({"calendar_home_url": stub.url + "moved/"})
+        session.commit()
+    finally:
+        session.close()
+
+    stats = CalDAVWrapper().sync()
+
+    assert stats["failed"] == [] and stats["calendars"] == 1
+    session = SessionLocal()
+    try:
+        assert session.query(Discovery.calendar_home_url).scalar() != stub.url + "moved/"
+    finally:
+        session.close()
+
+
+def test_server_answers_from_local_db_while_startup_sync_runs(wrapper, stub, monkeypatch):
+    from src import mcp_server
+
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "one", "One", "20240301T100000Z", "20240301T110000Z")
+    wrapper.sync()
+    monkeypatch.setattr(mcp_server, "_initialized", False)
+    monkeypatch.setattr(mcp_server, "_caldav_wrapper", None)
+    stub.latency = 0.5
+
+    async def start():
+        startup = asyncio.create_task(mcp_server.run())
+        await asyncio.sleep(0.05)
+        t0 = time.perf_counter()
+        result = await mcp_server.handle_call_tool("list_events", {
+            "start_date": "2024-03-01T00:00:00", "end_date": "2024-03-02T00:00:00",
+        })
+        elapsed = time.perf_counter() - t0
+        still_syncing = not startup.done()
+        await startup
+        return result, elapsed, still_syncing
+
+    result, elapsed, still_syncing = asyncio.run(start())
+
+    assert '"uid":"one"' in result[0].text
+    assert still_syncing and elapsed < 0.5
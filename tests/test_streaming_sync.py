@@ -0,0 +1,118 @@
+import datetime
+
+from src import webdav
+from src.db import Calendar, Event, SessionLocal
+
+
+def _uids():
+    session = SessionLocal()
+    try:
+        return {uid for (uid,) in session.query(Event.uid)}
+    finally:
+        session.close()
+
+
+def _sync_token(name):
+    session = SessionLocal()
+    try:
+        return session.query(Calendar.sync_token).filter(Calendar.name == name).scalar()
+    finally:
+        session.close()
+
+
+def _stamp(value):
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def test_chunks_are_written_as_they_arrive(wrapper, stub, monkeypatch):
+    monkeypatch.setattr("src.caldav_wrapper.SYNC_CHUNK_SIZE", 2)
+    work = stub.add_calendar("Work")
+    for i in range(5):
+        stub.add_event(work, f"ev{i}", f"Event {i}")
+    written = []
+    original = wrapper._write_changes
+    monkeypatch.setattr(wrapper, "_write_changes",
+                        lambda session, changes, stats: written.append((len(changes.rows), changes.final))
+                        or original(session, changes, stats))
+
+    stats = wrapper.sync()
+
+    assert written == [(2, False), (2, False), (1, False), (0, True)]
+    assert stats["parsed"] == 5 and stats["calendars"] == 1
+    assert len(_uids()) == 5
+
+
+def test_full_listing_is_applied_chunk_by_chunk(wrapper, stub, monkeypatch):
+    monkeypatch.setattr("src.caldav_wrapper.SYNC_CHUNK_SIZE", 2)
+    work = stub.add_calendar("Work")
+    hrefs = [stub.add_event(work, f"ev{i}", f"Event {i}") for i in range(5)]
+    wrapper.sync()
+    stub.remove_object(work, hrefs[1])
+    stub.remove_object(work, hrefs[4])
+    stub.forget_history(work)
+    listed = []
+    original = wrapper._write_changes
+    monkeypatch.setattr(wrapper, "_write_changes",
+                        lambda session, changes, stats: listed.append(len(changes.listed))
+                        or original(session, changes, stats))
+
+    stats = wrapper.sync()
+
+    # Each chunk marks only its own members; the final one drops the unmarked
+    assert listed == [2, 1, 0]
+    assert stats["deleted"] == 2
+    assert _uids() == {"ev0", "ev2", "ev3"}
+
+
+def test_failure_mid_calendar_keeps_token_until_completed(wrapper, stub, monkeypatch):
+    monkeypatch.setattr("src.caldav_wrapper.SYNC_CHUNK_SIZE", 2)
+    work = stub.add_calendar("Work")
+    for i in range(5):
+        stub.add_event(work, f"ev{i}", f"Event {i}")
+    calls = []
+    original = webdav.multiget
+
+    def flaky(client, url, hrefs):
+        calls.append(hrefs)
+        if len(calls) == 2:
+            raise webdav.error.ReportError("connection reset")
+        return original(client, url, hrefs)
+
+    monkeypatch.setattr(webdav, "multiget", flaky)
+    stats = wrapper.sync()
+
+    assert stats["failed"] == ["Work"]
+    # The first chunk is committed, but without a token the next sync lists everything again
+    assert len(_uids()) == 2
+    assert _sync_token("Work") is None
+
+    stats = wrapper.sync()
+    assert stats["failed"] == []
+    assert len(_uids()) == 5
+    assert _sync_token("Work") == work.sync_token
+
+
+def test_sync_window_limits_stored_events(wrapper, stub, monkeypatch):
+    monkeypatch.setattr("src.caldav_wrapper.SYNC_PAST_DAYS", "90")
+    monkeypatch.setattr("src.caldav_wrapper.SYNC_FUTURE_DAYS", "365")
+    now = datetime.datetime.now(datetime.timezone.utc)
+    work = stub.add_calendar("Work")
+    soon = now + datetime.timedelta(days=7)
+    stub.add_event(work, "soon", "Soon", _stamp(soon), _stamp(soon + datetime.timedelta(hours=1)))
+    stub.add_event(work, "old", "Old", "20100101T100000Z", "20100101T110000Z")
+    stub.add_event(work, "far", "Far", _stamp(now + datetime.timedelta(days=800)),
+                   _stamp(now + datetime.timedelta(days=800, hours=1)))
+    stub.add_event(work, "weekly", "Weekly", "20100104T100000Z", "20100104T110000Z",
+                   extra="RRULE:FREQ=WEEKLY\r\n")
+
+    wrapper.sync()
+
+    assert _uids() == {"soon", "weekly"}
+    assert stub.count("REPORT", "calendar-query") == 1
+    assert stub.count("REPORT", "sync-collection") == 0
+    assert _sync_token("Work") is None
+
+    # Moved out of the window on the server: dropped locally
+    stub.add_event(work, "soon", "Soon", "20100101T100000Z", "20100101T110000Z")
+    wrapper.sync()
+    assert _uids() == {"weekly"}
@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pytest
+
+from src import mcp_server
+from src.scheduler import SyncScheduler
+from src.subscriptions import Subscriptions
+
+MARCH = "calendar://events?start=2024-03-01T00:00:00&end=2024-04-01T00:00:00"
+JUNE = "calendar://events?start=2024-06-01T00:00:00&end=2024-07-01T00:00:00"
+
+
+class FakeSession:
+    def __init__(self):
+        self.updated = []
+
+    async def send_resource_updated(self, uri):
+        self.updated.append(str(uri))
+
+
+@pytest.fixture
+def server_wrapper(wrapper, monkeypatch):
+    monkeypatch.setattr(mcp_server, "_initialized", True)
+    monkeypatch.setattr(mcp_server, "_caldav_wrapper", wrapper)
+    subscriptions = Subscriptions(mcp_server.read_resource, delay=0.05)
+    monkeypatch.setattr(mcp_server, "subscriptions", subscriptions)
+    wrapper.change_listeners.append(subscriptions.changed)
+    return wrapper
+
+
+def test_concurrent_sync_requests_are_coalesced():
+    runs = []
+
+    def sync():
+        runs.append(time.perf_counter())
+        time.sleep(0.1)
+        return {"run": len(runs)}
+
+    scheduler = SyncScheduler(sync, interval=0)
+
+    async def main():
+        first = [asyncio.create_task(scheduler.request()) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        second = [asyncio.create_task(scheduler.request()) for _ in range(5)]
+        return await asyncio.gather(*first, *second)
+
+    results = asyncio.run(main())
+
+    # The second group arrived while the first sync ran, so it shares one more sync
+    assert len(runs) == 2
+    assert [r["run"] for r in results] == [1] * 5 + [2] * 5
+
+
+def test_background_syncs_run_on_the_interval():
+    runs = []
+    scheduler = SyncScheduler(lambda: runs.append(1) or {}, interval=0.05, jitter=0.5)
+
+    async def main():
+        scheduler.start()
+        scheduler.start()
+        await asyncio.sleep(0.4)
+
+    asyncio.run(main())
+
+    assert 3 <= len(runs) <= 16
+
+
+def test_subscribers_are_notified_once_per_change_in_their_window(server_wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "one", "One", "20240301T100000Z", "20240301T110000Z")
+    server_wrapper.sync()
+    march, june, calendars = FakeSession(), FakeSession(), FakeSession()
+
+    async def main():
+        await mcp_server.subscriptions.subscribe(march, MARCH)
+        await mcp_server.subscriptions.subscribe(june, JUNE)
+        await mcp_server.subscriptions.subscribe(calendars, mcp_server.CALENDARS_URI)
+        stub.add_event(work, "two", "Two", "20240305T100000Z", "20240305T110000Z")
+        await asyncio.to_thread(server_wrapper.sync)
+        await asyncio.sleep(0.2)
+        # Nothing changed on the server: no notifications
+        await asyncio.to_thread(server_wrapper.sync)
+        await asyncio.sleep(0.2)
+
+    asyncio.run(main())
+
+    assert march.updated == [MARCH]
+    assert june.updated == [] and calendars.updated == []
+
+
+def test_resources_are_read_from_the_local_db(server_wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "one", "One", "20240301T100000Z", "20240301T110000Z")
+    server_wrapper.sync()
+    stub.reset_log()
+
+    events = asyncio.run(mcp_server.read_resource(MARCH + "&calendar=Work"))
+    calendars = asyncio.run(mcp_server.read_resource(mcp_server.CALENDARS_URI))
+
+    assert '"uid":"one"' in events and '"Work"' in calendars
+    assert stub.requests == []
+    assert mcp_server.initialization_options().capabilities.resources.subscribe
+    with pytest.raises(ValueError):
+        asyncio.run(mcp_server.read_resource("calendar://events?start=2024-03-01T00:00:00"))
@@ -0,0 +1,239 @@
+import datetime
+
+from src.db import Calendar, Event, SessionLocal
+
+
+def _events(calendar_url=None):
+    session = SessionLocal()
+    try:
+        query = session.query(Event)
+        if calendar_url:
+            query = query.join(Calendar).filter(Calendar.url == calendar_url)
+        return {e.uid: (e.summary, e.href) for e in query}
+    finally:
+        session.close()
+
+
+def _sync_token(name):
+    session = SessionLocal()
+    try:
+        return session.query(Calendar).filter(Calendar.name == name).one().sync_token
+    finally:
+        session.close()
+
+
+def test_initial_sync_stores_events_and_sync_token(wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "a", "Standup")
+    stub.add_event(work, "b", "Review")
+
+    wrapper.sync()
+
+    assert set(_events()) == {"a", "b"}
+    assert _events()["a"] == ("Standup", work.path + "a.ics")
+    assert _sync_token("Work") == work.sync_token
+    # Members are listed once and downloaded in a single multiget, never one GET each
+    assert stub.count("REPORT", "sync-collection") == 1
+    assert stub.count("REPORT", "calendar-multiget") == 1
+    assert stub.count("GET") == 0
+
+
+def test_unchanged_calendar_costs_one_report_and_no_downloads(wrapper, stub):
+    work = stub.add_calendar("Work")
+    for i in range(50):
+        stub.add_event(work, f"ev{i}", f"Event {i}")
+    wrapper.sync()
+    stub.reset_log()
+
+    wrapper.sync()
+
+    reports = [r for r in stub.requests if r.method == "REPORT"]
+    assert len(reports) == 1
+    assert reports[0].report == "sync-collection"
+    assert reports[0].bytes_out < 1024
+    assert stub.count("GET") == 0
+    assert len(_events()) == 50
+
+
+def test_incremental_sync_applies_only_changes(wrapper, stub):
+    work = stub.add_calendar("Work")
+    keep = stub.add_event(work, "keep", "Keep me")
+    gone = stub.add_event(work, "gone", "Delete me")
+    stub.add_event(work, "edit", "Old title")
+    wrapper.sync()
+    stub.reset_log()
+
+    stub.remove_object(work, gone)
+    stub.add_event(work, "edit", "New title")
+    stub.add_event(work, "new", "Brand new")
+    wrapper.sync()
+
+    events = _events()
+    assert set(events) == {"keep", "edit", "new"}
+    assert events["edit"][0] == "New title"
+    assert events["keep"][1] == keep
+    multigets = [r for r in stub.requests if r.report == "calendar-multiget"]
+    assert [r.hrefs for r in multigets] == [2]
+
+
+def test_rejected_token_falls_back_to_full_resync(wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "a", "A")
+    gone = stub.add_event(work, "b", "B")
+    wrapper.sync()
+
+    stub.remove_object(work, gone)
+    stub.add_event(work, "c", "C")
+    stub.forget_history(work)
+    stub.reset_log()
+    wrapper.sync()
+
+    assert set(_events()) == {"a", "c"}
+    assert stub.count("REPORT", "sync-collection") == 2
+    assert _sync_token("Work") == work.sync_token
+
+
+def test_server_without_sync_collection_uses_full_listing(wrapper, stub):
+    stub.supports_sync = False
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "a", "A")
+    gone = stub.add_event(work, "b", "B")
+    wrapper.sync()
+    assert set(_events()) == {"a", "b"}
+    assert _sync_token("Work") is None
+
+    stub.remove_object(work, gone)
+    wrapper.sync()
+    assert set(_events()) == {"a"}
+
+
+def test_events_are_scoped_per_calendar(wrapper, stub):
+    work = stub.add_calendar("Work")
+    home = stub.add_calendar("Home")
+    stub.add_event(work, "w", "Work item", start="20240102T090000Z", end="20240102T100000Z")
+    stub.add_event(home, "h", "Home item")
+    wrapper.sync()
+
+    assert set(_events(stub.calendar_url(work))) == {"w"}
+    events = wrapper.list_events(datetime.datetime(2024, 1, 2), datetime.datetime(2024, 1, 3), "Work")
+    assert [e["uid"] for e in events] == ["w"]
+
+
+def test_sync_reports_counters(wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "a", "A")
+    stub.add_event(work, "b", "B")
+
+    stats = wrapper.sync()
+
+    assert stats == {"calendars": 1, "fetched": 2, "parsed": 2, "skipped": 0, "deleted": 0, "failed": []}
+
+
+def test_full_resync_of_unchanged_calendar_skips_parsing_and_updates(wrapper, stub, db, monkeypatch):
+    from sqlalchemy import event
+
+    work = stub.add_calendar("Work")
+    for i in range(200):
+        stub.add_event(work, f"ev{i}", f"Event {i}")
+    wrapper.sync()
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db, "before_cursor_execute", listener)
+    parse_calls = []
+    original_parse = wrapper._parse_ics
+    monkeypatch.setattr(wrapper, "_parse_ics", lambda data: parse_calls.append(data) or original_parse(data))
+    try:
+        stub.forget_history(work)  # force the full listing path
+        stub.reset_log()
+        stats = wrapper.sync()
+    finally:
+        event.remove(db, "before_cursor_execute", listener)
+
+    assert stats["skipped"] == 200
+    assert stats["parsed"] == 0
+    assert parse_calls == []
+    assert stub.count("REPORT", "calendar-multiget") == 0
+    assert not [s for s in statements if s.lstrip().upper().startswith("UPDATE events")]
+
+
+def test_same_content_under_new_etag_is_not_reparsed(wrapper, stub):
+    work = stub.add_calendar("Work")
+    href = stub.add_event(work, "a", "A")
+    wrapper.sync()
+
+    etag, ics = work.objects[href]
+    stub.put_object(work, "a.ics", ics)
+    work.objects[href] = ('"rewritten"', ics)
+    stats = wrapper.sync()
+
+    assert stats["fetched"] == 1
+    assert stats["parsed"] == 0
+    assert stats["skipped"] == 1
+    session = SessionLocal()
+    try:
+        assert session.query(Event.etag).filter(Event.uid == "a").scalar() == '"rewritten"'
+    finally:
+        session.close()
+
+
+def test_legacy_listing_skips_unchanged_objects(wrapper, stub):
+    stub.supports_sync = False
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "a", "A")
+    stub.add_event(work, "b", "B")
+    wrapper.sync()
+
+    stub.add_event(work, "b", "B changed")
+    stats = wrapper.sync()
+
+    assert stats["parsed"] == 1
+    assert stats["skipped"] == 1
+    assert _events()["b"][0] == "B changed"
+
+
+def test_sync_uses_constant_number_of_statements(wrapper, stub, db):
+    from sqlalchemy import event
+
+    work = stub.add_calendar("Work")
+    for i in range(300):
+        stub.add_event(work, f"ev{i}", f"Event {i}")
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db, "before_cursor_execute", listener)
+    try:
+        wrapper.sync()
+    finally:
+        event.remove(db, "before_cursor_execute", listener)
+
+    assert len(_events()) == 300
+    assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) < 10
+    assert len([s for s in statements if "ON CONFLICT" in s]) == 1
+
+
+def test_changed_uid_under_same_href_replaces_row(wrapper, stub):
+    from tests.caldav_stub import make_event_ics
+
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "old-uid", "Meeting")
+    wrapper.sync()
+
+    stub.put_object(work, "old-uid.ics", make_event_ics("new-uid", "Meeting", "20240101T100000Z", "20240101T110000Z"))
+    stats = wrapper.sync()
+
+    assert set(_events()) == {"new-uid"}
+    assert stats["deleted"] == 1
+
+
+def test_recurrence_override_does_not_replace_master(wrapper, stub):
+    work = stub.add_calendar("Work")
+    override = (
+        "END:VEVENT\r\nBEGIN:VEVENT\r\nUID:series\r\nDTSTAMP:20240101T000000Z\r\n"
+        "RECURRENCE-ID:20240103T100000Z\r\nDTSTART:20240103T150000Z\r\n"
+        "DTEND:20240103T160000Z\r\nSUMMARY:Moved occurrence\r\n"
+    )
+    stub.add_event(work, "series", "Daily", extra="RRULE:FREQ=DAILY;COUNT=5\r\n" + override)
+    wrapper.sync()
+
+    assert _events()["series"][0] == "Daily"
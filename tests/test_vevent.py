@@ -0,0 +1,114 @@
+import pytest
+
+from src import vevent
+
+BERLIN = """BEGIN:VTIMEZONE\r
+TZID:Custom/Berlin\r
+BEGIN:STANDARD\r
+DTSTART:19701025T030000\r
+RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU\r
+TZOFFSETFROM:+0200\r
+TZOFFSETTO:+0100\r
+END:STANDARD\r
+BEGIN:DAYLIGHT\r
+DTSTART:19700329T020000\r
+RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU\r
+TZOFFSETFROM:+0100\r
+TZOFFSETTO:+0200\r
+END:DAYLIGHT\r
+END:VTIMEZONE\r
+"""
+
+
+def calendar(*lines: str, prefix: str = "") -> str:
+    return ("BEGIN:VCALENDAR\r\nVERSION:2.0\r\n" + prefix + "BEGIN:VEVENT\r\n"
+            + "".join(line + "\r\n" for line in lines) + "END:VEVENT\r\nEND:VCALENDAR\r\n")
+
+
+CASES = [
+    calendar("UID:utc", "DTSTART:20240301T090000Z", "DTEND:20240301T100000Z", "SUMMARY:Plain"),
+    calendar("UID:floating", "DTSTART:20240301T090000", "SUMMARY:No end"),
+    calendar("UID:day", "DTSTART;VALUE=DATE:20240301", "TRANSP:TRANSPARENT"),
+    calendar("UID:tzid", "DTSTART;TZID=Europe/Berlin:20241027T023000", "DTEND;TZID=Europe/Berlin:20241027T033000",
+             "STATUS:CANCELLED"),
+    calendar("UID:windows", "DTSTART;TZID=W. Europe Standard Time:20240701T090000",
+             "DTEND;TZID=W. Europe Standard Time:20240701T100000"),
+    calendar("UID:custom", "DTSTART;TZID=Custom/Berlin:20240701T090000", "DTEND;TZID=Custom/Berlin:20240701T100000",
+             prefix=BERLIN),
+    calendar("UID:escaped", "DTSTART:20240301T090000Z", r"SUMMARY:Lunch\, then\; a walk\: 1\\2",
+             r"DESCRIPTION:Line one\nLine two", "LOCATION;ALTREP=\"http://example.com/a;b:c\":Room 1"),
+    calendar("UID:folded", "DTSTART:20240301T090000Z", "DESCRIPTION:" + "x" * 70 + "\r\n " + "y" * 30),
+    calendar("UID:alarm", "DTSTART:20240301T090000Z", "BEGIN:VALARM", "ACTION:DISPLAY", "DESCRIPTION:Alarm",
+             "TRIGGER:-PT15M", "END:VALARM"),
+    calendar("UID:series", "DTSTART:20240301T090000Z", "DTEND:20240301T100000Z", "RRULE:FREQ=WEEKLY;COUNT=4"),
+    calendar("UID:duration", "DTSTART:20240301T090000Z", "DURATION:PT45M"),
+]
+
+
+@pytest.mark.parametrize("ical_data", CASES)
+def test_fast_path_matches_icalendar(ical_data):
+    assert vevent.parse(ical_data) == vevent.parse_with_icalendar(ical_data)
+
+
+def test_overrides_keep_the_master():
+    ical_data = (calendar("UID:s", "DTSTART:20240301T090000Z", "RRULE:FREQ=DAILY;COUNT=3")
+                 .replace("END:VCALENDAR\r\n", "")
+                 + "BEGIN:VEVENT\r\nUID:s\r\nRECURRENCE-ID:20240302T090000Z\r\nDTSTART:20240302T120000Z\r\n"
+                   "SUMMARY:Moved\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n")
+
+    rows = vevent.parse(ical_data)
+
+    assert rows == vevent.parse_with_icalendar(ical_data)
+    assert len(rows) == 1 and rows[0]["recurring"]
+
+
+def test_unusual_objects_fall_back_to_icalendar(monkeypatch):
+    calls = []
+    original = vevent.parse_with_icalendar
+    monkeypatch.setattr(vevent, "parse_with_icalendar", lambda data: calls.append(data) or original(data))
+
+    vevent.parse(CASES[0])
+    vevent.parse(CASES[-1])
+
+    assert calls == [CASES[-1]]
+
+
+def test_parse_many_reports_errors_per_object():
+    results = vevent.parse_many([CASES[0], "not a calendar", CASES[1]])
+
+    assert results[0] == vevent.parse(CASES[0]) and results[2] == vevent.parse(CASES[1])
+    assert isinstance(results[1], Exception)
+
+
+def test_parse_many_on_process_pool(monkeypatch):
+    monkeypatch.setattr(vevent, "PARSE_PROCESSES", 2)
+    monkeypatch.setattr(vevent, "PARSE_PROCESS_MIN_BATCH", 10)
+    monkeypatch.setattr(vevent, "_executor", None)
+    objects = CASES * 3
+
+    try:
+        assert vevent.parse_many(objects) == [vevent.parse_with_icalendar(ics) for ics in objects]
+    finally:
+        vevent._executor.shutdown()
+
+
+def test_parse_many_survives_a_dead_pool_worker(monkeypatch):
+    monkeypatch.setattr(vevent, "PARSE_PROCESSES", 2)
+    monkeypatch.setattr(vevent, "PARSE_PROCESS_MIN_BATCH", 10)
+    monkeypatch.setattr(vevent, "_executor", None)
+    objects = CASES * 3
+    expected = [vevent.parse_with_icalendar(ics) for ics in objects]
+    assert vevent.parse_many(objects) == expected
+    broken = vevent._executor
+    for process in list(broken._processes.values()):
+        process.kill()
+        process.join()
+
+    try:
+        # Parsed in-thread, then on a fresh pool
+        assert vevent.parse_many(objects) == expected
+        assert vevent.parse_many(objects) == expected
+        assert vevent._executor is not broken
+    finally:
+        if vevent._executor is not None:
+            vevent._executor.shutdown()
@@ -0,0 +1,114 @@
+import datetime
+
+import pytest
+
+from src.db import Event, SessionLocal
+
+
+def _events():
+    session = SessionLocal()
+    try:
+        return {e.uid: e for e in session.query(Event)}
+    finally:
+        session.close()
+
+
+def _wait(wrapper):
+    if wrapper._reconcile_thread:
+        wrapper._reconcile_thread.join(timeout=5)
+
+
+def test_create_event_writes_through_without_full_sync(wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_calendar("Home")
+    stub.add_event(work, "existing", "Existing")
+    wrapper.sync()
+    stub.reset_log()
+
+    uid = wrapper.create_event(
+        "Work", "Planning", datetime.datetime(2024, 5, 1, 9), datetime.datetime(2024, 5, 1, 10),
+        description="Quarterly", location="Room 1",
+    )
+
+    # Visible locally as soon as the PUT is confirmed
+    event = _events()[uid]
+    assert event.summary == "Planning"
+    assert event.start == datetime.datetime(2024, 5, 1, 9)
+    assert event.href == f"{work.path}{uid}.ics"
+    assert event.etag == work.objects[event.href][0]
+    # The calendar URL comes from the local DB: no listing before the PUT
+    assert stub.count("PUT") == 1 and stub.count("PROPFIND") == 0
+
+    _wait(wrapper)
+    # Only the touched calendar is reconciled, and our own write is not downloaded again
+    reports = [r for r in stub.requests if r.method == "REPORT"]
+    assert [(r.path, r.report) for r in reports] == [(work.path, "sync-collection")]
+    assert stub.count("GET") == 0
+    assert set(_events()) == {"existing", uid}
+
+
+def test_reconcile_picks_up_other_changes_on_the_calendar(wrapper, stub):
+    work = stub.add_calendar("Work")
+    wrapper.sync()
+    stub.add_event(work, "from-elsewhere", "Added by another client")
+
+    wrapper.create_event("Work", "Mine", datetime.datetime(2024, 5, 1, 9), datetime.datetime(2024, 5, 1, 10))
+    _wait(wrapper)
+
+    assert "from-elsewhere" in _events()
+
+
+def test_back_to_back_writes_share_one_pending_reconcile(wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "existing", "Existing")
+    wrapper.sync()
+    stub.reset_log()
+
+    # Hold the first reconcile, as if a sync were running
+    with wrapper._sync_lock:
+        for hour in range(9, 14):
+            wrapper.create_event("Work", f"At {hour}", datetime.datetime(2024, 5, 1, hour),
+                                 datetime.datetime(2024, 5, 1, hour, 30))
+        assert wrapper.syncing
+    _wait(wrapper)
+
+    # At most the held reconcile and one more for every write made meanwhile
+    assert stub.count("REPORT", "sync-collection") <= 2
+    assert not wrapper.syncing
+    assert len(_events()) == 6
+
+
+def test_delete_event_removes_local_row(wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "doomed", "Doomed")
+    stub.add_event(work, "kept", "Kept")
+    wrapper.sync()
+
+    stub.reset_log()
+
+    wrapper.delete_event("Work", "doomed")
+
+    assert set(_events()) == {"kept"}
+    assert not any(href.endswith("doomed.ics") for href in work.objects)
+    _wait(wrapper)
+    assert set(_events()) == {"kept"}
+    # One conditional DELETE of the stored href; the only other request is the background reconcile
+    assert [(r.method, r.report) for r in stub.requests] == [("DELETE", None), ("REPORT", "sync-collection")]
+
+
+def test_delete_event_refreshes_a_copy_changed_on_the_server(wrapper, stub):
+    work = stub.add_calendar("Work")
+    stub.add_event(work, "edited", "Before")
+    wrapper.sync()
+    # Edited elsewhere since the sync: the stored ETag no longer matches
+    stub.add_event(work, "edited", "After")
+    stub.reset_log()
+
+    wrapper.delete_event("Work", "edited")
+
+    assert work.objects == {}
+    assert stub.count("DELETE") == 2 and stub.count("REPORT", "calendar-query") == 1
+    _wait(wrapper)
+    assert _events() == {}
+    with pytest.raises(ValueError):
+        wrapper.delete_event("Work", "edited")